@@ -0,0 +1,61 @@
+import asyncio
+import csv
+from copy import deepcopy
+from statistics import mean
+
+from aalpy.SULs import MealySUL, LatencySUL, AsyncLatencySUL, SULPool
+from aalpy.base import AsyncSULPool
+from aalpy.learning_algs import run_Lstar, run_Lstar_async
+from aalpy.oracles import RandomWordEqOracle
+from aalpy.utils import load_automaton_from_file
+
+# Wall-clock learning time against a simulated slow system, as the injected latency and the number of workers vary.
+# Sync: SULPool of LatencySUL replicas in a thread pool, async: AsyncSULPool of AsyncLatencySUL connections.
+
+model = load_automaton_from_file('../DotModels/MQTT/emqtt__two_client_will_retain.dot', automaton_type='mealy')
+alphabet = model.get_input_alphabet()
+
+# (reset latency, step latency) in seconds
+latencies = [(0, 0), (0.001, 0.0001), (0.005, 0.0005), (0.01, 0.001)]
+workers = [1, 2, 4, 8, 16]
+distribution = 'lognormal'
+repeat = 3
+
+rows = [['mode', 'reset_latency', 'step_latency', 'workers', 'total_time', 'learning_time', 'eq_oracle_time',
+         'queries_learning', 'steps_learning']]
+
+
+def run_sync(reset_latency, step_latency, num_workers, seed):
+    replicas = [LatencySUL(MealySUL(deepcopy(model)), reset_latency, step_latency, distribution, seed=seed + i)
+                for i in range(num_workers)]
+    sul = SULPool(replicas)
+    eq_oracle = RandomWordEqOracle(alphabet, sul, num_walks=500, min_walk_len=5, max_walk_len=15,
+                                   batch_size=50 * num_workers)
+    _, info = run_Lstar(alphabet, sul, eq_oracle, 'mealy', print_level=0, return_data=True)
+    sul.shutdown()
+    return info
+
+
+def run_async(reset_latency, step_latency, num_workers, seed):
+    connections = [AsyncLatencySUL(MealySUL(deepcopy(model)), reset_latency, step_latency, distribution,
+                                   seed=seed + i) for i in range(num_workers)]
+    sul = AsyncSULPool(connections)
+    eq_oracle = RandomWordEqOracle(alphabet, None, num_walks=500, min_walk_len=5, max_walk_len=15,
+                                   batch_size=50 * num_workers)
+    _, info = asyncio.run(run_Lstar_async(alphabet, sul, eq_oracle, 'mealy', print_level=0, return_data=True))
+    return info
+
+
+for mode, run in [('sync', run_sync), ('async', run_async)]:
+    for reset_latency, step_latency in latencies:
+        for num_workers in workers:
+            infos = [run(reset_latency, step_latency, num_workers, seed=100 * r) for r in range(repeat)]
+            row = [mode, reset_latency, step_latency, num_workers]
+            for key in ['total_time', 'learning_time', 'eq_oracle_time', 'queries_learning', 'steps_learning']:
+                row.append(round(mean(info[key] for info in infos), 4))
+            print(row)
+            rows.append(row)
+
+with open('latency_experiments.csv', 'w', newline='') as f:
+    wr = csv.writer(f, dialect='excel')
+    wr.writerows(rows)
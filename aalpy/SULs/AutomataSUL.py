@@ -1,8 +1,107 @@
+import random
+from bisect import bisect
+from collections import Counter
+from itertools import accumulate
+
 from aalpy.base import SUL
+from aalpy.base.SUL import get_maximal_words, prefix_outputs
 from aalpy.automata import Dfa, MealyMachine, MooreMachine, Onfsm, Mdp, StochasticMealyMachine, MarkovChain
 
 
-class DfaSUL(SUL):
+class CompiledAutomatonSUL(SUL):
+    """
+    Base class of SULs of deterministic automata, that answer batches of queries without executing them step by step.
+    On the first batch, the automaton is compiled into a table for each state, that maps inputs to the table of the
+    target state and the output of the transition. Words are executed by following these tables, without calling
+    pre, step and post, or updating the current state of the automaton. Changes made to the automaton afterwards are
+    not reflected in batches, unless compiled_initial_state is set to None. Subclasses that override pre, step or post
+    (eg. to map outputs) execute batches step by step, so that batches and queries are answered the same way.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.compiled_initial_state = None
+
+    def get_automaton(self):
+        """
+        Returns the automaton of the SUL.
+        """
+        pass
+
+    def transition_output(self, state, letter, target):
+        """
+        Returns the output of the step with the letter from the state, which leads to the target.
+        """
+        pass
+
+    def compile_automaton(self):
+        """
+        Returns the table of the initial state, mapping each input to a tuple of the table of the reached state and the
+        output of the transition.
+        """
+        initial_state = self.get_automaton().initial_state
+        states = [initial_state]
+        tables = {initial_state: dict()}
+        for state in states:
+            for target in state.transitions.values():
+                if target not in tables:
+                    tables[target] = dict()
+                    states.append(target)
+
+        for state in states:
+            for letter, target in state.transitions.items():
+                tables[state][letter] = (tables[target], self.transition_output(state, letter, target))
+        return tables[initial_state]
+
+    def _overrides_steps(self):
+        # the compiled tables only follow pre, step and post of the SUL class that derives from CompiledAutomatonSUL
+        automaton_sul_class = next(cls for cls in type(self).__mro__ if CompiledAutomatonSUL in cls.__bases__)
+        return any(getattr(type(self), method) is not getattr(automaton_sul_class, method)
+                   for method in ['pre', 'step', 'post'])
+
+    def query_batch(self, words: list) -> list:
+        """
+        Performs membership queries for all words in `words` on the compiled automaton. As in SUL.query_batch, words
+        that are prefixes of other words in the batch are not executed. If a word contains an input that is not
+        defined in the automaton, or if pre, step or post are overridden, the batch is executed step by step.
+
+        Args:
+
+            words: list of membership queries
+
+        Returns:
+
+            list of output lists, where the i-th element corresponds to the outputs of the i-th word
+
+        """
+        if self._overrides_steps():
+            return super().query_batch(words)
+        if self.compiled_initial_state is None:
+            self.compiled_initial_state = self.compile_automaton()
+
+        maximal_words, covering_words = get_maximal_words(words)
+        outputs = dict()
+        try:
+            for word in maximal_words:
+                if word:
+                    table = self.compiled_initial_state
+                    word_outputs = []
+                    for letter in word:
+                        table, output = table[letter]
+                        word_outputs.append(output)
+                    outputs[word] = word_outputs
+        except KeyError:
+            return super().query_batch(words)
+        self.num_queries += len(outputs)
+        self.num_steps += sum(len(word) for word in outputs.keys())
+
+        if len(outputs) != len(maximal_words):
+            outputs[()] = self.query(())
+        return [prefix_outputs(word, covering_word, outputs[covering_word])
+                for word, covering_word in zip(words, covering_words)]
+
+
+class DfaSUL(CompiledAutomatonSUL):
     """
     System under learning for DFAs.
     """
@@ -11,6 +110,12 @@ class DfaSUL(SUL):
         super().__init__()
         self.dfa = dfa
 
+    def get_automaton(self):
+        return self.dfa
+
+    def transition_output(self, state, letter, target):
+        return target.is_accepting
+
     def pre(self):
         """
         Resets the dfa to the initial state.
@@ -37,12 +142,184 @@ class DfaSUL(SUL):
             return self.dfa.initial_state.is_accepting
         return self.dfa.step(letter)
 
+    def save_state(self):
+        return self.dfa.current_state
+
+    def restore_state(self, token):
+        self.dfa.current_state = token
+
 
-class MdpSUL(SUL):
-    def __init__(self, mdp: Mdp):
+class TransitionSampler:
+    """
+    Samples transitions of stochastic automata. The cumulative distribution of the transitions of each state and input
+    is computed on first use, so that a transition is sampled with a single random number and a binary search, instead
+    of building lists of probabilities and calling random.choices in each step. Changes made to the probabilities of
+    the automaton afterwards are not reflected.
+    """
+
+    def __init__(self, probability_index: int, seed=None):
+        """
+        Args:
+
+            probability_index: index of the probability in the transition tuples
+
+            seed: seed of the random number generator of the sampler. If None, functions of the random module are used,
+                so that samples can be reproduced with random.seed. (Default value = None)
+        """
+        self.probability_index = probability_index
+        self.rng = random.Random(seed) if seed is not None else None
+        self.tables = dict()
+
+    def _get_table(self, state, letter, transitions):
+        table = self.tables.get((state, letter))
+        if table is None:
+            cum_weights = list(accumulate(transition[self.probability_index] for transition in transitions))
+            table = (transitions, cum_weights, cum_weights[-1], len(transitions) - 1)
+            self.tables[(state, letter)] = table
+        return table
+
+    def sample(self, state, letter, transitions):
+        """
+        Args:
+
+            state: source state
+
+            letter: input
+
+            transitions: list of transition tuples of the state and the input
+
+        Returns:
+
+            sampled transition tuple
+
+        """
+        transitions, cum_weights, total, hi = self._get_table(state, letter, transitions)
+        rng = self.rng if self.rng is not None else random
+        return transitions[bisect(cum_weights, rng.random() * total, 0, hi)]
+
+    def sample_counts(self, state, letter, transitions, num_samples: int) -> list:
+        """
+        Samples num_samples transitions of the state and the input.
+
+        Returns:
+
+            list of tuples (transition, number of times it was sampled)
+
+        """
+        transitions, cum_weights, total, hi = self._get_table(state, letter, transitions)
+        if hi == 0:
+            return [(transitions[0], num_samples)]
+        rng = self.rng if self.rng is not None else random
+        counts = Counter([bisect(cum_weights, rng.random() * total, 0, hi) for _ in range(num_samples)])
+        return [(transitions[index], count) for index, count in counts.items()]
+
+
+class StochasticAutomatonSUL(SUL):
+    """
+    Base class of SULs of stochastic automata, which sample transitions with a TransitionSampler. With sample_query,
+    the same word can be sampled many times without executing each sample step by step. Stochastic L* does not use
+    sample_query: its teacher chooses each input of a trace depending on the outputs observed so far and stops at
+    outputs that were not observed before. It samples through pre and step, which use the cumulative tables of the
+    sampler, but not the grouping of samples of sample_query.
+    """
+
+    def __init__(self, probability_index: int, seed=None):
+        """
+        Args:
+
+            probability_index: index of the probability in the transition tuples
+
+            seed: seed of the random number generator used for sampling. If None, functions of the random module are
+                used. (Default value = None)
+        """
         super().__init__()
+        self.sampler = TransitionSampler(probability_index, seed)
+
+    def get_automaton(self):
+        """
+        Returns the automaton of the SUL.
+        """
+        pass
+
+    def get_transitions(self, state, letter):
+        """
+        Returns the list of transition tuples of the state and the input, the reached state being their first element.
+        """
+        pass
+
+    def transition_output(self, transition):
+        """
+        Returns the output of a sampled transition.
+        """
+        pass
+
+    def initial_outputs(self) -> tuple:
+        """
+        Returns the outputs returned by query before the first input.
+        """
+        return ()
+
+    def sample_step(self, letter):
+        automaton = self.get_automaton()
+        state = automaton.current_state
+        transition = self.sampler.sample(state, letter, self.get_transitions(state, letter))
+        automaton.current_state = transition[0]
+        return self.transition_output(transition)
+
+    def sample_query(self, word: tuple, num_samples: int) -> Counter:
+        """
+        Samples the outputs of the word num_samples times, with the same distribution as num_samples queries. Samples
+        that reached the same state with the same outputs are extended together, so that only a random number is drawn
+        per sample and step, while states and outputs are updated once per group of samples.
+        Intended for sampling fixed words, eg. in benchmarks or to estimate output distributions of test cases, as
+        learning algorithms that choose inputs adaptively can not sample through it.
+
+        Args:
+
+            word: inputs
+
+            num_samples: number of samples
+
+        Returns:
+
+            Counter mapping tuples of outputs, as returned by query, to their number of occurrences
+
+        """
+        initial_state = self.get_automaton().initial_state
+        samples = Counter({(initial_state, self.initial_outputs()): num_samples})
+        for letter in word:
+            next_samples = Counter()
+            for (state, outputs), count in samples.items():
+                transitions = self.get_transitions(state, letter)
+                for transition, transition_count in self.sampler.sample_counts(state, letter, transitions, count):
+                    next_samples[(transition[0], outputs + (self.transition_output(transition),))] += transition_count
+            samples = next_samples
+
+        self.num_queries += num_samples
+        self.num_steps += num_samples * len(word)
+        output_counts = Counter()
+        for (_, outputs), count in samples.items():
+            output_counts[outputs] += count
+        return output_counts
+
+
+class MdpSUL(StochasticAutomatonSUL):
+    def __init__(self, mdp: Mdp, seed=None):
+        super().__init__(probability_index=1, seed=seed)
         self.mdp = mdp
 
+    def get_automaton(self):
+        return self.mdp
+
+    def get_transitions(self, state, letter):
+        return state.transitions[letter]
+
+    def transition_output(self, transition):
+        return transition[0].output
+
+    def initial_outputs(self):
+        return self.mdp.initial_state.output,
+
     def query(self, word: tuple) -> list:
         initial_output = self.pre()
         out = [initial_output]
@@ -59,14 +336,29 @@ class MdpSUL(SUL):
         pass
 
     def step(self, letter):
-        return self.mdp.step(letter)
+        if letter is None:
+            return self.mdp.current_state.output
+        return self.sample_step(letter)
 
 
-class McSUL(SUL):
-    def __init__(self, mdp: MarkovChain):
-        super().__init__()
+class McSUL(StochasticAutomatonSUL):
+    def __init__(self, mdp: MarkovChain, seed=None):
+        super().__init__(probability_index=1, seed=seed)
         self.mc = mdp
 
+    def get_automaton(self):
+        return self.mc
+
+    def get_transitions(self, state, letter):
+        # states without transitions are not left
+        return state.transitions if state.transitions else [(state, 1)]
+
+    def transition_output(self, transition):
+        return transition[0].output
+
+    def initial_outputs(self):
+        return self.mc.initial_state.output,
+
     def query(self, word: tuple) -> list:
         initial_output = self.pre()
         out = [initial_output]
@@ -83,10 +375,14 @@ class McSUL(SUL):
         pass
 
     def step(self, letter=None):
-        return self.mc.step()
+        # all inputs lead to the same distribution
+        return self.sample_step(None)
+
+    def sample_query(self, word: tuple, num_samples: int) -> Counter:
+        return super().sample_query(tuple(None for _ in word), num_samples)
 
 
-class MealySUL(SUL):
+class MealySUL(CompiledAutomatonSUL):
     """
     System under learning for Mealy machines.
     """
@@ -95,6 +391,12 @@ class MealySUL(SUL):
         super().__init__()
         self.mm = mm
 
+    def get_automaton(self):
+        return self.mm
+
+    def transition_output(self, state, letter, target):
+        return state.output_fun[letter]
+
     def pre(self):
         """ """
         self.mm.reset_to_initial()
@@ -116,8 +418,14 @@ class MealySUL(SUL):
         """
         return self.mm.step(letter)
 
+    def save_state(self):
+        return self.mm.current_state
 
-class MooreSUL(SUL):
+    def restore_state(self, token):
+        self.mm.current_state = token
+
+
+class MooreSUL(CompiledAutomatonSUL):
     """
     System under learning for Mealy machines.
     """
@@ -126,6 +434,12 @@ class MooreSUL(SUL):
         super().__init__()
         self.mm = moore_machine
 
+    def get_automaton(self):
+        return self.mm
+
+    def transition_output(self, state, letter, target):
+        return target.output
+
     def pre(self):
         """ """
         self.mm.reset_to_initial()
@@ -139,6 +453,12 @@ class MooreSUL(SUL):
             return self.mm.initial_state.output
         return self.mm.step(letter)
 
+    def save_state(self):
+        return self.mm.current_state
+
+    def restore_state(self, token):
+        self.mm.current_state = token
+
 
 class OnfsmSUL(SUL):
     def __init__(self, mdp: Onfsm):
@@ -155,11 +475,22 @@ class OnfsmSUL(SUL):
         return self.onfsm.step(letter)
 
 
-class StochasticMealySUL(SUL):
-    def __init__(self, smm: StochasticMealyMachine):
-        super().__init__()
+class StochasticMealySUL(StochasticAutomatonSUL):
+    def __init__(self, smm: StochasticMealyMachine, seed=None):
+        # MDPs can also be sampled as stochastic Mealy machines, outputs of transitions being outputs of reached states
+        self.is_mdp = isinstance(smm, Mdp)
+        super().__init__(probability_index=1 if self.is_mdp else 2, seed=seed)
         self.smm = smm
 
+    def get_automaton(self):
+        return self.smm
+
+    def get_transitions(self, state, letter):
+        return state.transitions[letter]
+
+    def transition_output(self, transition):
+        return transition[0].output if self.is_mdp else transition[1]
+
     def pre(self):
         self.smm.reset_to_initial()
 
@@ -167,4 +498,4 @@ class StochasticMealySUL(SUL):
         pass
 
     def step(self, letter):
-        return self.smm.step(letter)
+        return self.sample_step(letter)
@@ -0,0 +1,196 @@
+import json
+import math
+from collections import defaultdict
+from time import perf_counter
+
+from aalpy.base import SUL
+from aalpy.base.SUL import get_base_phase
+
+_ZERO_BUCKET = -(1 << 30)
+
+
+class LatencyHistogram:
+    """
+    Histogram of latencies with logarithmic buckets. Each power of two is split in `sub_buckets` buckets, so
+    percentiles are accurate up to a relative error of 1 / sub_buckets, while recording a latency takes constant time
+    and memory does not grow with the number of recorded latencies.
+    """
+
+    sub_buckets = 8
+
+    def __init__(self):
+        self.buckets = defaultdict(int)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        if seconds > 0:
+            mantissa, exponent = math.frexp(seconds)
+            # mantissa is in [0.5, 1)
+            index = exponent * self.sub_buckets + int((mantissa - 0.5) * 2 * self.sub_buckets)
+        else:
+            index = _ZERO_BUCKET
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def _upper_bound(self, index):
+        if index == _ZERO_BUCKET:
+            return 0.0
+        exponent, sub_bucket = divmod(index, self.sub_buckets)
+        return math.ldexp(0.5 + (sub_bucket + 1) / (2 * self.sub_buckets), exponent)
+
+    def percentile(self, percent: float) -> float:
+        """
+        Args:
+
+            percent: percentile in the range [0, 100]
+
+        Returns:
+
+            upper bound of the bucket containing the percentile, in seconds
+
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(percent / 100 * self.count))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(max(self._upper_bound(index), self.min), self.max)
+        return self.max
+
+    def get_stats(self) -> dict:
+        """
+        Returns:
+
+            dictionary with the number of recorded latencies, their sum, mean, minimum, maximum and the 50th, 95th and
+            99th percentile, all in seconds
+
+        """
+        return {'count': self.count, 'total': self.total, 'mean': self.total / self.count if self.count else 0.0,
+                'min': self.min if self.count else 0.0, 'max': self.max,
+                'p50': self.percentile(50), 'p95': self.percentile(95), 'p99': self.percentile(99)}
+
+
+class InstrumentedSUL(SUL):
+    """
+    Wrapper of a system under learning that records the wall-clock latency of pre, step, post and (batched) membership
+    queries in latency histograms. Latencies are recorded separately for each phase of learning (eg. 'learning' for the
+    queries of the learning algorithm and 'eq_oracle' for the queries of the equivalence oracle), which is set by the
+    learning algorithm with set_sul_phase.
+    If the wrapped SUL implements its own query or query_batch (eg. SULPool), queries and batches are passed to it as a
+    whole and their pre/step/post are not recorded separately.
+    """
+
+    operations = ['pre', 'step', 'post', 'query', 'query_batch']
+
+    def __init__(self, sul: SUL, phase='learning'):
+        """
+        Args:
+
+            sul: system under learning
+
+            phase: initial phase (Default value = 'learning')
+        """
+        super().__init__()
+        self.sul = sul
+        self.histograms = dict()
+        self.phase = None
+        self._current = None
+        self.set_phase(phase)
+
+    def set_phase(self, phase: str):
+        # latencies are recorded per phase, sub-phases (eg. 'learning:closing') are not distinguished
+        phase = get_base_phase(phase)
+        self.phase = phase
+        if phase not in self.histograms:
+            self.histograms[phase] = {operation: LatencyHistogram() for operation in self.operations}
+        self._current = self.histograms[phase]
+
+    def _overrides(self, method):
+        return getattr(type(self.sul), method) is not getattr(SUL, method)
+
+    def query(self, word: tuple) -> list:
+        start = perf_counter()
+        if self._overrides('query'):
+            out = self.sul.query(word)
+            self.num_queries += 1
+            self.num_steps += len(word)
+        else:
+            # executed with the instrumented pre, step and post
+            out = super().query(word)
+        self._current['query'].record(perf_counter() - start)
+        return out
+
+    def query_batch(self, words: list) -> list:
+        if not self._overrides('query_batch'):
+            return super().query_batch(words)
+
+        num_queries, num_steps = self.sul.num_queries, self.sul.num_steps
+        start = perf_counter()
+        outputs = self.sul.query_batch(words)
+        self._current['query_batch'].record(perf_counter() - start)
+        self.num_queries += self.sul.num_queries - num_queries
+        self.num_steps += self.sul.num_steps - num_steps
+        return outputs
+
+    def pre(self):
+        start = perf_counter()
+        self.sul.pre()
+        self._current['pre'].record(perf_counter() - start)
+
+    def post(self):
+        start = perf_counter()
+        self.sul.post()
+        self._current['post'].record(perf_counter() - start)
+
+    def step(self, letter):
+        start = perf_counter()
+        out = self.sul.step(letter)
+        self._current['step'].record(perf_counter() - start)
+        return out
+
+    def save_state(self):
+        return self.sul.save_state()
+
+    def restore_state(self, token):
+        self.sul.restore_state(token)
+
+    def get_latency_stats(self) -> dict:
+        """
+        Returns:
+
+            dictionary mapping each phase to a dictionary that maps each operation with at least one recorded latency
+            to its statistics (see LatencyHistogram.get_stats)
+
+        """
+        return {phase: {operation: histogram.get_stats() for operation, histogram in histograms.items()
+                        if histogram.count}
+                for phase, histograms in self.histograms.items()}
+
+    def to_json(self, path=None) -> str:
+        """
+        Exports the latency statistics as JSON.
+
+        Args:
+
+            path: if not None, statistics are also written to the file
+
+        Returns:
+
+            JSON string of get_latency_stats()
+
+        """
+        stats = json.dumps(self.get_latency_stats(), indent=2)
+        if path is not None:
+            with open(path, 'w') as f:
+                f.write(stats)
+        return stats
@@ -0,0 +1,129 @@
+import asyncio
+import math
+import random
+import time
+
+from aalpy.base import SUL, AsyncSUL
+
+latency_distributions = ['constant', 'uniform', 'normal', 'exponential', 'lognormal']
+
+
+class _LatencyModel:
+    """
+    Seeded random delays of resets and steps.
+    """
+
+    def __init__(self, reset_latency, step_latency, distribution, jitter, seed):
+        assert distribution in latency_distributions
+        assert reset_latency >= 0 and step_latency >= 0 and jitter >= 0
+        self.reset_latency = reset_latency
+        self.step_latency = step_latency
+        self.distribution = distribution
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.total_delay = 0.0
+
+    def sample(self, mean: float) -> float:
+        if mean == 0 or self.distribution == 'constant':
+            delay = mean
+        elif self.distribution == 'uniform':
+            delay = self.random.uniform(mean * (1 - self.jitter), mean * (1 + self.jitter))
+        elif self.distribution == 'normal':
+            delay = self.random.gauss(mean, mean * self.jitter)
+        elif self.distribution == 'exponential':
+            delay = self.random.expovariate(1 / mean)
+        else:
+            # lognormal with the given mean, jitter is the standard deviation of the underlying normal distribution
+            delay = mean * math.exp(self.random.gauss(-self.jitter ** 2 / 2, self.jitter))
+        delay = max(0.0, delay)
+        self.total_delay += delay
+        return delay
+
+
+class LatencySUL(SUL):
+    """
+    Wrapper of a system under learning that delays each reset and step, to simulate a system with realistic response
+    times (eg. a network endpoint) with fast in-memory SULs. Delays are drawn from a seeded distribution, so benchmarks
+    are reproducible. Waiting does not hold the GIL, so replicas in a thread pool (see SULPool) wait in parallel.
+    """
+
+    def __init__(self, sul: SUL, reset_latency=0.001, step_latency=0.0001, distribution='constant', jitter=0.5,
+                 seed=None):
+        """
+        Args:
+
+            sul: system under learning
+
+            reset_latency: mean delay of a reset, in seconds (Default value = 0.001)
+
+            step_latency: mean delay of a step, in seconds (Default value = 0.0001)
+
+            distribution: distribution of delays, one of 'constant', 'uniform', 'normal', 'exponential' or 'lognormal'
+                (Default value = 'constant')
+
+            jitter: spread of the 'uniform', 'normal' and 'lognormal' distributions, relative to the mean (standard
+                deviation of the underlying normal distribution for 'lognormal') (Default value = 0.5)
+
+            seed: seed of the random delays
+        """
+        super().__init__()
+        self.sul = sul
+        self.latency = _LatencyModel(reset_latency, step_latency, distribution, jitter, seed)
+
+    @property
+    def total_delay(self):
+        return self.latency.total_delay
+
+    def pre(self):
+        time.sleep(self.latency.sample(self.latency.reset_latency))
+        self.sul.pre()
+
+    def post(self):
+        self.sul.post()
+
+    def step(self, letter):
+        time.sleep(self.latency.sample(self.latency.step_latency))
+        return self.sul.step(letter)
+
+
+class AsyncLatencySUL(AsyncSUL):
+    """
+    Asynchronous counterpart of the LatencySUL, that awaits the delays instead of blocking, for benchmarking of the
+    asynchronous learning algorithms (see AsyncSULPool and run_Lstar_async).
+    """
+
+    def __init__(self, sul: SUL, reset_latency=0.001, step_latency=0.0001, distribution='constant', jitter=0.5,
+                 seed=None):
+        """
+        Args:
+
+            sul: system under learning (synchronous, eg. MealySUL)
+
+            reset_latency: mean delay of a reset, in seconds (Default value = 0.001)
+
+            step_latency: mean delay of a step, in seconds (Default value = 0.0001)
+
+            distribution: distribution of delays, see LatencySUL (Default value = 'constant')
+
+            jitter: spread of the distribution, see LatencySUL (Default value = 0.5)
+
+            seed: seed of the random delays
+        """
+        super().__init__()
+        self.sul = sul
+        self.latency = _LatencyModel(reset_latency, step_latency, distribution, jitter, seed)
+
+    @property
+    def total_delay(self):
+        return self.latency.total_delay
+
+    async def pre(self):
+        await asyncio.sleep(self.latency.sample(self.latency.reset_latency))
+        self.sul.pre()
+
+    async def post(self):
+        self.sul.post()
+
+    async def step(self, letter):
+        await asyncio.sleep(self.latency.sample(self.latency.step_latency))
+        return self.sul.step(letter)
@@ -1,5 +1,16 @@
+import threading
+from copy import copy, deepcopy
+from queue import Queue
+
 from aalpy.base import SUL
 
+_STOP = object()
+
+
+class _CloneError:
+    def __init__(self, error):
+        self.error = error
+
 
 class FunctionDecorator:
     """
@@ -30,26 +41,110 @@ class FunctionDecorator:
 class PyClassSUL(SUL):
     """
     System under learning for inferring python classes.
+    By default, the class is instantiated on every reset. For classes with expensive constructors, a pool of ready-made
+    instances can be used instead (pool_size > 0). A pristine instance is constructed once, and a background thread
+    refills the pool with its clones between queries. Clones are created with copy.copy if the class defines
+    __copy__, otherwise with copy.deepcopy (which follows __deepcopy__ and __reduce__). If a reset hook is given, used
+    instances are reset in place by the hook and returned to the pool instead.
     """
-    def __init__(self, python_class):
+    def __init__(self, python_class, pool_size=0, reset_hook=None):
         """
         Args:
 
             python_class: class to be learned
+
+            pool_size: number of ready-made instances kept in the pool. If 0, the class is instantiated on every
+                reset. (Default value = 0)
+
+            reset_hook: function that brings a used instance back to its initial state, eg. `lambda obj: obj.reset()`.
+                Only used if pool_size > 0. If None, used instances are discarded and replaced by clones of the
+                pristine instance.
         """
         super().__init__()
         self._class = python_class
         self.sul: object = None
+        self.pool_size = pool_size
+        self.reset_hook = reset_hook
+        self._pool = None
+        self._from_pool = False
+
+    def _start_pool(self):
+        self._pristine = self._class()
+        self._clone = copy if hasattr(type(self._pristine), '__copy__') else deepcopy
+        self._pool = Queue()
+        # None requests a new clone, instances are reset with the reset hook
+        self._requests = Queue()
+        for _ in range(self.pool_size):
+            self._requests.put(None)
+        self._refill_thread = threading.Thread(target=self._refill_pool, daemon=True)
+        self._refill_thread.start()
+
+    def _refill_pool(self):
+        while True:
+            request = self._requests.get()
+            if request is _STOP:
+                return
+            try:
+                if request is None:
+                    self._pool.put(self._clone(self._pristine))
+                else:
+                    self.reset_hook(request)
+                    self._pool.put(request)
+            except Exception as e:
+                # raised in pre
+                self._pool.put(_CloneError(e))
 
     def pre(self):
         """
-        Do the reset by initializing the class again or call reset method of the class
+        Do the reset by initializing the class again or by taking a ready-made instance from the pool
         """
-        self.sul = self._class()
+        if self.pool_size == 0:
+            self.sul = self._class()
+            return
+
+        if self._pool is None:
+            self._start_pool()
+        self._recycle()
+        self.sul = self._pool.get()
+        if isinstance(self.sul, _CloneError):
+            error, self.sul = self.sul.error, None
+            self._requests.put(None)
+            raise error
+        if self.reset_hook is None:
+            # new clone is created while the taken instance is used
+            self._requests.put(None)
+        self._from_pool = True
+
+    def _recycle(self):
+        # instance taken from the pool is reset in the background by the reset hook and returned to the pool
+        if self.reset_hook is not None and self.sul is not None and self._from_pool:
+            self._requests.put(self.sul)
+        self._from_pool = False
 
     def post(self):
         pass
 
+    def close(self):
+        """
+        Stops the background thread that refills the pool.
+        """
+        if self._pool is not None:
+            self._requests.put(_STOP)
+            self._refill_thread.join()
+            self._pool = None
+            self.sul = None
+            self._from_pool = False
+
+    def __getstate__(self):
+        # pool is not copied, copies (eg. replicas of the SULPool) create their own pool
+        state = self.__dict__.copy()
+        for attribute in ['_pristine', '_clone', '_pool', '_requests', '_refill_thread']:
+            state.pop(attribute, None)
+        state['_pool'] = None
+        state['sul'] = None
+        state['_from_pool'] = False
+        return state
+
     def step(self, letter):
         """
         Executes the function(with arguments) found in letter against the SUL
@@ -66,3 +161,14 @@ class PyClassSUL(SUL):
         if letter.args:
             return getattr(self.sul, letter.function.__name__, letter)(*letter.args)
         return getattr(self.sul, letter.function.__name__, letter)()
+
+    def save_state(self):
+        """
+        Snapshot of the learned class instance (deep copy).
+        """
+        return deepcopy(self.sul)
+
+    def restore_state(self, token):
+        if self._pool is not None:
+            self._recycle()
+        self.sul = deepcopy(token)
@@ -0,0 +1,197 @@
+import pickle
+
+from aalpy.base import SUL
+from aalpy.base.CacheTree import CacheTree
+
+_MAGIC = b'AALPYTR1'
+_PRE, _POST, _STEP, _SYMBOL = range(1, 5)
+
+
+def _encode_varint(value: int) -> bytes:
+    encoded = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            encoded.append(byte | 0x80)
+        else:
+            encoded.append(byte)
+            return bytes(encoded)
+
+
+def _decode_varint(data: bytes, position: int):
+    value, shift = 0, 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, position
+        shift += 7
+
+
+class UnrecordedQueryError(Exception):
+    """
+    Raised by the ReplaySUL if the input sequence since the last reset was not recorded.
+    """
+
+    def __init__(self, inputs):
+        self.inputs = list(inputs)
+        super().__init__(f'Input sequence {self.inputs} was not recorded.')
+
+
+class RecordingSUL(SUL):
+    """
+    Wrapper of a system under learning that logs all interactions (pre, step and post) to a binary trace file, which
+    can be replayed with the ReplaySUL. The trace consists of operation codes, symbol definitions (pickled inputs and
+    outputs, each defined once on first use) and variable length integers that refer to the symbols, so each step
+    usually takes 3 bytes. Queries are executed with pre, step and post, so that they are recorded.
+    """
+
+    def __init__(self, sul: SUL, path: str):
+        """
+        Args:
+
+            sul: system under learning
+
+            path: path of the trace file, it will be overwritten
+        """
+        super().__init__()
+        self.sul = sul
+        self.path = path
+        self.file = open(path, 'wb')
+        self.file.write(_MAGIC)
+        self.symbol_ids = dict()
+
+    def _symbol_id(self, symbol):
+        symbol_id = self.symbol_ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = len(self.symbol_ids)
+            self.symbol_ids[symbol] = symbol_id
+            value = pickle.dumps(symbol, protocol=4)
+            self.file.write(bytes([_SYMBOL]) + _encode_varint(len(value)) + value)
+        return symbol_id
+
+    def pre(self):
+        self.sul.pre()
+        self.file.write(bytes([_PRE]))
+
+    def post(self):
+        self.sul.post()
+        self.file.write(bytes([_POST]))
+
+    def step(self, letter):
+        out = self.sul.step(letter)
+        input_id, output_id = self._symbol_id(letter), self._symbol_id(out)
+        self.file.write(bytes([_STEP]) + _encode_varint(input_id) + _encode_varint(output_id))
+        return out
+
+    def close(self):
+        """
+        Writes all buffered interactions to the trace file and closes it.
+        """
+        self.file.close()
+
+
+def load_trace(path: str, cache=None):
+    """
+    Loads a trace recorded by the RecordingSUL into a cache tree.
+
+    Args:
+
+        path: path of the trace file
+
+        cache: cache tree to which the trace is added. If None, CacheTree will be used.
+
+    Returns:
+
+        cache tree containing all recorded queries
+
+    """
+    cache = cache if cache is not None else CacheTree()
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert data[:len(_MAGIC)] == _MAGIC, f'{path} is not a recorded trace.'
+
+    symbols = []
+    position = len(_MAGIC)
+    cache.reset()
+    while position < len(data):
+        operation = data[position]
+        position += 1
+        if operation == _STEP:
+            input_id, position = _decode_varint(data, position)
+            output_id, position = _decode_varint(data, position)
+            cache.step_in_cache(symbols[input_id], symbols[output_id])
+        elif operation == _PRE:
+            cache.reset()
+        elif operation == _SYMBOL:
+            length, position = _decode_varint(data, position)
+            symbols.append(pickle.loads(data[position:position + length]))
+            position += length
+        elif operation != _POST:
+            raise ValueError(f'Corrupted trace file {path} at byte {position - 1}.')
+    return cache
+
+
+class ReplaySUL(SUL):
+    """
+    System under learning that answers queries from a trace recorded by the RecordingSUL, without interacting with the
+    recorded system. All recorded queries are loaded into a cache tree, so queries are answered at memory speed.
+    Interactions that were not recorded raise the UnrecordedQueryError.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+
+            path: path of the trace file
+        """
+        super().__init__()
+        self.cache = load_trace(path)
+        self.curr_node = None
+        self.inputs = []
+
+    def query(self, word: tuple) -> list:
+        """
+        Answers the membership query from the recorded trace.
+
+        Args:
+
+            word: membership query (word consisting of letters/inputs)
+
+        Returns:
+
+            list of outputs, where the i-th output corresponds to the output of the system after the i-th input
+
+        """
+        if len(word) == 0:
+            out = [self._root_value()]
+        else:
+            out = self.cache.in_cache(word)
+            if out is None:
+                raise UnrecordedQueryError(word)
+        self.num_queries += 1
+        self.num_steps += len(word)
+        return out
+
+    def _root_value(self):
+        if self.cache.root_node.value is None:
+            raise UnrecordedQueryError(())
+        return self.cache.root_node.value
+
+    def pre(self):
+        self.curr_node = self.cache.root_node
+        self.inputs = []
+
+    def post(self):
+        pass
+
+    def step(self, letter):
+        if letter is None:
+            return self._root_value()
+        self.inputs.append(letter)
+        self.curr_node = self.curr_node.children.get(letter) if self.curr_node is not None else None
+        if self.curr_node is None:
+            raise UnrecordedQueryError(self.inputs)
+        return self.curr_node.value
@@ -2,19 +2,280 @@ from aalpy.base import SUL
 import re
 
 
+class _UnsupportedRegex(Exception):
+    pass
+
+
+class _RegexParser:
+    """
+    Parses the subset of the python regex syntax that describes regular languages (literals, escapes, '.', character
+    classes, groups, alternation, quantifiers and the anchors '^' at the start and '$') into a syntax tree. Nodes are
+    tuples: ('char', matcher), ('end',), ('cat', [nodes]), ('alt', [nodes]) and ('repeat', node, min, max), where max
+    is None if unbounded. A matcher is either a single character or a compiled pattern matching a single character.
+    Other syntax (eg. backreferences, lookarounds or inline flags) raises _UnsupportedRegex.
+    """
+
+    def __init__(self, regex: str):
+        self.regex = regex
+        self.pos = 0
+
+    def parse(self):
+        if self.regex.startswith('^'):
+            self.pos = 1
+        node = self._parse_alternation()
+        if self.pos != len(self.regex):
+            raise _UnsupportedRegex()
+        return node
+
+    def _peek(self):
+        return self.regex[self.pos] if self.pos < len(self.regex) else None
+
+    def _parse_alternation(self):
+        options = [self._parse_concatenation()]
+        while self._peek() == '|':
+            self.pos += 1
+            options.append(self._parse_concatenation())
+        return options[0] if len(options) == 1 else ('alt', options)
+
+    def _parse_concatenation(self):
+        nodes = []
+        while self._peek() is not None and self._peek() not in '|)':
+            nodes.append(self._parse_repetition())
+        return ('cat', nodes)
+
+    def _parse_repetition(self):
+        node = self._parse_atom()
+        while True:
+            char = self._peek()
+            if char == '*':
+                bounds = (0, None)
+            elif char == '+':
+                bounds = (1, None)
+            elif char == '?':
+                bounds = (0, 1)
+            elif char == '{':
+                match = re.compile(r'\{(\d*)(,?)(\d*)\}').match(self.regex, self.pos)
+                if match is None or (not match.group(1) and not match.group(3) and not match.group(2)):
+                    # not a quantifier, '{' is a literal
+                    return node
+                lower = int(match.group(1)) if match.group(1) else 0
+                upper = lower if not match.group(2) else (int(match.group(3)) if match.group(3) else None)
+                self.pos = match.end() - 1
+                bounds = (lower, upper)
+            else:
+                return node
+            self.pos += 1
+            if self._peek() == '?':
+                # lazy quantifiers accept the same strings
+                self.pos += 1
+            elif self._peek() in ('*', '+', '?'):
+                # possessive quantifiers or repeated quantifiers
+                raise _UnsupportedRegex()
+            node = ('repeat', node, bounds[0], bounds[1])
+
+    def _parse_atom(self):
+        char = self._peek()
+        if char == '(':
+            self.pos += 1
+            if self._peek() == '?':
+                if self.regex.startswith('?:', self.pos):
+                    self.pos += 2
+                else:
+                    raise _UnsupportedRegex()
+            node = self._parse_alternation()
+            if self._peek() != ')':
+                raise _UnsupportedRegex()
+            self.pos += 1
+            return node
+        if char == '[':
+            return ('char', self._class_matcher(self._character_class_end()))
+        if char == '\\':
+            escaped = self.regex[self.pos + 1:self.pos + 2]
+            if escaped.isalnum() and escaped not in 'dDwWsSntrfv':
+                # backreferences, anchors (\b, \A, \Z) and unicode escapes
+                raise _UnsupportedRegex()
+            return ('char', self._class_matcher(self.pos + 2))
+        if char == '.':
+            return ('char', self._class_matcher(self.pos + 1))
+        if char == '$':
+            self.pos += 1
+            return ('end',)
+        if char in '*+?^':
+            raise _UnsupportedRegex()
+        self.pos += 1
+        return ('char', char)
+
+    def _character_class_end(self):
+        end = self.pos + 1
+        if self.regex[end:end + 1] == '^':
+            end += 1
+        if self.regex[end:end + 1] == ']':
+            end += 1
+        while end < len(self.regex) and self.regex[end] != ']':
+            end += 2 if self.regex[end] == '\\' else 1
+        if end >= len(self.regex):
+            raise _UnsupportedRegex()
+        return end + 1
+
+    def _class_matcher(self, end):
+        # semantics of classes and escapes are left to the re module, applied to single characters
+        pattern = re.compile(self.regex[self.pos:end])
+        self.pos = end
+        return pattern
+
+
+class _Nfa:
+    """
+    Thompson construction of a nondeterministic automaton over characters, states are integers. As re.match accepts
+    strings with a matching prefix, the accepting state loops on all characters. The anchor '$' is an epsilon
+    transition that may only be taken at the end of the string.
+    """
+
+    def __init__(self, tree):
+        self.epsilon = []
+        self.end_epsilon = []
+        self.transitions = []
+        self.initial = self._new_state()
+        self.accepting = self._build(tree, self.initial)
+        # None matches any character
+        self.transitions[self.accepting].append((None, self.accepting))
+
+    def _new_state(self):
+        self.epsilon.append([])
+        self.end_epsilon.append([])
+        self.transitions.append([])
+        return len(self.epsilon) - 1
+
+    def _build(self, node, start):
+        # builds the node from the start state and returns its final state
+        kind = node[0]
+        if kind == 'char':
+            end = self._new_state()
+            self.transitions[start].append((node[1], end))
+            return end
+        if kind == 'end':
+            end = self._new_state()
+            self.end_epsilon[start].append(end)
+            return end
+        if kind == 'cat':
+            for child in node[1]:
+                start = self._build(child, start)
+            return start
+        if kind == 'alt':
+            end = self._new_state()
+            for child in node[1]:
+                child_start = self._new_state()
+                self.epsilon[start].append(child_start)
+                self.epsilon[self._build(child, child_start)].append(end)
+            return end
+
+        _, child, lower, upper = node
+        for _ in range(lower):
+            start = self._build(child, start)
+        if upper is None:
+            loop_start = self._new_state()
+            self.epsilon[start].append(loop_start)
+            self.epsilon[self._build(child, loop_start)].append(loop_start)
+            end = self._new_state()
+            self.epsilon[loop_start].append(end)
+            return end
+        end = self._new_state()
+        for _ in range(upper - lower):
+            self.epsilon[start].append(end)
+            start = self._build(child, start)
+        self.epsilon[start].append(end)
+        return end
+
+    def closure(self, states, at_end=False):
+        stack = list(states)
+        closure = set(states)
+        while stack:
+            state = stack.pop()
+            targets = self.epsilon[state] + self.end_epsilon[state] if at_end else self.epsilon[state]
+            for target in targets:
+                if target not in closure:
+                    closure.add(target)
+                    stack.append(target)
+        return frozenset(closure)
+
+    def move(self, states, char):
+        targets = set()
+        for state in states:
+            for matcher, target in self.transitions[state]:
+                if matcher is None or (matcher == char if isinstance(matcher, str) else matcher.fullmatch(char)):
+                    targets.add(target)
+        return self.closure(targets)
+
+    def accepts_before_newline(self, states):
+        # '$' also matches before a newline at the end of the string
+        end_closure = self.closure(states, at_end=True)
+        return self.accepting in end_closure or self.accepting in self.closure(self.move(end_closure, '\n'), True)
+
+
 class RegexSUL(SUL):
     """
     An example implementation of a system under learning that can be used to learn any regex expression.
     Note that the $ is added to the expression as in this SUL only exact matches are learned.
+    Letters are converted to strings and appended to the input string, so they may consist of several characters.
+    The regex is compiled into a deterministic automaton, whose states are constructed on demand by the subset
+    construction, so each step takes constant time once its transition was computed. Regexes that use syntax which
+    does not describe a regular language (eg. backreferences or lookarounds) are matched with the re module instead.
     """
-    def __init__(self, regex: str):
+    def __init__(self, regex: str, alphabet: list = None):
+        """
+        Args:
+
+            regex: regular expression
+
+            alphabet: input alphabet, used by to_dfa (Default value = None)
+        """
         super().__init__()
         self.regex = regex if regex[-1] == '$' else regex + '$'
+        self.alphabet = alphabet
         self.string = ""
 
+        re.compile(self.regex)
+        try:
+            self._nfa = _Nfa(_RegexParser(self.regex).parse())
+        except (_UnsupportedRegex, re.error, RecursionError):
+            self._nfa = None
+        if self._nfa is not None:
+            # states of the deterministic automaton are sets of NFA states (and whether the string is accepted because
+            # it ends with a newline), identified by their index
+            self._dfa_states = []
+            self._dfa_state_ids = dict()
+            self._dfa_accepting = []
+            self._dfa_transitions = dict()
+            self._initial = self._get_dfa_state(self._nfa.closure([self._nfa.initial]))
+            self._state = self._initial
+
+    def _get_dfa_state(self, nfa_states, newline_accept=False):
+        key = (nfa_states, newline_accept)
+        state_id = self._dfa_state_ids.get(key)
+        if state_id is None:
+            state_id = len(self._dfa_states)
+            self._dfa_state_ids[key] = state_id
+            self._dfa_states.append(nfa_states)
+            self._dfa_accepting.append(newline_accept or
+                                       self._nfa.accepting in self._nfa.closure(nfa_states, at_end=True))
+        return state_id
+
+    def _dfa_step(self, state_id, letter):
+        target = self._dfa_transitions.get((state_id, letter))
+        if target is None:
+            nfa_states = self._dfa_states[state_id]
+            newline_accept = False
+            for char in str(letter):
+                newline_accept = char == '\n' and self._nfa.accepts_before_newline(nfa_states)
+                nfa_states = self._nfa.move(nfa_states, char)
+            target = self._get_dfa_state(nfa_states, newline_accept)
+            self._dfa_transitions[(state_id, letter)] = target
+        return target
+
     def pre(self):
         self.string = ""
-        pass
+        if self._nfa is not None:
+            self._state = self._initial
 
     def post(self):
         self.string = ""
@@ -32,6 +293,67 @@ class RegexSUL(SUL):
             Whether the current string (previous string + letter) is accepted
 
         """
+        if self._nfa is not None:
+            if letter is not None:
+                self._state = self._dfa_step(self._state, letter)
+            return self._dfa_accepting[self._state]
+
         if letter is not None:
             self.string += str(letter)
         return True if re.match(self.regex, self.string) else False
+
+    def to_dfa(self, alphabet: list = None):
+        """
+        Constructs the minimal DFA accepting exactly the strings matched by the regex, eg. as a reference model for
+        compare_automata.
+
+        Args:
+
+            alphabet: input alphabet. If None, alphabet passed to the constructor will be used.
+
+        Returns:
+
+            minimal DFA over the alphabet
+
+        """
+        from aalpy.automata import Dfa, DfaState
+
+        alphabet = alphabet if alphabet is not None else self.alphabet
+        assert alphabet is not None, 'Alphabet is required to construct the DFA.'
+        if self._nfa is None:
+            raise ValueError(f'Regex {self.regex} can not be converted to a DFA.')
+
+        # explore all states reachable over the alphabet
+        reachable = [self._initial]
+        visited = {self._initial}
+        for state_id in reachable:
+            for letter in alphabet:
+                target = self._dfa_step(state_id, letter)
+                if target not in visited:
+                    visited.add(target)
+                    reachable.append(target)
+
+        # partition refinement, states are equivalent if they are in the same block
+        block = {state_id: self._dfa_accepting[state_id] for state_id in reachable}
+        num_blocks = len(set(block.values()))
+        while True:
+            signatures = {state_id: (block[state_id],) + tuple(block[self._dfa_transitions[(state_id, letter)]]
+                                                               for letter in alphabet) for state_id in reachable}
+            block_ids = dict()
+            block = {state_id: block_ids.setdefault(signatures[state_id], len(block_ids)) for state_id in reachable}
+            if len(block_ids) == num_blocks:
+                break
+            num_blocks = len(block_ids)
+
+        states = dict()
+        for state_id in reachable:
+            if block[state_id] not in states:
+                state = DfaState(f's{len(states)}')
+                state.is_accepting = self._dfa_accepting[state_id]
+                states[block[state_id]] = state
+        for state_id in reachable:
+            state = states[block[state_id]]
+            for letter in alphabet:
+                state.transitions[letter] = states[block[self._dfa_transitions[(state_id, letter)]]]
+
+        return Dfa(states[block[self._initial]], list(states.values()))
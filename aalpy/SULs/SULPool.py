@@ -0,0 +1,135 @@
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from multiprocessing import Queue as ProcessQueue
+from queue import Queue
+
+from aalpy.base import SUL
+from aalpy.base.SUL import get_maximal_words, prefix_outputs, CacheSUL
+
+_worker_sul = None
+
+
+def _init_worker(replicas, cache):
+    global _worker_sul
+    _worker_sul = replicas.get()
+    if cache is not None:
+        # workers never end their session, so queries are not continued (see CacheSUL)
+        _worker_sul = CacheSUL(_worker_sul, cache, continue_queries=False)
+
+
+def _query_in_worker(words):
+    return [_worker_sul.query(word) for word in words]
+
+
+class SULPool(SUL):
+    """
+    System under learning that holds N independent replicas of the same system and executes batches of membership
+    queries on all of them in parallel. Replicas can be used from a pool of threads (suited for SULs that spend most of
+    their time waiting on I/O) or from a pool of processes (suited for CPU-bound SULs, replicas have to be picklable).
+    Step-wise interaction (pre/step/post), as used by most equivalence oracles, is performed on the first replica.
+    """
+
+    def __init__(self, suls: list, use_processes=False, chunks_per_worker=4, cache=None):
+        """
+        Args:
+
+            suls: list of independent replicas of the system under learning (replicas must not share state, eg.
+                automata SULs need a copy of the automaton each)
+
+            use_processes: if True, queries will be executed in a process pool, else in a thread pool
+
+            chunks_per_worker: each batch is split in (number of replicas * chunks_per_worker) chunks that are
+                executed as single tasks. Higher values give better load balancing, lower values less overhead.
+
+            cache: cache tree shared by all replicas, each replica is wrapped in a CacheSUL using it, so that a query is
+                executed at most once over all replicas. With use_processes=True the cache has to be a
+                SharedMemoryCacheTree, otherwise each process would work on its own copy of the cache.
+        """
+        super().__init__()
+        assert suls, 'At least one SUL replica is required.'
+        self.suls = suls
+        self.num_workers = len(suls)
+        self.use_processes = use_processes
+        self.chunks_per_worker = chunks_per_worker
+        self.cache = cache
+        self._executor = None
+        self._idle_suls = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.use_processes:
+                replicas = ProcessQueue()
+                for sul in self.suls:
+                    replicas.put(sul)
+                self._executor = ProcessPoolExecutor(max_workers=self.num_workers, initializer=_init_worker,
+                                                     initargs=(replicas, self.cache))
+            else:
+                self._idle_suls = Queue()
+                for sul in self.suls:
+                    self._idle_suls.put(CacheSUL(sul, self.cache, continue_queries=False)
+                                        if self.cache is not None else sul)
+                self._executor = ThreadPoolExecutor(max_workers=self.num_workers)
+        return self._executor
+
+    def _query_in_thread(self, words):
+        sul = self._idle_suls.get()
+        try:
+            return [sul.query(word) for word in words]
+        finally:
+            self._idle_suls.put(sul)
+
+    def query_batch(self, words: list) -> list:
+        """
+        Executes all membership queries in parallel on the replicas of the system under learning. Words that are
+        prefixes of other words in the batch are answered from the outputs of longer words.
+
+        Args:
+
+            words: list of membership queries
+
+        Returns:
+
+            list of output lists, in the same order as words
+
+        """
+        if not words:
+            return []
+
+        executor = self._get_executor()
+        task = _query_in_worker if self.use_processes else self._query_in_thread
+
+        maximal_words, covering_words = get_maximal_words(words)
+        chunk_size = max(1, -(-len(maximal_words) // (self.num_workers * self.chunks_per_worker)))
+        chunks = [maximal_words[i:i + chunk_size] for i in range(0, len(maximal_words), chunk_size)]
+
+        maximal_outputs = []
+        for chunk_outputs in executor.map(task, chunks):
+            maximal_outputs.extend(chunk_outputs)
+        maximal_outputs = dict(zip(maximal_words, maximal_outputs))
+
+        self.num_queries += len(maximal_words)
+        self.num_steps += sum(len(word) for word in maximal_words)
+        return [prefix_outputs(word, covering_word, maximal_outputs[covering_word])
+                for word, covering_word in zip(words, covering_words)]
+
+    def shutdown(self):
+        """
+        Shuts down the worker pool. Pool will be recreated if query_batch is called again.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def pre(self):
+        self.suls[0].pre()
+
+    def post(self):
+        self.suls[0].post()
+
+    def step(self, letter):
+        return self.suls[0].step(letter)
+
+    def save_state(self):
+        return self.suls[0].save_state()
+
+    def restore_state(self, token):
+        self.suls[0].restore_state(token)
@@ -0,0 +1,343 @@
+import json
+import socket
+import socketserver
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from queue import Queue, Empty
+
+from aalpy.base import SUL
+from aalpy.base.SUL import get_maximal_words, prefix_outputs
+
+_HEADER = struct.Struct('>I')
+
+
+def _send_frame(sock, message: dict):
+    payload = json.dumps(message).encode('utf-8')
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def _receive_exactly(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data.extend(chunk)
+    return bytes(data)
+
+
+def _receive_frame(sock):
+    header = _receive_exactly(sock, _HEADER.size)
+    if header is None:
+        return None
+    payload = _receive_exactly(sock, _HEADER.unpack(header)[0])
+    if payload is None:
+        return None
+    return json.loads(payload.decode('utf-8'))
+
+
+def _to_hashable(value):
+    # JSON turns tuples into lists, outputs are used as keys by the learning algorithms
+    if isinstance(value, list):
+        return tuple(_to_hashable(v) for v in value)
+    return value
+
+
+def _connect(address, timeout=None):
+    if isinstance(address, str):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.settimeout(timeout)
+    sock.connect(address)
+    return sock
+
+
+class SocketSUL(SUL):
+    """
+    System under learning that communicates with a SUL server (eg. SULServer) over TCP or a Unix socket.
+    Messages are JSON objects prefixed with their length (4 bytes, big endian):
+
+        {"op": "pre"}, {"op": "post"} -> {}
+        {"op": "step", "input": i} -> {"output": o}
+        {"op": "query", "word": [i1, i2, ...]} -> {"outputs": [o1, o2, ...]}
+
+    and errors are reported as {"error": message}. Inputs and outputs have to be serializable to JSON, lists in outputs
+    are converted to tuples. Each connection corresponds to an independent instance of the system on the server.
+    Connections are kept open in a pool and reused, so queries do not pay for connecting. Whole membership queries are
+    sent in a single message, and query_batch sends queries over several connections in parallel.
+    """
+
+    def __init__(self, address, pool_size=4, timeout=None):
+        """
+        Args:
+
+            address: (host, port) tuple for TCP, or path of the Unix socket
+
+            pool_size: maximum number of open connections, and number of queries executed in parallel by query_batch
+
+            timeout: timeout of socket operations in seconds, None to wait indefinitely
+        """
+        super().__init__()
+        self.address = address
+        self.pool_size = pool_size
+        self.timeout = timeout
+
+        self._idle_connections = Queue()
+        self._num_connections = 0
+        self._lock = threading.Lock()
+        # connection used by pre/step/post of the current thread
+        self._session = threading.local()
+        self._executor = None
+
+    def _acquire(self):
+        try:
+            return self._idle_connections.get_nowait()
+        except Empty:
+            pass
+        with self._lock:
+            create = self._num_connections < self.pool_size
+            if create:
+                self._num_connections += 1
+        if create:
+            try:
+                return _connect(self.address, self.timeout)
+            except OSError:
+                with self._lock:
+                    self._num_connections -= 1
+                raise
+        return self._idle_connections.get()
+
+    def _release(self, connection):
+        self._idle_connections.put(connection)
+
+    def _discard(self, connection):
+        connection.close()
+        with self._lock:
+            self._num_connections -= 1
+
+    def _request(self, connection, message: dict) -> dict:
+        # the caller keeps the ownership of the connection: it is broken if OSError is raised, while errors of the
+        # server (RuntimeError) leave it usable
+        _send_frame(connection, message)
+        response = _receive_frame(connection)
+        if response is None:
+            raise ConnectionError(f'Connection to {self.address} was closed by the server.')
+        if 'error' in response:
+            raise RuntimeError(f'SUL server error: {response["error"]}')
+        return response
+
+    def _query(self, word):
+        connection = self._acquire()
+        try:
+            response = self._request(connection, {'op': 'query', 'word': list(word)})
+        except OSError:
+            self._discard(connection)
+            raise
+        except RuntimeError:
+            self._release(connection)
+            raise
+        self._release(connection)
+        return [_to_hashable(o) for o in response['outputs']]
+
+    def _session_request(self, message: dict) -> dict:
+        connection = getattr(self._session, 'connection', None)
+        if connection is None:
+            raise RuntimeError(f'{message["op"]}() was called without pre().')
+        try:
+            return self._request(connection, message)
+        except OSError:
+            # the session ends with its broken connection, errors of the server keep it bound to the thread
+            self._session.connection = None
+            self._discard(connection)
+            raise
+
+    def query(self, word: tuple) -> list:
+        """
+        Performs a membership query on the server in a single request.
+
+        Args:
+
+            word: membership query (word consisting of letters/inputs)
+
+        Returns:
+
+            list of outputs, where the i-th output corresponds to the output of the system after the i-th input
+
+        """
+        out = self._query(word)
+        with self._lock:
+            self.num_queries += 1
+            self.num_steps += len(word)
+        return out
+
+    def query_batch(self, words: list) -> list:
+        """
+        Executes membership queries in parallel over the pooled connections. Words that are prefixes of other words in
+        the batch are answered from the outputs of longer words.
+
+        Args:
+
+            words: list of membership queries
+
+        Returns:
+
+            list of output lists, in the same order as words
+
+        """
+        if not words:
+            return []
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.pool_size)
+
+        maximal_words, covering_words = get_maximal_words(words)
+        maximal_outputs = dict(zip(maximal_words, self._executor.map(self._query, maximal_words)))
+
+        with self._lock:
+            self.num_queries += len(maximal_words)
+            self.num_steps += sum(len(word) for word in maximal_words)
+        return [prefix_outputs(word, covering_word, maximal_outputs[covering_word])
+                for word, covering_word in zip(words, covering_words)]
+
+    def pre(self):
+        """
+        Takes a connection from the pool for the step-wise interaction of the current thread, and resets the system.
+        """
+        if getattr(self._session, 'connection', None) is None:
+            self._session.connection = self._acquire()
+        self._session_request({'op': 'pre'})
+
+    def post(self):
+        """
+        Ends the step-wise interaction and returns its connection to the pool.
+        """
+        if getattr(self._session, 'connection', None) is None:
+            return
+        try:
+            self._session_request({'op': 'post'})
+        finally:
+            # None if the connection was discarded
+            connection = self._session.connection
+            if connection is not None:
+                self._session.connection = None
+                self._release(connection)
+
+    def step(self, letter):
+        """
+        Executes an input on the system and returns its output.
+
+        Args:
+
+            letter: Single input that is executed on the SUL.
+
+        Returns:
+
+            Output received after executing the input.
+
+        """
+        return _to_hashable(self._session_request({'op': 'step', 'input': letter})['output'])
+
+    def close(self):
+        """
+        Closes all idle connections.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        while True:
+            try:
+                self._discard(self._idle_connections.get_nowait())
+            except Empty:
+                break
+
+
+class _SULRequestHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        if self.server.socket.family == socket.AF_INET:
+            self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sul = deepcopy(self.server.sul)
+        while True:
+            message = _receive_frame(self.request)
+            if message is None:
+                return
+            try:
+                op = message['op']
+                if op == 'query':
+                    response = {'outputs': sul.query(tuple(message['word']))}
+                elif op == 'step':
+                    response = {'output': sul.step(message['input'])}
+                elif op == 'pre':
+                    sul.pre()
+                    response = {}
+                elif op == 'post':
+                    sul.post()
+                    response = {}
+                else:
+                    response = {'error': f'Unknown operation {op}.'}
+            except Exception as e:
+                response = {'error': repr(e)}
+            _send_frame(self.request, response)
+
+
+class _ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if hasattr(socketserver, 'ThreadingUnixStreamServer'):
+    class _ThreadingUnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+class SULServer:
+    """
+    Reference server for the SocketSUL, that exposes any SUL (eg. MealySUL of an automaton) over TCP or a Unix socket.
+    Each connection is served in its own thread, by its own deep copy of the SUL.
+    """
+
+    def __init__(self, sul: SUL, address=('localhost', 0)):
+        """
+        Args:
+
+            sul: system under learning that is served, it is copied for each connection
+
+            address: (host, port) tuple for TCP (port 0 selects a free port), or path of the Unix socket
+        """
+        if isinstance(address, str):
+            self.server = _ThreadingUnixServer(address, _SULRequestHandler)
+        else:
+            self.server = _ThreadingTCPServer(address, _SULRequestHandler)
+        self.server.sul = sul
+        self._thread = None
+
+    @property
+    def address(self):
+        """
+        Address the server is listening on, that can be passed to the SocketSUL.
+        """
+        return self.server.server_address
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def start(self):
+        """
+        Serves requests in a background thread.
+        """
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def shutdown(self):
+        """
+        Stops the server and closes its socket.
+        """
+        if self._thread is not None:
+            self.server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.server.server_close()
@@ -0,0 +1,160 @@
+import subprocess
+
+from aalpy.base import SUL
+
+
+class SubprocessSUL(SUL):
+    """
+    System under learning for command-line programs that read inputs from stdin and write outputs to stdout, one line
+    per input and one line per output. The program is started once and kept alive across queries; it is reset by
+    writing `reset_command` to it. Membership queries are pipelined, all inputs of a query are written at once and the
+    outputs are read afterwards, so the round trip to the program is paid once per query and not once per step.
+    """
+
+    def __init__(self, command, reset_command='RESET', reset_response=None, input_encoder=str, output_decoder=str,
+                 max_pipelined_inputs=256, cwd=None, env=None):
+        """
+        Args:
+
+            command: command starting the program, as passed to subprocess.Popen (list of arguments or a string)
+
+            reset_command: control line that resets the program to its initial state. If None, the program is restarted
+                on every reset.
+
+            reset_response: line that the program writes after it was reset, if any. It is read and checked on the
+                first output after the reset, so resets do not cost an extra round trip.
+
+            input_encoder: function converting an input to the line that is written to the program (without newline)
+
+            output_decoder: function converting a line written by the program (without newline) to an output
+
+            max_pipelined_inputs: maximum number of inputs written before their outputs are read. Outputs of all
+                pipelined inputs have to fit in the pipe buffer of the OS (usually 64KB), as the program blocks once
+                it is full.
+
+            cwd: working directory of the program
+
+            env: environment variables of the program
+        """
+        super().__init__()
+        self.command = command
+        self.reset_command = reset_command
+        self.reset_response = reset_response
+        self.input_encoder = input_encoder
+        self.output_decoder = output_decoder
+        self.max_pipelined_inputs = max_pipelined_inputs
+        self.cwd = cwd
+        self.env = env
+
+        self.process = None
+        self.num_starts = 0
+        # number of reset acknowledgments that were not read yet
+        self._pending_acks = 0
+
+    def _start(self):
+        self.process = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, cwd=self.cwd,
+                                        env=self.env, encoding='utf-8', bufsize=1 << 16)
+        self._pending_acks = 0
+        self.num_starts += 1
+
+    def _read_line(self):
+        line = self.process.stdout.readline()
+        if not line:
+            raise RuntimeError(f'Process {self.command} terminated unexpectedly '
+                               f'(exit code {self.process.poll()}).')
+        return line.rstrip('\n').rstrip('\r')
+
+    def _read_acks(self):
+        while self._pending_acks:
+            self._pending_acks -= 1
+            ack = self._read_line()
+            if ack != self.reset_response:
+                raise RuntimeError(f'Expected reset response {self.reset_response}, received {ack}.')
+
+    def _reset_lines(self):
+        """
+        Resets the program and returns the control line that has to be written to it, if any.
+        """
+        if self.process is None or self.process.poll() is not None or self.reset_command is None:
+            self.close()
+            self._start()
+            return ''
+        if self.reset_response is not None:
+            self._pending_acks += 1
+        return f'{self.reset_command}\n'
+
+    def _execute(self, lines, word):
+        outputs = []
+        for i in range(0, len(word), self.max_pipelined_inputs):
+            chunk = word[i:i + self.max_pipelined_inputs]
+            self.process.stdin.write(lines + ''.join(f'{self.input_encoder(letter)}\n' for letter in chunk))
+            self.process.stdin.flush()
+            lines = ''
+            self._read_acks()
+            outputs.extend(self.output_decoder(self._read_line()) for _ in chunk)
+        return outputs
+
+    def query(self, word: tuple) -> list:
+        """
+        Performs a membership query on the program. The reset and all inputs of the query are written to the program
+        at once, and outputs are read afterwards.
+
+        Args:
+
+            word: membership query (word consisting of letters/inputs)
+
+        Returns:
+
+            list of outputs, where the i-th output corresponds to the output of the system after the i-th input
+
+        """
+        lines = self._reset_lines()
+        # Empty string for DFA
+        out = self._execute(lines, word if len(word) > 0 else (None,))
+        self.num_queries += 1
+        self.num_steps += len(word)
+        return out
+
+    def pre(self):
+        """
+        Resets the program. The reset acknowledgment is read together with the output of the first step.
+        """
+        lines = self._reset_lines()
+        if lines:
+            self.process.stdin.write(lines)
+
+    def post(self):
+        pass
+
+    def step(self, letter):
+        """
+        Writes the input to the program and returns the output it writes.
+
+        Args:
+
+            letter: Single input that is executed on the SUL.
+
+        Returns:
+
+            Output received after executing the input.
+
+        """
+        return self._execute('', (letter,))[0]
+
+    def close(self):
+        """
+        Terminates the program.
+        """
+        if self.process is not None:
+            if self.process.poll() is None:
+                try:
+                    self.process.stdin.close()
+                except OSError:
+                    pass
+                try:
+                    self.process.wait(timeout=1)
+                except subprocess.TimeoutExpired:
+                    self.process.kill()
+                    self.process.wait()
+            self.process.stdout.close()
+            self.process = None
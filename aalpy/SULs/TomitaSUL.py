@@ -7,6 +7,9 @@ class TomitaSUL(SUL):
     """
     Tomita grammars are often used as a benchmark for automata-related challenges. Simple SUL that implements all 7
     Tomita grammars and enables their learning.
+    Letters are converted to strings and processed character by character. Instead of evaluating the grammar on the
+    whole word after each step, a constant-size state is updated, so that steps take constant time regardless of the
+    length of the word. Outputs are the same as of the functions tomita_1, ..., tomita_7 applied to the word.
     """
 
     def __init__(self, tomita_level_fun):
@@ -14,21 +17,21 @@ class TomitaSUL(SUL):
         num_fun_map = {1: tomita_1, 2: tomita_2, 3: tomita_3, 4: tomita_4, 5: tomita_5, 6: tomita_6, 7: tomita_7,
                        -3: not_tomita_3}
         assert tomita_level_fun in num_fun_map.keys()
-        self.string = ""
         self.tomita_level = num_fun_map[tomita_level_fun]
+        self.initial_state, self.step_fun, self.output_fun = _incremental_tomita[tomita_level_fun]
+        self.state = self.initial_state
 
     def pre(self):
-        self.string = ""
-        pass
+        self.state = self.initial_state
 
     def post(self):
-        self.string = ""
-        pass
+        self.state = self.initial_state
 
     def step(self, letter):
-        if input:
-            self.string += str(letter)
-        return self.tomita_level(self.string)
+        if letter is not None:
+            for char in str(letter):
+                self.state = self.step_fun(self.state, char)
+        return self.output_fun(self.state)
 
 
 _not_tomita_3 = re.compile("((0|1)*0)*1(11)*(0(0|1)*1)*0(00)*(1(0|1)*)*$")
@@ -66,3 +69,80 @@ def tomita_6(word):
 
 def tomita_7(word):
     return word.count("10") <= 1
+
+
+# Incremental versions of the Tomita grammars. Each grammar is given by its initial state, a step function computing
+# the next state from the current state and a character, and a function mapping states to outputs.
+
+def _tomita_1_step(seen_zero, char):
+    return seen_zero or char == '0'
+
+
+# states: 0 - word is a repetition of '10', 1 - word is a repetition of '10' followed by '1', 2 - neither
+def _tomita_2_step(state, char):
+    if state == 0:
+        return 1 if char == '1' else 2
+    if state == 1:
+        return 0 if char == '0' else 2
+    return 2
+
+
+# minimal DFA of _not_tomita_3 over '0' and '1'. Any other character leads to state 5, in which the word can not be
+# matched anymore. As '$' also matches before a newline at the end of the word, a newline read in a matching state
+# leads to state 6, which is matching unless another character follows.
+_not_tomita_3_transitions = {(0, '0'): 0, (0, '1'): 1, (1, '0'): 2, (1, '1'): 0, (2, '0'): 3, (2, '1'): 4,
+                             (3, '0'): 2, (3, '1'): 3, (4, '0'): 4, (4, '1'): 4}
+_not_tomita_3_matching = {2, 4, 6}
+
+
+def _not_tomita_3_step(state, char):
+    next_state = _not_tomita_3_transitions.get((state, char))
+    if next_state is not None:
+        return next_state
+    if char == '\n' and state in _not_tomita_3_matching and state != 6:
+        return 6
+    return 5
+
+
+# state is the length of the current run of zeros, up to 3
+def _tomita_4_step(zeros, char):
+    if zeros == 3:
+        return 3
+    return zeros + 1 if char == '0' else 0
+
+
+# state encodes the parity of zeros in bit 0 and the parity of ones in bit 1
+def _tomita_5_step(parities, char):
+    if char == '0':
+        return parities ^ 1
+    if char == '1':
+        return parities ^ 2
+    return parities
+
+
+def _tomita_6_step(difference, char):
+    if char == '0':
+        return (difference + 1) % 3
+    if char == '1':
+        return (difference - 1) % 3
+    return difference
+
+
+# state is the number of occurrences of '10', up to 2, and whether the last character was '1'
+def _tomita_7_step(state, char):
+    occurrences, last_one = state
+    if last_one and char == '0':
+        occurrences = min(occurrences + 1, 2)
+    return occurrences, char == '1'
+
+
+_incremental_tomita = {
+    1: (False, _tomita_1_step, lambda seen_zero: not seen_zero),
+    2: (0, _tomita_2_step, lambda state: state == 0),
+    3: (0, _not_tomita_3_step, lambda state: state not in _not_tomita_3_matching),
+    -3: (0, _not_tomita_3_step, lambda state: state in _not_tomita_3_matching),
+    4: (0, _tomita_4_step, lambda zeros: zeros < 3),
+    5: (0, _tomita_5_step, lambda parities: parities == 0),
+    6: (0, _tomita_6_step, lambda difference: difference == 0),
+    7: ((0, False), _tomita_7_step, lambda state: state[0] <= 1),
+}
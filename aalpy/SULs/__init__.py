@@ -1,4 +1,10 @@
 from .AutomataSUL import DfaSUL, MealySUL, MooreSUL, MdpSUL, OnfsmSUL, StochasticMealySUL, McSUL
 from .PyMethodSUL import FunctionDecorator, PyClassSUL
 from .RegexSUL import RegexSUL
-from .TomitaSUL import TomitaSUL
\ No newline at end of file
+from .TomitaSUL import TomitaSUL
+from .SULPool import SULPool
+from .SubprocessSUL import SubprocessSUL
+from .SocketSUL import SocketSUL, SULServer
+from .InstrumentedSUL import InstrumentedSUL, LatencyHistogram
+from .RecordingSUL import RecordingSUL, ReplaySUL, UnrecordedQueryError
+from .LatencySUL import LatencySUL, AsyncLatencySUL
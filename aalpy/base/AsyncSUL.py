@@ -0,0 +1,190 @@
+import asyncio
+from abc import ABC, abstractmethod
+
+from aalpy.base.SUL import SUL
+
+
+class AsyncSUL(ABC):
+    """
+    Asynchronous System Under Learning (SUL) abstract class. Counterpart of the SUL class for systems that spend most of
+    their time waiting on I/O (eg. network endpoints). One instance corresponds to a single connection to the system,
+    to keep several queries in flight use AsyncSULPool.
+    """
+
+    def __init__(self):
+        self.num_queries = 0
+        self.num_steps = 0
+        self.num_cached_queries = 0
+
+    async def query(self, word: tuple) -> list:
+        """
+        Performs a membership query on the SUL. Before the query, pre() method is awaited and after the query post()
+        method is awaited. Each letter in the word (input in the input sequence) is executed using the step method.
+
+        Args:
+
+            word: membership query (word consisting of letters/inputs)
+
+        Returns:
+
+            list of outputs, where the i-th output corresponds to the output of the system after the i-th input
+
+        """
+        await self.pre()
+        # Empty string for DFA
+        if len(word) == 0:
+            out = [await self.step(None)]
+        else:
+            out = [await self.step(letter) for letter in word]
+        await self.post()
+        self.num_queries += 1
+        self.num_steps += len(word)
+        return out
+
+    async def query_batch(self, words: list) -> list:
+        """
+        Performs membership queries for all words in `words`. As a single instance corresponds to a single connection,
+        queries are executed one after another.
+
+        Args:
+
+            words: list of membership queries
+
+        Returns:
+
+            list of output lists, where the i-th element corresponds to the outputs of the i-th word
+
+        """
+        return [await self.query(word) for word in words]
+
+    @abstractmethod
+    async def pre(self):
+        """
+        Resets the system. Called after post method in the equivalence query.
+        """
+        pass
+
+    @abstractmethod
+    async def post(self):
+        """
+        Performs additional cleanup on the system in necessary. Called before pre method in the equivalence query.
+        """
+        pass
+
+    @abstractmethod
+    async def step(self, letter):
+        """
+        Executes an action on the system under learning and returns its result.
+
+        Args:
+
+            letter: Single input that is executed on the SUL.
+
+        Returns:
+
+            Output received after executing the input.
+
+        """
+        pass
+
+
+class AsyncSULPool(AsyncSUL):
+    """
+    Asynchronous SUL that distributes membership queries over several connections to the system under learning, so
+    that up to K = len(suls) queries are in flight at the same time.
+    Step-wise interaction (pre/step/post), as used by equivalence oracles, is performed on the first connection.
+    """
+
+    def __init__(self, suls: list):
+        """
+        Args:
+
+            suls: list of AsyncSUL instances, each corresponding to a separate connection
+        """
+        super().__init__()
+        assert suls, 'At least one connection is required.'
+        self.suls = suls
+
+    async def query_batch(self, words: list) -> list:
+        """
+        Performs membership queries with up to len(suls) queries in flight. The order of outputs corresponds to the
+        order of words, regardless of the order in which queries are completed.
+
+        Args:
+
+            words: list of membership queries
+
+        Returns:
+
+            list of output lists, where the i-th element corresponds to the outputs of the i-th word
+
+        """
+        idle_suls = asyncio.Queue()
+        for sul in self.suls:
+            idle_suls.put_nowait(sul)
+
+        async def query_on_idle_sul(word):
+            sul = await idle_suls.get()
+            try:
+                return await sul.query(word)
+            finally:
+                idle_suls.put_nowait(sul)
+
+        outputs = await asyncio.gather(*[query_on_idle_sul(word) for word in words])
+
+        self.num_queries += len(words)
+        self.num_steps += sum(len(word) for word in words)
+        return list(outputs)
+
+    async def pre(self):
+        await self.suls[0].pre()
+
+    async def post(self):
+        await self.suls[0].post()
+
+    async def step(self, letter):
+        return await self.suls[0].step(letter)
+
+
+class SyncSULAdapter(SUL):
+    """
+    Synchronous view of an AsyncSUL. All calls are scheduled on the event loop `loop` and block until they are
+    completed, therefore methods of this class must not be called from the thread running the event loop.
+    Used to execute synchronous equivalence oracles and counterexample processing against an AsyncSUL.
+    """
+
+    def __init__(self, sul: AsyncSUL, loop):
+        """
+        Args:
+
+            sul: asynchronous system under learning
+
+            loop: running event loop on which the coroutines of the sul are executed
+        """
+        super().__init__()
+        self.sul = sul
+        self.loop = loop
+
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def query(self, word: tuple) -> list:
+        out = self._run(self.sul.query(word))
+        self.num_queries += 1
+        self.num_steps += len(word)
+        return out
+
+    def query_batch(self, words: list) -> list:
+        outputs = self._run(self.sul.query_batch(words))
+        self.num_queries += len(words)
+        self.num_steps += sum(len(word) for word in words)
+        return outputs
+
+    def pre(self):
+        self._run(self.sul.pre())
+
+    def post(self):
+        self._run(self.sul.post())
+
+    def step(self, letter):
+        return self._run(self.sul.step(letter))
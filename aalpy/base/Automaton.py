@@ -238,6 +238,33 @@ class DeterministicAutomaton(Automaton):
 
         raise SystemExit('Distinguishing sequence could not be computed (Non-canonical automaton).')
 
+    def compute_homing_sequence(self) -> tuple:
+        """
+        Computes a homing sequence, that is, an input sequence whose output response determines the state reached after
+        executing it, regardless of the state it was executed from. While two different states are reached with the
+        same response, the sequence is extended with a sequence distinguishing them.
+        Only applicable to minimal automata.
+
+        Returns: homing sequence
+
+        """
+        state_save = self.current_state
+        homing_seq = []
+        while True:
+            reached_states = dict()
+            conflict = None
+            for state in self.states:
+                response = tuple(self.execute_sequence(state, homing_seq))
+                reached_state = reached_states.setdefault(response, self.current_state)
+                if reached_state != self.current_state:
+                    conflict = (reached_state, self.current_state)
+                    break
+
+            if conflict is None:
+                self.current_state = state_save
+                return tuple(homing_seq)
+            homing_seq.extend(self.find_distinguishing_seq(*conflict))
+
     def compute_output_seq(self, state, sequence):
         """
         Given an input sequence, compute the output response from a given state.
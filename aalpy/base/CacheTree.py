@@ -1,3 +1,7 @@
+import heapq
+import threading
+from array import array
+
 
 class Node(object):
     def __init__(self, value=None):
@@ -5,6 +9,26 @@ class Node(object):
         self.children = {}
 
 
+class BoundedNode(Node):
+    def __init__(self, value=None):
+        super().__init__(value)
+        self.last_access = 0
+        self.num_accesses = 0
+        self.pinned = False
+
+
+class _Cursor(threading.local):
+    """
+    Position of a traversal of the cache tree together with the inputs and outputs that lead to it. Each thread has its
+    own cursor, so that several threads can step through the same tree at once.
+    """
+
+    def __init__(self):
+        self.node = None
+        self.inputs = []
+        self.outputs = []
+
+
 class CacheTree:
     """
     Tree in which all membership queries and corresponding outputs/values are stored. Membership queries update the tree
@@ -12,18 +36,35 @@ class CacheTree:
     Root node corresponds to the initial state, and from that point on, for every new input/output pair, a new child is
     created where the output is the value of the child, and the input is the transition leading from the parent to the
     child.
+    The tree is thread-safe: the traversal started by reset and continued by step_in_cache is local to the calling
+    thread, and new nodes are inserted under a lock.
     """
 
+    node_class = Node
+
     def __init__(self):
-        self.root_node = Node()
-        self.curr_node = None
-        self.inputs = []
-        self.outputs = []
+        self.root_node = self.node_class()
+        self.lock = threading.RLock()
+        self.cursor = _Cursor()
+        self.num_nodes = 1
+
+    @property
+    def curr_node(self):
+        return self.cursor.node
+
+    @property
+    def inputs(self):
+        return self.cursor.inputs
+
+    @property
+    def outputs(self):
+        return self.cursor.outputs
 
     def reset(self):
-        self.curr_node = self.root_node
-        self.inputs = []
-        self.outputs = []
+        cursor = self.cursor
+        cursor.node = self.root_node
+        cursor.inputs = []
+        cursor.outputs = []
 
     def step_in_cache(self, inp, out):
         """
@@ -35,27 +76,37 @@ class CacheTree:
             out: output
 
         """
-        self.inputs.append(inp)
-        self.outputs.append(out)
+        cursor = self.cursor
+        cursor.inputs.append(inp)
+        cursor.outputs.append(out)
         if inp is None:
             self.root_node.value = out
             return
 
-        if inp not in self.curr_node.children.keys():
-            node = Node(out)
-            self.curr_node.children[inp] = node
-        else:
-            node = self.curr_node.children[inp]
-            if node.value != out:
-                expected_seq = list(self.outputs[:-1])
-                expected_seq.append(node.value)
-                msg = f'Non-determinism detected.\n' \
-                      f'Error inserting: {self.inputs}\n' \
-                      f'Conflict detected: {node.value} vs {out}\n' \
-                      f'Expected Output: {expected_seq}\n' \
-                      f'Received output: {self.outputs}'
-                raise SystemExit(msg)
-        self.curr_node = node
+        node = cursor.node.children.get(inp)
+        if node is None:
+            with self.lock:
+                # node might have been inserted by another thread in the meantime
+                node = cursor.node.children.get(inp)
+                if node is None:
+                    node = self._insert_child(cursor.node, inp, out)
+        if node.value != out:
+            expected_seq = list(cursor.outputs[:-1])
+            expected_seq.append(node.value)
+            msg = f'Non-determinism detected.\n' \
+                  f'Error inserting: {cursor.inputs}\n' \
+                  f'Conflict detected: {node.value} vs {out}\n' \
+                  f'Expected Output: {expected_seq}\n' \
+                  f'Received output: {cursor.outputs}'
+            raise SystemExit(msg)
+        cursor.node = node
+
+    def _insert_child(self, parent, inp, out):
+        # called while holding the lock
+        self.num_nodes += 1
+        node = self.node_class(out)
+        parent.children[inp] = node
+        return node
 
     def in_cache(self, input_seq: tuple):
         """
@@ -71,14 +122,444 @@ class CacheTree:
             outputs associated with inputs if it is in the query, None otherwise
 
         """
-        curr_node = self.root_node
-
         output_seq = []
+        if self._find(self.root_node, input_seq, output_seq) is None:
+            return None
+        return output_seq
+
+    def _find(self, node, input_seq, output_seq: list):
+        # follows input_seq from node and appends the outputs to output_seq, returns None if it is not in the cache
         for letter in input_seq:
-            if letter in curr_node.children.keys():
-                curr_node = curr_node.children[letter]
-                output_seq.append(curr_node.value)
-            else:
+            node = node.children.get(letter)
+            if node is None:
                 return None
+            output_seq.append(node.value)
+        return node
+
+    def in_cache_batch(self, prefix: tuple, suffixes: list):
+        """
+        Looks up the membership queries prefix + suffix for all suffixes, the prefix is traversed only once.
+
+        Args:
+
+            prefix: common prefix of the membership queries
+
+            suffixes: list of suffixes
+
+        Returns:
+
+            list in which the i-th element are the outputs of prefix + suffixes[i] if it is in the cache, None otherwise
+
+        """
+        prefix_outputs = []
+        node = self._find(self.root_node, prefix, prefix_outputs)
+        if node is None:
+            return [None] * len(suffixes)
+
+        outputs = []
+        for suffix in suffixes:
+            output_seq = list(prefix_outputs)
+            outputs.append(output_seq if self._find(node, suffix, output_seq) is not None else None)
+        return outputs
+
+
+class BoundedCacheTree(CacheTree):
+    """
+    Cache tree with a bounded number of nodes. Once the number of nodes exceeds `max_nodes`, cold subtrees are evicted
+    until `eviction_ratio` * `max_nodes` nodes remain. Subtrees are ranked either by the time of the last access ('lru')
+    or by the number of accesses ('lfu'). As every access of a node also accesses all of its ancestors, a node is never
+    colder than any node in its subtree, so whole subtrees can be evicted at once.
+    Paths of pinned queries are never evicted. If enabled by the learning algorithm (see CacheSUL.pin_queries), pins
+    follow the current observation table: membership queries of the learning phase are pinned, and after each round
+    the pins are replaced by the S.A.E queries of the table. Traces of equivalence oracles (eg. long random walks) are
+    never pinned, so they are subject to eviction.
+    Eviction happens only on reset, so the path that is currently being traversed is never evicted.
+    """
+
+    node_class = BoundedNode
+
+    def __init__(self, max_nodes: int, eviction_policy='lru', eviction_ratio=0.8):
+        """
+        Args:
+
+            max_nodes: maximum number of nodes in the tree
 
+            eviction_policy: either 'lru' (least recently used) or 'lfu' (least frequently used)
+
+            eviction_ratio: fraction of max_nodes that remains in the tree after the eviction
+        """
+        assert eviction_policy in ['lru', 'lfu']
+        assert 0 <= eviction_ratio < 1
+        super().__init__()
+        self.max_nodes = max_nodes
+        self.eviction_policy = eviction_policy
+        self.eviction_ratio = eviction_ratio
+        self.root_node.pinned = True
+
+        self.time = 0
+        self.num_hits = 0
+        self.num_misses = 0
+        self.num_evictions = 0
+        self.num_evicted_nodes = 0
+
+    def reset(self):
+        if self.num_nodes > self.max_nodes:
+            with self.lock:
+                if self.num_nodes > self.max_nodes:
+                    self.evict(int(self.max_nodes * self.eviction_ratio))
+        super().reset()
+        self.time += 1
+
+    def step_in_cache(self, inp, out):
+        """
+        Preform a step in the cache. If output exist for the current state, and is not the same as `out`, throw
+        the non-determinism violation error and abort learning.
+        Args:
+
+            inp: input
+            out: output
+
+        """
+        super().step_in_cache(inp, out)
+        if inp is not None:
+            node = self.cursor.node
+            node.last_access = self.time
+            node.num_accesses += 1
+
+    def in_cache(self, input_seq: tuple):
+        """
+        Check if the result of the membership query for input_seq is cached is in the tree. If it is, return the
+        corresponding output sequence. Accessed nodes are marked as recently used.
+
+        Args:
+
+            input_seq: corresponds to the membership query
+
+        Returns:
+
+            outputs associated with inputs if it is in the query, None otherwise
+
+        """
+        self.time += 1
+        output_seq = []
+        if self._find(self.root_node, input_seq, output_seq) is None:
+            self.num_misses += 1
+            return None
+        self.num_hits += 1
         return output_seq
+
+    def _find(self, node, input_seq, output_seq: list):
+        for letter in input_seq:
+            node = node.children.get(letter)
+            if node is None:
+                return None
+            node.last_access = self.time
+            node.num_accesses += 1
+            output_seq.append(node.value)
+        return node
+
+    def in_cache_batch(self, prefix: tuple, suffixes: list):
+        """
+        Looks up the membership queries prefix + suffix for all suffixes, the prefix is traversed only once.
+
+        Args:
+
+            prefix: common prefix of the membership queries
+
+            suffixes: list of suffixes
+
+        Returns:
+
+            list in which the i-th element are the outputs of prefix + suffixes[i] if it is in the cache, None otherwise
+
+        """
+        self.time += 1
+        outputs = super().in_cache_batch(prefix, suffixes)
+        num_hits = sum(1 for output_seq in outputs if output_seq is not None)
+        self.num_hits += num_hits
+        self.num_misses += len(outputs) - num_hits
+        return outputs
+
+    def pin(self, input_seq: tuple):
+        """
+        Pin the path of input_seq, so that it is never evicted.
+
+        Args:
+
+            input_seq: input sequence whose path is pinned, only the part of the path that is in the tree is pinned
+
+        """
+        curr_node = self.root_node
+        for letter in input_seq:
+            curr_node = curr_node.children.get(letter)
+            if curr_node is None:
+                return
+            curr_node.pinned = True
+
+    def unpin_all(self):
+        """
+        Releases all pins, except the one of the root node.
+        """
+        with self.lock:
+            pinned_nodes = [self.root_node]
+            while pinned_nodes:
+                node = pinned_nodes.pop()
+                for child in node.children.values():
+                    if child.pinned:
+                        child.pinned = False
+                        pinned_nodes.append(child)
+
+    def evict(self, target_num_nodes: int):
+        """
+        Evict the coldest unpinned subtrees until at most target_num_nodes remain in the tree. Traversals of other
+        threads that are inside an evicted subtree continue in the detached subtree and are not cached.
+
+        Args:
+
+            target_num_nodes: number of nodes that should remain in the tree
+
+        """
+        with self.lock:
+            self._evict(target_num_nodes)
+
+    def _evict(self, target_num_nodes):
+        rank = (lambda n: n.last_access) if self.eviction_policy == 'lru' else (lambda n: n.num_accesses)
+
+        # roots of unpinned subtrees
+        candidates = []
+        pinned_nodes = [self.root_node]
+        while pinned_nodes:
+            node = pinned_nodes.pop()
+            for inp, child in node.children.items():
+                if child.pinned:
+                    pinned_nodes.append(child)
+                else:
+                    candidates.append((rank(child), len(candidates), node, inp))
+        heapq.heapify(candidates)
+
+        while self.num_nodes > target_num_nodes and candidates:
+            _, _, parent, inp = heapq.heappop(candidates)
+            subtree_size = self._subtree_size(parent.children.pop(inp))
+            self.num_nodes -= subtree_size
+            self.num_evicted_nodes += subtree_size
+            self.num_evictions += 1
+
+    @staticmethod
+    def _subtree_size(node):
+        size = 0
+        nodes = [node]
+        while nodes:
+            size += 1
+            nodes.extend(nodes.pop().children.values())
+        return size
+
+    def get_stats(self) -> dict:
+        """
+        Returns:
+
+            dictionary containing the number of cache hits, misses, evictions, evicted nodes and current number of nodes
+
+        """
+        return {'hits': self.num_hits, 'misses': self.num_misses, 'evictions': self.num_evictions,
+                'evicted_nodes': self.num_evicted_nodes, 'num_nodes': self.num_nodes, 'max_nodes': self.max_nodes}
+
+
+class _CompactNodeView:
+    """
+    Read-only view of a node of the CompactCacheTree that mimics the interface of the Node class.
+    """
+
+    def __init__(self, tree, index):
+        self._tree = tree
+        self._index = index
+
+    @property
+    def value(self):
+        if self._index == 0:
+            return self._tree.root_value
+        return self._tree.output_symbols[self._tree.node_output[self._index]]
+
+    @property
+    def children(self):
+        tree = self._tree
+        children = dict()
+        child = tree.first_child[self._index]
+        while child != -1:
+            children[tree.input_symbols[tree.node_input[child]]] = _CompactNodeView(tree, child)
+            child = tree.next_sibling[child]
+        return children
+
+
+class CompactCacheTree:
+    """
+    Memory efficient alternative to the CacheTree with the same semantics. Inputs and outputs are interned to integers
+    and the tree is stored in parallel flat arrays, where each node is described by its first child, its next sibling,
+    its parent, and the interned input leading to it and output observed in it. Children of a node form a linked list
+    of siblings, so the memory per node does not depend on the size of the input alphabet.
+    Inputs and outputs have to be hashable. Like the CacheTree, the tree can be traversed by several threads at once.
+    """
+
+    def __init__(self):
+        self.input_ids = dict()
+        self.input_symbols = []
+        self.output_ids = dict()
+        self.output_symbols = []
+
+        # node with index 0 is the root node
+        self.first_child = array('i', [-1])
+        self.next_sibling = array('i', [-1])
+        self.parent = array('i', [-1])
+        self.node_input = array('i', [-1])
+        self.node_output = array('i', [-1])
+        self.root_value = None
+
+        self.lock = threading.RLock()
+        self.cursor = _Cursor()
+        self.cursor.node = 0
+
+    @property
+    def curr_node(self):
+        node = self.cursor.node
+        return 0 if node is None else node
+
+    @property
+    def root_node(self):
+        return _CompactNodeView(self, 0)
+
+    @property
+    def num_nodes(self):
+        return len(self.node_output)
+
+    def _intern(self, symbol, ids: dict, symbols: list):
+        symbol_id = ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = len(symbols)
+            ids[symbol] = symbol_id
+            symbols.append(symbol)
+        return symbol_id
+
+    def _get_child(self, node, input_id):
+        child = self.first_child[node]
+        node_input = self.node_input
+        while child != -1 and node_input[child] != input_id:
+            child = self.next_sibling[child]
+        return child
+
+    def _trace_to(self, node):
+        inputs, outputs = [], []
+        while node > 0:
+            inputs.append(self.input_symbols[self.node_input[node]])
+            outputs.append(self.output_symbols[self.node_output[node]])
+            node = self.parent[node]
+        inputs.reverse()
+        outputs.reverse()
+        return inputs, outputs
+
+    def reset(self):
+        self.cursor.node = 0
+
+    def step_in_cache(self, inp, out):
+        """
+        Preform a step in the cache. If output exist for the current state, and is not the same as `out`, throw
+        the non-determinism violation error and abort learning.
+        Args:
+
+            inp: input
+            out: output
+
+        """
+        if inp is None:
+            self.root_value = out
+            return
+
+        curr_node = self.curr_node
+        input_id = self.input_ids.get(inp)
+        output_id = self.output_ids.get(out)
+        node = self._get_child(curr_node, input_id) if input_id is not None else -1
+        if node == -1 or output_id is None:
+            with self.lock:
+                input_id = self._intern(inp, self.input_ids, self.input_symbols)
+                output_id = self._intern(out, self.output_ids, self.output_symbols)
+                node = self._get_child(curr_node, input_id)
+                if node == -1:
+                    node = len(self.node_output)
+                    self.first_child.append(-1)
+                    self.next_sibling.append(self.first_child[curr_node])
+                    self.parent.append(curr_node)
+                    self.node_input.append(input_id)
+                    self.node_output.append(output_id)
+                    # node is linked to its parent last, so that readers never see a partially inserted node
+                    self.first_child[curr_node] = node
+        if self.node_output[node] != output_id:
+            inputs, outputs = self._trace_to(curr_node)
+            expected_seq = list(outputs)
+            expected_seq.append(self.output_symbols[self.node_output[node]])
+            inputs.append(inp)
+            outputs.append(out)
+            msg = f'Non-determinism detected.\n' \
+                  f'Error inserting: {inputs}\n' \
+                  f'Conflict detected: {expected_seq[-1]} vs {out}\n' \
+                  f'Expected Output: {expected_seq}\n' \
+                  f'Received output: {outputs}'
+            raise SystemExit(msg)
+        self.cursor.node = node
+
+    def in_cache(self, input_seq: tuple):
+        """
+        Check if the result of the membership query for input_seq is cached is in the tree. If it is, return the
+        corresponding output sequence.
+
+        Args:
+
+            input_seq: corresponds to the membership query
+
+        Returns:
+
+            outputs associated with inputs if it is in the query, None otherwise
+
+        """
+        output_ids = []
+        if self._find(0, input_seq, output_ids) == -1:
+            return None
+        return [self.output_symbols[o] for o in output_ids]
+
+    def _find(self, node, input_seq, output_ids: list):
+        # follows input_seq from node and appends the output ids to output_ids, returns -1 if it is not in the cache
+        for letter in input_seq:
+            input_id = self.input_ids.get(letter)
+            if input_id is None:
+                return -1
+            node = self._get_child(node, input_id)
+            if node == -1:
+                return -1
+            output_ids.append(self.node_output[node])
+        return node
+
+    def in_cache_batch(self, prefix: tuple, suffixes: list):
+        """
+        Looks up the membership queries prefix + suffix for all suffixes, the prefix is traversed only once.
+
+        Args:
+
+            prefix: common prefix of the membership queries
+
+            suffixes: list of suffixes
+
+        Returns:
+
+            list in which the i-th element are the outputs of prefix + suffixes[i] if it is in the cache, None otherwise
+
+        """
+        prefix_ids = []
+        node = self._find(0, prefix, prefix_ids)
+        if node == -1:
+            return [None] * len(suffixes)
+
+        outputs = []
+        for suffix in suffixes:
+            output_ids = list(prefix_ids)
+            if self._find(node, suffix, output_ids) == -1:
+                outputs.append(None)
+            else:
+                outputs.append([self.output_symbols[o] for o in output_ids])
+        return outputs
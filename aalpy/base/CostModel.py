@@ -0,0 +1,47 @@
+class CostModel:
+    """
+    Cost of interacting with the system under learning, in arbitrary units (eg. seconds). A reset costs `reset_cost`,
+    and a step costs `step_cost` unless a different cost is defined for its input in `input_costs`.
+    """
+
+    def __init__(self, reset_cost=1.0, step_cost=1.0, input_costs: dict = None):
+        """
+        Args:
+
+            reset_cost: cost of a reset (Default value = 1.0)
+
+            step_cost: cost of a step (Default value = 1.0)
+
+            input_costs: dictionary mapping inputs to the costs of their steps, overrides step_cost for these inputs
+        """
+        assert reset_cost >= 0 and step_cost >= 0
+        self.reset_cost = reset_cost
+        self.step_cost = step_cost
+        self.input_costs = input_costs if input_costs is not None else dict()
+
+    def input_cost(self, letter):
+        return self.input_costs.get(letter, self.step_cost)
+
+    def word_cost(self, word) -> float:
+        """
+        Returns:
+
+            cost of executing all inputs of the word, without the reset
+        """
+        if not self.input_costs:
+            return self.step_cost * len(word)
+        return sum(self.input_costs.get(letter, self.step_cost) for letter in word)
+
+    def query_cost(self, word) -> float:
+        """
+        Returns:
+
+            cost of a membership query, ie. of a reset followed by the execution of the word
+        """
+        return self.reset_cost + self.word_cost(word)
+
+    def estimate(self, num_resets: int, num_steps: int) -> float:
+        """
+        Estimates the cost from the number of resets and steps, without per-input costs.
+        """
+        return self.reset_cost * num_resets + self.step_cost * num_steps
@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
 
 from aalpy.base import SUL
+from aalpy.base.SUL import set_sul_phase
 
 
 class Oracle(ABC):
@@ -20,6 +21,11 @@ class Oracle(ABC):
         self.sul = sul
         self.num_queries = 0
         self.num_steps = 0
+        # cost of resets and steps (see CostModel), used by oracles that take it into account when choosing tests
+        self.cost_model = None
+        # SUL snapshots of states reached by access sequences, used if the SUL supports save_state/restore_state
+        self.snapshots = dict()
+        self.snapshots_sul = None
 
     @abstractmethod
     def find_cex(self, hypothesis):
@@ -49,4 +55,77 @@ class Oracle(ABC):
         hypothesis.reset_to_initial()
         self.sul.post()
         self.sul.pre()
-        self.num_queries += 1
\ No newline at end of file
+        self.num_queries += 1
+
+    def reset_to_state(self, hypothesis, state):
+        """
+        Reset SUL and hypothesis and bring both to the `state` of the hypothesis, ie. execute its prefix. If the SUL
+        supports snapshots (see SUL.save_state), the prefix is executed only once and the SUL state reached by it is
+        restored afterwards.
+
+        Args:
+
+            hypothesis: current hypothesis
+
+            state: state of the hypothesis with prefix (access sequence) set
+
+        """
+        if self.snapshots_sul is not self.sul:
+            # snapshots are only valid for the SUL they were taken from
+            self.snapshots.clear()
+            self.snapshots_sul = self.sul
+
+        token = self.snapshots.get(state.prefix)
+        if token is not None:
+            self.sul.post()
+            self.sul.restore_state(token)
+            hypothesis.current_state = state
+            self.num_queries += 1
+            return
+
+        self.reset_hyp_and_sul(hypothesis)
+        for p in state.prefix:
+            hypothesis.step(p)
+            self.sul.step(p)
+            self.num_steps += 1
+
+        token = self.sul.save_state()
+        if token is not None:
+            self.snapshots[state.prefix] = token
+
+    def find_cex_in_batch(self, hypothesis, test_cases: list):
+        """
+        Executes all test cases on the SUL as a single batch of membership queries (see SUL.query_batch) and compares
+        their outputs with the outputs of the hypothesis. Only applicable to deterministic hypotheses.
+
+        Args:
+
+            hypothesis: current hypothesis
+
+            test_cases: list of input sequences
+
+        Returns:
+
+            shortest prefix of the first test case that leads to a different output, None if all test cases pass
+        """
+        queries, steps, cached_queries = self.sul.num_queries, self.sul.num_steps, self.sul.num_cached_queries
+        # statistics of the CacheSUL (see get_cache_report) are recorded in the phase of the oracle
+        phase = getattr(self.sul, 'phase', None)
+        set_sul_phase(self.sul, f'eq_oracle:{type(self).__name__}')
+        sul_outputs = self.sul.query_batch(test_cases)
+        if phase is not None:
+            set_sul_phase(self.sul, phase)
+
+        # only queries executed on the SUL are counted, not those answered from the cache or by longer test cases
+        self.num_queries += self.sul.num_queries - queries
+        self.num_steps += self.sul.num_steps - steps
+        # queries performed on behalf of the oracle are not counted as queries of the learning algorithm
+        self.sul.num_queries, self.sul.num_steps = queries, steps
+        self.sul.num_cached_queries = cached_queries
+
+        for test_case, sul_output in zip(test_cases, sul_outputs):
+            hyp_output = hypothesis.execute_sequence(hypothesis.initial_state, test_case)
+            for index, (out_sul, out_hyp) in enumerate(zip(sul_output, hyp_output)):
+                if out_sul != out_hyp:
+                    return tuple(test_case[:index + 1])
+        return None
@@ -0,0 +1,268 @@
+import pickle
+import sqlite3
+import threading
+
+from aalpy.base.CacheTree import _Cursor
+
+
+class _PersistentNodeView:
+    """
+    Read-only view of a node of the PersistentCacheTree that mimics the interface of the Node class.
+    """
+
+    def __init__(self, tree, node_id, value):
+        self._tree = tree
+        self._node_id = node_id
+        self.value = value
+
+    @property
+    def children(self):
+        with self._tree.lock:
+            rows = self._tree.connection.execute('SELECT id, input, output FROM nodes WHERE parent = ?',
+                                                 (self._node_id,)).fetchall()
+        return {self._tree._get_symbol(inp): _PersistentNodeView(self._tree, node_id, self._tree._get_symbol(out))
+                for node_id, inp, out in rows}
+
+
+class PersistentCacheTree:
+    """
+    Cache tree stored in a SQLite database file, so that cached queries survive process restarts. It has the same
+    semantics as the CacheTree, including the non-determinism check against outputs stored in previous runs.
+    Inputs and outputs are pickled and interned in a symbol table, so they have to be picklable and hashable. As they
+    are unpickled when the cache is opened, only use cache files from trusted sources: a crafted file can execute
+    arbitrary code.
+    The database is used in the WAL mode, so several processes can read the cache while one of them is writing to it.
+    Changes are committed after each query (on reset) and on close.
+    Several threads can step through the tree at once, each of them has its own traversal and the database connection
+    is used under a lock.
+    """
+
+    def __init__(self, path: str, read_only=False):
+        """
+        Args:
+
+            path: path to the database file, file will be created if it does not exist
+
+            read_only: if True, cache file will be opened in read only mode and new steps will not be stored
+        """
+        self.path = path
+        self.read_only = read_only
+        if read_only:
+            self.connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True, check_same_thread=False, timeout=30)
+        else:
+            self.connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS symbols (id INTEGER PRIMARY KEY, value BLOB UNIQUE)')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS nodes (id INTEGER PRIMARY KEY, parent INTEGER, '
+                                    'input INTEGER, output INTEGER, UNIQUE (parent, input))')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS root (id INTEGER PRIMARY KEY, value BLOB)')
+            self.connection.execute('INSERT OR IGNORE INTO nodes (id, parent, input, output) VALUES (0, -1, -1, -1)')
+            self.connection.commit()
+
+        self.symbol_ids = dict()
+        self.symbols = dict()
+        for symbol_id, value in self.connection.execute('SELECT id, value FROM symbols').fetchall():
+            symbol = pickle.loads(value)
+            self.symbols[symbol_id] = symbol
+            self.symbol_ids[symbol] = symbol_id
+
+        self.lock = threading.RLock()
+        self.cursor = _Cursor()
+        self.num_uncommitted = 0
+
+    @property
+    def curr_node(self):
+        return self.cursor.node
+
+    @property
+    def inputs(self):
+        return self.cursor.inputs
+
+    @property
+    def outputs(self):
+        return self.cursor.outputs
+
+    @property
+    def root_node(self):
+        return _PersistentNodeView(self, 0, self._get_root_value())
+
+    @property
+    def num_nodes(self):
+        with self.lock:
+            return self.connection.execute('SELECT COUNT(*) FROM nodes').fetchone()[0]
+
+    def _get_root_value(self):
+        with self.lock:
+            row = self.connection.execute('SELECT value FROM root WHERE id = 0').fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def _get_symbol(self, symbol_id):
+        if symbol_id not in self.symbols:
+            # symbol added by another process
+            with self.lock:
+                value = self.connection.execute('SELECT value FROM symbols WHERE id = ?', (symbol_id,)).fetchone()[0]
+            symbol = pickle.loads(value)
+            self.symbols[symbol_id] = symbol
+            self.symbol_ids[symbol] = symbol_id
+        return self.symbols[symbol_id]
+
+    def _get_symbol_id(self, symbol, insert=True):
+        symbol_id = self.symbol_ids.get(symbol)
+        if symbol_id is not None:
+            return symbol_id
+
+        value = pickle.dumps(symbol, protocol=4)
+        with self.lock:
+            if insert:
+                # UNIQUE (value) keeps the symbol inserted by another process in the meantime
+                if self.connection.execute('INSERT OR IGNORE INTO symbols (value) VALUES (?)', (value,)).rowcount:
+                    self.num_uncommitted += 1
+            row = self.connection.execute('SELECT id FROM symbols WHERE value = ?', (value,)).fetchone()
+            if row is None:
+                return None
+            symbol_id = row[0]
+
+            self.symbol_ids[symbol] = symbol_id
+            self.symbols[symbol_id] = symbol
+        return symbol_id
+
+    def _get_child(self, node_id, input_id):
+        with self.lock:
+            return self.connection.execute('SELECT id, output FROM nodes WHERE parent = ? AND input = ?',
+                                           (node_id, input_id)).fetchone()
+
+    def commit(self):
+        """
+        Commit all steps added since the last commit to the database file.
+        """
+        with self.lock:
+            if self.num_uncommitted:
+                self.connection.commit()
+                self.num_uncommitted = 0
+
+    def close(self):
+        """
+        Commit all changes and close the database connection.
+        """
+        if not self.read_only:
+            self.commit()
+        self.connection.close()
+
+    def reset(self):
+        if not self.read_only:
+            self.commit()
+        cursor = self.cursor
+        cursor.node = 0
+        cursor.inputs = []
+        cursor.outputs = []
+
+    def step_in_cache(self, inp, out):
+        """
+        Preform a step in the cache. If output exist for the current state, and is not the same as `out`, throw
+        the non-determinism violation error and abort learning.
+        Args:
+
+            inp: input
+            out: output
+
+        """
+        cursor = self.cursor
+        cursor.inputs.append(inp)
+        cursor.outputs.append(out)
+        if inp is None:
+            if not self.read_only:
+                with self.lock:
+                    self.connection.execute('INSERT OR REPLACE INTO root (id, value) VALUES (0, ?)',
+                                            (pickle.dumps(out, protocol=4),))
+                    self.num_uncommitted += 1
+            return
+
+        if cursor.node is None:
+            # path is not in the read only cache
+            return
+
+        input_id = self._get_symbol_id(inp, insert=not self.read_only)
+        child = self._get_child(cursor.node, input_id) if input_id is not None else None
+        if child is None:
+            if self.read_only:
+                cursor.node = None
+                return
+            output_id = self._get_symbol_id(out)
+            with self.lock:
+                # UNIQUE (parent, input) keeps the node inserted by another thread in the meantime
+                self.connection.execute('INSERT OR IGNORE INTO nodes (parent, input, output) VALUES (?, ?, ?)',
+                                        (cursor.node, input_id, output_id))
+                self.num_uncommitted += 1
+                child = self._get_child(cursor.node, input_id)
+
+        node_id, output_id = child
+        cached_output = self._get_symbol(output_id)
+        if cached_output != out:
+            expected_seq = list(cursor.outputs[:-1])
+            expected_seq.append(cached_output)
+            msg = f'Non-determinism detected.\n' \
+                  f'Error inserting: {cursor.inputs}\n' \
+                  f'Conflict detected: {cached_output} vs {out}\n' \
+                  f'Expected Output: {expected_seq}\n' \
+                  f'Received output: {cursor.outputs}'
+            raise SystemExit(msg)
+        cursor.node = node_id
+
+    def in_cache(self, input_seq: tuple):
+        """
+        Check if the result of the membership query for input_seq is cached is in the tree. If it is, return the
+        corresponding output sequence.
+
+        Args:
+
+            input_seq: corresponds to the membership query
+
+        Returns:
+
+            outputs associated with inputs if it is in the query, None otherwise
+
+        """
+        output_seq = []
+        if self._find(0, input_seq, output_seq) is None:
+            return None
+        return output_seq
+
+    def _find(self, node_id, input_seq, output_seq: list):
+        # follows input_seq from node_id and appends the outputs to output_seq, returns None if it is not in the cache
+        for letter in input_seq:
+            input_id = self._get_symbol_id(letter, insert=False)
+            if input_id is None:
+                return None
+            child = self._get_child(node_id, input_id)
+            if child is None:
+                return None
+            node_id, output_id = child
+            output_seq.append(self._get_symbol(output_id))
+        return node_id
+
+    def in_cache_batch(self, prefix: tuple, suffixes: list):
+        """
+        Looks up the membership queries prefix + suffix for all suffixes, the prefix is traversed only once.
+
+        Args:
+
+            prefix: common prefix of the membership queries
+
+            suffixes: list of suffixes
+
+        Returns:
+
+            list in which the i-th element are the outputs of prefix + suffixes[i] if it is in the cache, None otherwise
+
+        """
+        prefix_outputs = []
+        node_id = self._find(0, prefix, prefix_outputs)
+        if node_id is None:
+            return [None] * len(suffixes)
+
+        outputs = []
+        for suffix in suffixes:
+            output_seq = list(prefix_outputs)
+            outputs.append(output_seq if self._find(node_id, suffix, output_seq) is not None else None)
+        return outputs
@@ -1,8 +1,95 @@
+import threading
 from abc import ABC, abstractmethod
 
+from collections import defaultdict, Counter
+
 from aalpy.base.CacheTree import CacheTree
 
 
+def get_maximal_words(words: list):
+    """
+    Query planner that removes all words that are prefixes of other words. Only the words that are not a prefix of
+    another word (maximal words) have to be executed, while outputs of all other words are prefixes of the outputs of
+    maximal words. They are found by sorting the words, or, if letters can not be compared, by inserting all words
+    into a trie, in which maximal words end in leaves. Therefore, the number of resets equals the number of maximal
+    words.
+    The empty word is always executed, as its output (eg. acceptance of the initial state in DFAs) is not a part of the
+    output of any other word.
+
+    Args:
+
+        words: list of membership queries
+
+    Returns:
+
+        list of maximal words without duplicates, and a list in which the i-th element is the maximal word whose
+        prefix is the i-th word
+
+    """
+    words = [tuple(word) for word in words]
+    try:
+        covering_words = _get_covering_words_by_sorting(words)
+    except TypeError:
+        # letters can not be compared with each other
+        covering_words = _get_covering_words_by_trie(words)
+    maximal_words = dict.fromkeys(covering_words)
+    return list(maximal_words.keys()), covering_words
+
+
+def _get_covering_words_by_sorting(words: list) -> list:
+    # in the sorted list, words having a word as their prefix directly follow it, so a word is a prefix of another
+    # word iff it is a prefix of its successor
+    covering_word_map = dict()
+    next_word, next_covering_word = None, None
+    for word in reversed(sorted(set(words))):
+        if word and next_word is not None and next_word[:len(word)] == word:
+            covering_word_map[word] = next_covering_word
+        else:
+            covering_word_map[word] = word
+        next_word, next_covering_word = word, covering_word_map[word]
+    return [covering_word_map[word] for word in words]
+
+
+def _get_covering_words_by_trie(words: list) -> list:
+    trie = dict()
+    word_nodes = []
+    for word in words:
+        node = trie
+        for letter in word:
+            node = node.setdefault(letter, dict())
+        word_nodes.append(node)
+
+    # maps the id of a node to the suffix leading from it to one of the leaves in its subtree
+    leaf_suffixes = dict()
+    covering_words = []
+    for word, node in zip(words, word_nodes):
+        path = []
+        while word and node and id(node) not in leaf_suffixes:
+            letter = next(iter(node))
+            path.append((node, letter))
+            node = node[letter]
+
+        suffix = leaf_suffixes.get(id(node), ()) if word else ()
+        for visited_node, letter in reversed(path):
+            suffix = (letter,) + suffix
+            leaf_suffixes[id(visited_node)] = suffix
+
+        covering_words.append(word + suffix)
+
+    return covering_words
+
+
+def prefix_outputs(word: tuple, covering_word: tuple, covering_outputs: list) -> list:
+    """
+    Outputs of `word` extracted from the outputs of `covering_word`, of which `word` is a prefix.
+    """
+    if word == covering_word:
+        return covering_outputs
+    # some SULs (eg. MdpSUL) prepend the initial output to the outputs
+    offset = len(covering_outputs) - len(covering_word)
+    return covering_outputs[:len(word) + offset]
+
+
 class SUL(ABC):
     """
     System Under Learning (SUL) abstract class. Defines the interaction between the learning algorithm and the system
@@ -40,6 +127,27 @@ class SUL(ABC):
         self.num_steps += len(word)
         return out
 
+    def query_batch(self, words: list) -> list:
+        """
+        Performs membership queries for all words in `words`. Words that are prefixes of other words in the batch are
+        not executed, their outputs are taken from the outputs of longer words (see get_maximal_words). By default,
+        queries are executed one after another. SULs that are able to answer several queries at once (eg. SULPool)
+        override this method.
+
+        Args:
+
+            words: list of membership queries
+
+        Returns:
+
+            list of output lists, where the i-th element corresponds to the outputs of the i-th word
+
+        """
+        maximal_words, covering_words = get_maximal_words(words)
+        outputs = {word: self.query(word) for word in maximal_words}
+        return [prefix_outputs(word, covering_word, outputs[covering_word])
+                for word, covering_word in zip(words, covering_words)]
+
     @abstractmethod
     def pre(self):
         """
@@ -70,17 +178,207 @@ class SUL(ABC):
         """
         pass
 
+    def save_state(self):
+        """
+        Optional hook for SULs that can checkpoint their state more cheaply than resetting and re-executing the input
+        sequence leading to it. Returns a token that can be passed to restore_state to return to the current state.
+
+        Returns:
+
+            token representing the current state of the SUL, or None if snapshots are not supported
+
+        """
+        return None
+
+    def restore_state(self, token):
+        """
+        Optional hook that brings the SUL to the state saved with save_state. Called instead of pre().
+
+        Args:
+
+            token: token returned by save_state
+
+        """
+        raise NotImplementedError('SUL does not support snapshots.')
+
+
+def wrapped_suls(sul):
+    """
+    Yields the SUL and all SULs wrapped by it (eg. by CacheSUL or InstrumentedSUL), following their `sul` attribute.
+    """
+    while isinstance(sul, SUL):
+        yield sul
+        sul = getattr(sul, 'sul', None)
+
+
+def get_base_phase(phase: str) -> str:
+    """
+    Returns the phase without its sub-phase, eg. 'learning' for 'learning:closing'.
+    """
+    return phase.split(':', 1)[0]
+
+
+def set_sul_phase(sul, phase: str):
+    """
+    Informs the SUL and all SULs wrapped by it, that keep track of the phase of learning (eg. InstrumentedSUL), which
+    component performs the following queries. Learning algorithms use the phases 'learning' and 'eq_oracle', which
+    can be refined with a sub-phase after a colon (eg. 'learning:closing' or 'eq_oracle:WMethodEqOracle').
+
+    Args:
+
+        sul: system under learning
+
+        phase: name of the phase
+
+    """
+    for wrapped_sul in wrapped_suls(sul):
+        if hasattr(wrapped_sul, 'set_phase'):
+            wrapped_sul.set_phase(phase)
+
+
+class _Trace(threading.local):
+    def __init__(self):
+        self.steps = []
+        # inputs and outputs of the last membership query, if the SUL was not reset after it
+        self.session = None
+
 
 class CacheSUL(SUL):
     """
     System under learning that keeps a multiset of all queries in memory.
     This multiset/cache is encoded as a tree.
+    CacheSUL can be used by several threads at once, each thread has its own position in the cache tree. The
+    underlying SUL has to support concurrent interaction in that case, otherwise use `fork` to give each thread its own
+    replica of the SUL that shares the cache.
+    With `continue_queries`, the SUL is not reset after a membership query. If the next membership query extends the
+    previous one, only the missing suffix is executed, otherwise post() and pre() are called before it. Call
+    `end_session` once the SUL is not used anymore.
     """
 
-    def __init__(self, sul: SUL):
+    def __init__(self, sul: SUL, cache=None, cost_model=None, continue_queries=False):
+        """
+        Cache hits and misses, resets and steps are recorded for each phase in `phase_stats`, see get_cache_report.
+
+        Args:
+
+            sul: system under learning
+
+            cache: cache tree in which queries are stored, eg. CompactCacheTree, PersistentCacheTree or
+                BoundedCacheTree. If None, CacheTree will be used.
+
+            cost_model: if not None, cost of all resets and steps executed on the SUL is accumulated in `costs` for
+                each phase of learning (see set_sul_phase)
+
+            continue_queries: if True, membership queries that extend the previous membership query continue it
+                without a reset. They are counted in `num_continued_queries` instead of `num_queries`. Only applies
+                to SULs that do not override `query`, ie. that execute queries with pre, step and post.
+                (Default value = False)
+        """
         super().__init__()
         self.sul = sul
-        self.cache = CacheTree()
+        self.continue_queries = continue_queries and type(sul).query is SUL.query
+        # membership queries answered by continuing the previous one, they are not counted in num_queries
+        self.num_continued_queries = 0
+        self.cache = cache if cache is not None else CacheTree()
+        # inputs and outputs executed with step since the last reset, separate for each thread
+        self._trace = _Trace()
+        self.lock = threading.Lock()
+        # set by learning algorithms, if the cache supports pinning (see BoundedCacheTree)
+        self.pin_queries = False
+        # set by the QueryPrefetcher, whose queries in progress are awaited instead of executed again
+        self.prefetcher = None
+
+        self.cost_model = cost_model
+        self.phase = 'learning'
+        self.costs = defaultdict(float)
+        self.phase_stats = defaultdict(Counter)
+        self._phase_start_nodes = self._num_inserted_nodes()
+
+    @property
+    def trace(self):
+        return self._trace.steps
+
+    def fork(self, sul: SUL):
+        """
+        Creates a CacheSUL that shares the cache with this one, but interacts with another replica of the system under
+        learning, eg. for a worker thread of an equivalence oracle. Queries and steps are counted separately.
+
+        Args:
+
+            sul: replica of the system under learning
+
+        Returns:
+
+            CacheSUL with the shared cache
+
+        """
+        return CacheSUL(sul, self.cache, self.cost_model, self.continue_queries)
+
+    def _pin(self, word):
+        # only membership queries of the learning algorithm are pinned, never those of equivalence oracles
+        if self.pin_queries and get_base_phase(self.phase) == 'learning':
+            self.cache.pin(word)
+
+    def repin(self, words: list):
+        """
+        Releases all pinned queries in the cache and pins `words` instead, eg. the S.A.E queries of the current
+        observation table. Only has an effect if `pin_queries` is set.
+
+        Args:
+
+            words: membership queries that are pinned
+
+        """
+        if not self.pin_queries:
+            return
+        self.cache.unpin_all()
+        for word in words:
+            self.cache.pin(word)
+
+    def _num_inserted_nodes(self):
+        return self.cache.num_nodes + getattr(self.cache, 'num_evicted_nodes', 0)
+
+    def set_phase(self, phase: str):
+        with self.lock:
+            # nodes added to the cache since the last change of the phase (including nodes added by forks meanwhile)
+            num_nodes = self._num_inserted_nodes()
+            self.phase_stats[self.phase]['new_nodes'] += num_nodes - self._phase_start_nodes
+            self._phase_start_nodes = num_nodes
+            self.phase = phase
+
+    def get_cache_report(self) -> dict:
+        """
+        Summarizes the interaction with the cache and the SUL for each phase of learning (see set_sul_phase).
+
+        Returns:
+
+            dictionary mapping each phase to a dictionary with the number of membership queries answered from the
+            cache ('hits') and by the SUL ('misses'), the 'hit_rate', the 'resets' and 'steps' executed on the SUL, the
+            number of nodes added to the cache ('new_nodes'), the number of steps that re-executed an already cached
+            prefix ('redundant_steps'), the mean length of the re-executed prefix per reset ('mean_reuse_depth') and
+            the 'cost' if a cost model is used
+
+        """
+        self.set_phase(self.phase)
+        report = dict()
+        for phase, stats in self.phase_stats.items():
+            if not any(stats.values()):
+                continue
+            queries = stats['hits'] + stats['misses']
+            redundant_steps = max(0, stats['steps'] - stats['new_nodes'])
+            report[phase] = {
+                'hits': stats['hits'],
+                'misses': stats['misses'],
+                'hit_rate': round(stats['hits'] / queries, 4) if queries else 0.0,
+                'resets': stats['resets'],
+                'steps': stats['steps'],
+                'new_nodes': stats['new_nodes'],
+                'redundant_steps': redundant_steps,
+                'mean_reuse_depth': round(redundant_steps / stats['resets'], 2) if stats['resets'] else 0.0,
+            }
+            if self.cost_model is not None:
+                report[phase]['cost'] = self.costs[phase]
+        return report
 
     def query(self, word):
         """
@@ -98,31 +396,195 @@ class CacheSUL(SUL):
 
         """
         cached_query = self.cache.in_cache(word)
+        if not cached_query and self.prefetcher is not None:
+            self.prefetcher.wait_for([tuple(word)])
+            cached_query = self.cache.in_cache(word)
         if cached_query:
-            self.num_cached_queries += 1
+            with self.lock:
+                self.num_cached_queries += 1
+                self.phase_stats[self.phase]['hits'] += 1
+            self._pin(word)
             return cached_query
 
-        # get outputs using default query method
-        out = self.sul.query(word)
+        session = self._trace.session
+        if self.continue_queries and session and len(word) > len(session[0]) and \
+                tuple(word[:len(session[0])]) == session[0]:
+            return self._continue_query(word)
+
+        self.end_session()
+        if self.continue_queries and len(word) > 0:
+            # same as the default query method, but the SUL is not reset afterwards
+            self.sul.pre()
+            out = [self.sul.step(letter) for letter in word]
+            self._trace.session = (tuple(word), out)
+        else:
+            # get outputs using default query method
+            out = self.sul.query(word)
 
         # add input/outputs to tree
         self.cache.reset()
         for i, o in zip(word, out):
             self.cache.step_in_cache(i, o)
+        self._pin(word)
+
+        with self.lock:
+            self.num_queries += 1
+            self.num_steps += len(word)
+            self.phase_stats[self.phase].update(misses=1, resets=1, steps=len(word))
+            if self.cost_model is not None:
+                self.costs[self.phase] += self.cost_model.query_cost(word)
+        return out
 
-        self.num_queries += 1
-        self.num_steps += len(word)
+    def _continue_query(self, word):
+        inputs, outputs = self._trace.session
+        suffix = word[len(inputs):]
+
+        self.cache.reset()
+        for i, o in zip(inputs, outputs):
+            self.cache.step_in_cache(i, o)
+        out = list(outputs)
+        for letter in suffix:
+            o = self.sul.step(letter)
+            self.cache.step_in_cache(letter, o)
+            out.append(o)
+        self._pin(word)
+        self._trace.session = (tuple(word), out)
+
+        with self.lock:
+            self.num_continued_queries += 1
+            self.num_steps += len(suffix)
+            self.phase_stats[self.phase].update(misses=1, steps=len(suffix))
+            if self.cost_model is not None:
+                self.costs[self.phase] += self.cost_model.word_cost(suffix)
         return out
 
+    def end_session(self):
+        """
+        Calls post() on the SUL if it was not reset after the last membership query (see `continue_queries`).
+        """
+        if self._trace.session is not None:
+            self._trace.session = None
+            self.sul.post()
+
+    def in_cache_batch(self, prefix: tuple, suffixes: list) -> list:
+        """
+        Answers the membership queries prefix + suffix for all suffixes from the cache, without interacting with the
+        SUL. The prefix is traversed in the cache tree only once.
+
+        Args:
+
+            prefix: common prefix of the membership queries
+
+            suffixes: list of suffixes
+
+        Returns:
+
+            list in which the i-th element are the outputs of prefix + suffixes[i] if it is in the cache, None otherwise
+
+        """
+        outputs = []
+        for suffix, cached_query in zip(suffixes, self.cache.in_cache_batch(prefix, suffixes)):
+            # like in query, the empty word is never answered from the cache
+            if cached_query:
+                self._pin(prefix + suffix)
+                outputs.append(cached_query)
+            else:
+                outputs.append(None)
+
+        num_cached = sum(1 for out in outputs if out is not None)
+        with self.lock:
+            self.num_cached_queries += num_cached
+            self.phase_stats[self.phase]['hits'] += num_cached
+        return outputs
+
+    def query_batch(self, words: list) -> list:
+        """
+        Performs membership queries for all words that are not a prefix of any trace in the cache. Of the queries that
+        are not cached, only words that are not a prefix of another word in the batch are passed to the `query_batch`
+        of the underlying SUL at once.
+
+        Args:
+
+            words: list of membership queries
+
+        Returns:
+
+            list of output lists, where the i-th element corresponds to the outputs of the i-th word
+
+        """
+        outputs = [None] * len(words)
+        not_cached = dict()
+        for index, word in enumerate(words):
+            cached_query = self.cache.in_cache(word)
+            if cached_query:
+                self._pin(word)
+                outputs[index] = cached_query
+            elif word in not_cached:
+                # same query asked multiple times in the batch
+                not_cached[word].append(index)
+            else:
+                not_cached[word] = [index]
+
+        if not_cached and self.prefetcher is not None:
+            self.prefetcher.wait_for([tuple(word) for word in not_cached.keys()])
+            for word in list(not_cached.keys()):
+                cached_query = self.cache.in_cache(word)
+                if cached_query:
+                    self._pin(word)
+                    for index in not_cached.pop(word):
+                        outputs[index] = cached_query
+
+        words_to_query = list(not_cached.keys())
+        maximal_words, covering_words = get_maximal_words(words_to_query)
+        if maximal_words:
+            self.end_session()
+
+        maximal_outputs = dict()
+        for word, out in zip(maximal_words, self.sul.query_batch(maximal_words)):
+            self.cache.reset()
+            for i, o in zip(word, out):
+                self.cache.step_in_cache(i, o)
+            # pinned right away, as the next reset might evict it (pinning also pins all prefixes in the batch)
+            self._pin(word)
+            maximal_outputs[word] = out
+
+        # answered from the cache, from other queries in the batch or by the query of a longer word
+        num_cached = len(words) - len(maximal_words)
+        with self.lock:
+            self.num_queries += len(maximal_words)
+            self.num_steps += sum(len(word) for word in maximal_words)
+            self.num_cached_queries += num_cached
+            self.phase_stats[self.phase].update(hits=num_cached, misses=len(maximal_words),
+                                                resets=len(maximal_words),
+                                                steps=sum(len(word) for word in maximal_words))
+            if self.cost_model is not None:
+                self.costs[self.phase] += sum(self.cost_model.query_cost(word) for word in maximal_words)
+
+        for word, covering_word in zip(words_to_query, covering_words):
+            out = prefix_outputs(word, covering_word, maximal_outputs[covering_word])
+            for index in not_cached[word]:
+                outputs[index] = out
+
+        return outputs
+
     def pre(self):
         """
         Reset the system under learning and current node in the cache tree.
         """
+        self.end_session()
         self.cache.reset()
+        self._trace.steps = []
         self.sul.pre()
+        with self.lock:
+            self.phase_stats[self.phase]['resets'] += 1
+            if self.cost_model is not None:
+                self.costs[self.phase] += self.cost_model.reset_cost
 
     def post(self):
-        self.sul.post()
+        if self._trace.session is not None:
+            self.end_session()
+        else:
+            self.sul.post()
 
     def step(self, letter):
         """
@@ -139,4 +601,46 @@ class CacheSUL(SUL):
         """
         out = self.sul.step(letter)
         self.cache.step_in_cache(letter, out)
+        self.trace.append((letter, out))
+        with self.lock:
+            self.phase_stats[self.phase]['steps'] += 1
+            if self.cost_model is not None:
+                self.costs[self.phase] += self.cost_model.input_cost(letter)
         return out
+
+    def save_state(self):
+        """
+        Saves the state of the underlying SUL together with the trace executed since the last reset, so that the
+        position in the cache tree can be restored.
+
+        Returns:
+
+            token representing the current state of the SUL, or None if the underlying SUL does not support snapshots
+
+        """
+        sul_token = self.sul.save_state()
+        if sul_token is None:
+            return None
+        return sul_token, tuple(self.trace)
+
+    def restore_state(self, token):
+        """
+        Restores the state of the underlying SUL and moves to the corresponding node in the cache tree.
+
+        Args:
+
+            token: token returned by save_state
+
+        """
+        sul_token, trace = token
+        self.end_session()
+        self.sul.restore_state(sul_token)
+        # restoring a snapshot is accounted as a reset
+        with self.lock:
+            self.phase_stats[self.phase]['resets'] += 1
+            if self.cost_model is not None:
+                self.costs[self.phase] += self.cost_model.reset_cost
+        self.cache.reset()
+        for i, o in trace:
+            self.cache.step_in_cache(i, o)
+        self._trace.steps = list(trace)
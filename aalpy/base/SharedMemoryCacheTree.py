@@ -0,0 +1,342 @@
+import pickle
+from multiprocessing import Lock
+from multiprocessing.shared_memory import SharedMemory
+
+from aalpy.base.CacheTree import _Cursor
+
+# header of the node block: number of nodes, number of symbols, used bytes of the symbol table, root value
+_NUM_NODES, _NUM_SYMBOLS, _SYMBOL_BYTES, _ROOT_VALUE = range(4)
+_HEADER_SIZE = 4
+_INT_SIZE = 4
+
+
+class _SharedMemoryNodeView:
+    """
+    Read-only view of a node of the SharedMemoryCacheTree that mimics the interface of the Node class.
+    """
+
+    def __init__(self, tree, index):
+        self._tree = tree
+        self._index = index
+
+    @property
+    def value(self):
+        tree = self._tree
+        output_id = tree.header[_ROOT_VALUE] if self._index == 0 else tree.node_output[self._index]
+        return tree._get_symbol(output_id) if output_id != -1 else None
+
+    @property
+    def children(self):
+        tree = self._tree
+        children = dict()
+        child = tree.first_child[self._index]
+        while child != -1:
+            children[tree._get_symbol(tree.node_input[child])] = _SharedMemoryNodeView(tree, child)
+            child = tree.next_sibling[child]
+        return children
+
+
+class SharedMemoryCacheTree:
+    """
+    Cache tree stored in shared memory, so that SUL replicas running in different processes (eg. in the SULPool with
+    use_processes=True) share one cache and no query has to be executed twice. It has the same semantics as the
+    CacheTree. The tree is stored in flat arrays, as in the CompactCacheTree, and inputs and outputs are interned
+    through a shared symbol table that holds their pickled values, so they have to be picklable and hashable.
+    Lookups do not take any lock, while insertions of nodes and symbols are serialized with a process-shared lock.
+
+    The capacity of the tree is fixed on creation. Once it is full, new steps are not cached anymore.
+    The tree is passed to other processes by pickling it (eg. in the initargs of a process pool), which attaches to the
+    same shared memory. The creating process should call unlink once the cache is not needed anymore.
+    Requires Python 3.8 or newer.
+    """
+
+    def __init__(self, max_nodes=1000000, max_symbols=10000, symbol_table_size=1 << 20):
+        """
+        Args:
+
+            max_nodes: maximum number of nodes in the tree
+
+            max_symbols: maximum number of distinct inputs and outputs
+
+            symbol_table_size: size in bytes reserved for pickled inputs and outputs
+        """
+        self.max_nodes = max_nodes
+        self.max_symbols = max_symbols
+        self.symbol_table_size = symbol_table_size
+        self.lock = Lock()
+
+        self._nodes_shm = SharedMemory(create=True, size=(_HEADER_SIZE + 4 * max_nodes) * _INT_SIZE)
+        self._symbols_shm = SharedMemory(create=True, size=(max_symbols + 1) * _INT_SIZE + symbol_table_size)
+        self._owner = True
+        self._attach()
+
+        self.header[_NUM_NODES] = 1
+        self.header[_NUM_SYMBOLS] = 0
+        self.header[_SYMBOL_BYTES] = 0
+        self.header[_ROOT_VALUE] = -1
+        self.first_child[0] = -1
+        self.next_sibling[0] = -1
+        self.node_input[0] = -1
+        self.node_output[0] = -1
+        self.symbol_offsets[0] = 0
+
+    def _attach(self):
+        ints = self._nodes_shm.buf.cast('i')
+        n = self.max_nodes
+        self.header = ints[:_HEADER_SIZE]
+        self.first_child = ints[_HEADER_SIZE:_HEADER_SIZE + n]
+        self.next_sibling = ints[_HEADER_SIZE + n:_HEADER_SIZE + 2 * n]
+        self.node_input = ints[_HEADER_SIZE + 2 * n:_HEADER_SIZE + 3 * n]
+        self.node_output = ints[_HEADER_SIZE + 3 * n:_HEADER_SIZE + 4 * n]
+
+        offsets_size = (self.max_symbols + 1) * _INT_SIZE
+        symbols_buffer = self._symbols_shm.buf
+        self.symbol_offsets = symbols_buffer[:offsets_size].cast('i')
+        self.symbol_bytes = symbols_buffer[offsets_size:]
+
+        # all views have to be released before the shared memory is closed
+        self._views = [ints, self.header, self.first_child, self.next_sibling, self.node_input, self.node_output,
+                       self.symbol_offsets, self.symbol_bytes]
+
+        # process local copy of the symbol table
+        self.symbol_ids = dict()
+        self.symbols = []
+        self.cursor = _Cursor()
+
+    def __getstate__(self):
+        return {'max_nodes': self.max_nodes, 'max_symbols': self.max_symbols,
+                'symbol_table_size': self.symbol_table_size, 'lock': self.lock,
+                'nodes_name': self._nodes_shm.name, 'symbols_name': self._symbols_shm.name}
+
+    def __setstate__(self, state):
+        self.max_nodes = state['max_nodes']
+        self.max_symbols = state['max_symbols']
+        self.symbol_table_size = state['symbol_table_size']
+        self.lock = state['lock']
+        self._nodes_shm = SharedMemory(name=state['nodes_name'])
+        self._symbols_shm = SharedMemory(name=state['symbols_name'])
+        self._owner = False
+        self._attach()
+
+    @property
+    def root_node(self):
+        return _SharedMemoryNodeView(self, 0)
+
+    @property
+    def num_nodes(self):
+        return self.header[_NUM_NODES]
+
+    @property
+    def curr_node(self):
+        node = self.cursor.node
+        return 0 if node is None else node
+
+    def _sync_symbols(self):
+        # load symbols added by other processes
+        num_symbols = self.header[_NUM_SYMBOLS]
+        for symbol_id in range(len(self.symbols), num_symbols):
+            start, end = self.symbol_offsets[symbol_id], self.symbol_offsets[symbol_id + 1]
+            symbol = pickle.loads(bytes(self.symbol_bytes[start:end]))
+            self.symbols.append(symbol)
+            self.symbol_ids.setdefault(symbol, symbol_id)
+
+    def _get_symbol(self, symbol_id):
+        if symbol_id >= len(self.symbols):
+            self._sync_symbols()
+        return self.symbols[symbol_id]
+
+    def _get_symbol_id(self, symbol, insert=True):
+        symbol_id = self.symbol_ids.get(symbol)
+        if symbol_id is not None:
+            return symbol_id
+
+        self._sync_symbols()
+        symbol_id = self.symbol_ids.get(symbol)
+        if symbol_id is not None or not insert:
+            return symbol_id
+
+        value = pickle.dumps(symbol, protocol=4)
+        with self.lock:
+            self._sync_symbols()
+            symbol_id = self.symbol_ids.get(symbol)
+            if symbol_id is not None:
+                return symbol_id
+
+            symbol_id = self.header[_NUM_SYMBOLS]
+            start = self.header[_SYMBOL_BYTES]
+            if symbol_id >= self.max_symbols or start + len(value) > self.symbol_table_size:
+                return None
+            self.symbol_bytes[start:start + len(value)] = value
+            self.symbol_offsets[symbol_id + 1] = start + len(value)
+            self.header[_SYMBOL_BYTES] = start + len(value)
+            # symbol is visible to other processes only once it is completely written
+            self.header[_NUM_SYMBOLS] = symbol_id + 1
+
+        self._sync_symbols()
+        return symbol_id
+
+    def _get_child(self, node, input_id):
+        child = self.first_child[node]
+        node_input = self.node_input
+        while child != -1 and node_input[child] != input_id:
+            child = self.next_sibling[child]
+        return child
+
+    def _trace_to(self, node):
+        inputs, outputs = [], []
+        while node > 0:
+            inputs.append(self._get_symbol(self.node_input[node]))
+            outputs.append(self._get_symbol(self.node_output[node]))
+            node = self._find_parent(node)
+        inputs.reverse()
+        outputs.reverse()
+        return inputs, outputs
+
+    def _find_parent(self, node):
+        # parents are not stored to save memory, they are only needed to report non-determinism
+        for parent in range(node):
+            child = self.first_child[parent]
+            while child != -1:
+                if child == node:
+                    return parent
+                child = self.next_sibling[child]
+        return 0
+
+    def reset(self):
+        self.cursor.node = 0
+
+    def step_in_cache(self, inp, out):
+        """
+        Preform a step in the cache. If output exist for the current state, and is not the same as `out`, throw
+        the non-determinism violation error and abort learning.
+        Args:
+
+            inp: input
+            out: output
+
+        """
+        if inp is None:
+            output_id = self._get_symbol_id(out)
+            if output_id is not None:
+                self.header[_ROOT_VALUE] = output_id
+            return
+
+        curr_node = self.curr_node
+        if curr_node == -1:
+            # tree is full, path is not cached
+            return
+
+        input_id = self._get_symbol_id(inp)
+        output_id = self._get_symbol_id(out)
+        if input_id is None or output_id is None:
+            self.cursor.node = -1
+            return
+
+        node = self._get_child(curr_node, input_id)
+        if node == -1:
+            with self.lock:
+                node = self._get_child(curr_node, input_id)
+                if node == -1:
+                    node = self.header[_NUM_NODES]
+                    if node >= self.max_nodes:
+                        self.cursor.node = -1
+                        return
+                    self.first_child[node] = -1
+                    self.next_sibling[node] = self.first_child[curr_node]
+                    self.node_input[node] = input_id
+                    self.node_output[node] = output_id
+                    self.header[_NUM_NODES] = node + 1
+                    # node is linked to its parent last, so that readers never see a partially inserted node
+                    self.first_child[curr_node] = node
+        if self.node_output[node] != output_id:
+            inputs, outputs = self._trace_to(curr_node)
+            expected_seq = list(outputs)
+            expected_seq.append(self._get_symbol(self.node_output[node]))
+            inputs.append(inp)
+            outputs.append(out)
+            msg = f'Non-determinism detected.\n' \
+                  f'Error inserting: {inputs}\n' \
+                  f'Conflict detected: {expected_seq[-1]} vs {out}\n' \
+                  f'Expected Output: {expected_seq}\n' \
+                  f'Received output: {outputs}'
+            raise SystemExit(msg)
+        self.cursor.node = node
+
+    def in_cache(self, input_seq: tuple):
+        """
+        Check if the result of the membership query for input_seq is cached is in the tree. If it is, return the
+        corresponding output sequence.
+
+        Args:
+
+            input_seq: corresponds to the membership query
+
+        Returns:
+
+            outputs associated with inputs if it is in the query, None otherwise
+
+        """
+        output_ids = []
+        if self._find(0, input_seq, output_ids) == -1:
+            return None
+        return [self._get_symbol(o) for o in output_ids]
+
+    def _find(self, node, input_seq, output_ids: list):
+        # follows input_seq from node and appends the output ids to output_ids, returns -1 if it is not in the cache
+        for letter in input_seq:
+            input_id = self._get_symbol_id(letter, insert=False)
+            if input_id is None:
+                return -1
+            node = self._get_child(node, input_id)
+            if node == -1:
+                return -1
+            output_ids.append(self.node_output[node])
+        return node
+
+    def in_cache_batch(self, prefix: tuple, suffixes: list):
+        """
+        Looks up the membership queries prefix + suffix for all suffixes, the prefix is traversed only once.
+
+        Args:
+
+            prefix: common prefix of the membership queries
+
+            suffixes: list of suffixes
+
+        Returns:
+
+            list in which the i-th element are the outputs of prefix + suffixes[i] if it is in the cache, None otherwise
+
+        """
+        prefix_ids = []
+        node = self._find(0, prefix, prefix_ids)
+        if node == -1:
+            return [None] * len(suffixes)
+
+        outputs = []
+        for suffix in suffixes:
+            output_ids = list(prefix_ids)
+            if self._find(node, suffix, output_ids) == -1:
+                outputs.append(None)
+            else:
+                outputs.append([self._get_symbol(o) for o in output_ids])
+        return outputs
+
+    def close(self):
+        """
+        Detach from the shared memory. Cache can not be used afterwards.
+        """
+        for view in reversed(self._views):
+            view.release()
+        self._nodes_shm.close()
+        self._symbols_shm.close()
+
+    def unlink(self):
+        """
+        Detach from and free the shared memory. Should be called by the process that created the cache once all
+        processes are done with it.
+        """
+        self.close()
+        if self._owner:
+            self._nodes_shm.unlink()
+            self._symbols_shm.unlink()
@@ -1,3 +1,5 @@
 from .Automaton import Automaton, AutomatonState, DeterministicAutomaton
 from .Oracle import Oracle
 from .SUL import SUL
+from .CostModel import CostModel
+from .AsyncSUL import AsyncSUL, AsyncSULPool
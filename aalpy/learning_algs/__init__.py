@@ -1,5 +1,7 @@
 # public API for running automata learning algorithms
 from .deterministic.LStar import run_Lstar
+from .deterministic.AsyncLStar import run_Lstar_async
+from .deterministic.ResetFreeLStar import run_reset_free_Lstar
 from .non_deterministic.OnfsmLstar import run_non_det_Lstar
 from .non_deterministic.AbstractedOnfsmLstar import run_abstracted_ONFSM_Lstar
 from .stochastic.StochasticLStar import run_stochastic_Lstar
@@ -0,0 +1,70 @@
+import asyncio
+from functools import partial
+
+from aalpy.base import Oracle, AsyncSUL, CostModel
+from aalpy.base.AsyncSUL import SyncSULAdapter
+from .LStar import run_Lstar
+
+
+async def run_Lstar_async(alphabet: list, sul: AsyncSUL, eq_oracle: Oracle, automaton_type,
+                          closing_strategy='longest_first', cex_processing='rs', suffix_closedness=True,
+                          closedness_type='suffix', max_learning_rounds=None, cache_and_non_det_check=True,
+                          cost_model: CostModel = None, prefetch_sul=None, return_data=False, print_level=2):
+    """Asynchronous variant of the L* algorithm (see run_Lstar) for systems under learning implementing AsyncSUL.
+    run_Lstar is executed in a worker thread on the synchronous view of `sul` (SyncSULAdapter), while the coroutines
+    of `sul` are executed on the running event loop. Membership queries of the observation table and batches of the
+    equivalence oracle are passed to the `query_batch` of `sul` at once, so they are performed concurrently (use
+    AsyncSULPool to keep several queries in flight on separate connections), while the observation table is filled in
+    the same deterministic order as in run_Lstar.
+
+    Args:
+
+        alphabet: input alphabet
+
+        sul: asynchronous system under learning
+
+        eq_oracle: equivalence oracle, its SUL will be replaced by the synchronous view of `sul`
+
+        automaton_type: type of automaton to be learned. Either 'dfa', 'mealy' or 'moore'.
+
+        closing_strategy: closing strategy used in the close method. Either 'longest_first', 'shortest_first',
+            'single' or 'cost_aware' (Default value = 'longest_first')
+
+        cex_processing: Counterexample processing strategy. Either None, 'rs' (Riverst-Schapire) or 'longest_prefix'.
+            (Default value = 'rs')
+
+        suffix_closedness: if True E set will be suffix closed, (Default value = True)
+
+        closedness_type: either 'suffix' or 'prefix'. If suffix, E set will be suffix closed, prefix closed otherwise
+            (Default value = 'suffix')
+
+        max_learning_rounds: number of learning rounds after which learning will terminate (Default value = None)
+
+        cache_and_non_det_check: Use caching and non-determinism checks (Default value = True)
+
+        cost_model: cost of resets and steps of the SUL, see run_Lstar (Default value = None)
+
+        prefetch_sul: independent (synchronous) replica of the SUL used for prefetching, see run_Lstar
+            (Default value = None)
+
+        return_data: if True, a map containing all information(runtime/#queries/#steps) will be returned
+            (Default value = False)
+
+        print_level: 0 - None, 1 - just results, 2 - current round and hypothesis size, 3 - educational/debug
+            (Default value = 2)
+
+    Returns:
+
+        automaton of type automaton_type (dict containing all information about learning if 'return_data' is True)
+
+    """
+    loop = asyncio.get_running_loop()
+    sync_sul = SyncSULAdapter(sul, loop)
+    eq_oracle.sul = sync_sul
+
+    learn = partial(run_Lstar, alphabet, sync_sul, eq_oracle, automaton_type, closing_strategy=closing_strategy,
+                    cex_processing=cex_processing, suffix_closedness=suffix_closedness,
+                    closedness_type=closedness_type, max_learning_rounds=max_learning_rounds,
+                    cache_and_non_det_check=cache_and_non_det_check, cost_model=cost_model,
+                    prefetch_sul=prefetch_sul, return_data=return_data, print_level=print_level)
+    return await loop.run_in_executor(None, learn)
@@ -1,10 +1,12 @@
 import time
 
-from aalpy.base import Oracle, SUL
-from aalpy.utils.HelperFunctions import extend_set, print_learning_info, print_observation_table, all_prefixes
+from aalpy.base import Oracle, SUL, CostModel
+from aalpy.utils.HelperFunctions import extend_set, print_learning_info, print_observation_table, all_prefixes, \
+    print_cache_report
 from .CounterExampleProcessing import longest_prefix_cex_processing, rs_cex_processing
 from .ObservationTable import ObservationTable
-from ...base.SUL import CacheSUL
+from .QueryPrefetcher import QueryPrefetcher, predict_row_extensions, predict_rs_queries
+from ...base.SUL import CacheSUL, set_sul_phase, get_base_phase, wrapped_suls
 
 counterexample_processing_strategy = [None, 'rs', 'longest_prefix']
 closedness_options = ['prefix', 'suffix']
@@ -13,7 +15,8 @@ print_options = [0, 1, 2, 3]
 
 def run_Lstar(alphabet: list, sul: SUL, eq_oracle: Oracle, automaton_type,
               closing_strategy='longest_first', cex_processing='rs', suffix_closedness=True, closedness_type='suffix',
-              max_learning_rounds=None, cache_and_non_det_check=True, return_data=False, print_level=2):
+              max_learning_rounds=None, cache_and_non_det_check=True, cost_model: CostModel = None, prefetch_sul=None,
+              continue_queries=False, return_data=False, print_level=2):
     """Executes L* algorithm with Riverst-Schapire counter example processing.
 
     Args:
@@ -26,8 +29,8 @@ def run_Lstar(alphabet: list, sul: SUL, eq_oracle: Oracle, automaton_type,
 
         automaton_type: type of automaton to be learned. Either 'dfa', 'mealy' or 'moore'.
 
-        closing_strategy: closing strategy used in the close method. Either 'longest_first', 'shortest_first' or
-            'single' (Default value = 'longest_first')
+        closing_strategy: closing strategy used in the close method. Either 'longest_first', 'shortest_first',
+            'single' or 'cost_aware' (Default value = 'longest_first')
 
         cex_processing: Counterexample processing strategy. Either None, 'rs' (Riverst-Schapire) or 'longest_prefix'.
             (Default value = 'rs')
@@ -41,7 +44,21 @@ def run_Lstar(alphabet: list, sul: SUL, eq_oracle: Oracle, automaton_type,
 
         max_learning_rounds: number of learning rounds after which learning will terminate (Default value = None)
 
-        cache_and_non_det_check: Use caching and non-determinism checks (Default value = True)
+        cache_and_non_det_check: Use caching and non-determinism checks. If sul is already a CacheSUL (eg. with a
+            CompactCacheTree as cache), it will be used as is. (Default value = True)
+
+        cost_model: cost of resets and steps of the SUL. If set, the cost of learning and equivalence queries is
+            reported in the returned data, and it is used by the 'cost_aware' closing strategy and by the equivalence
+            oracle, if the oracle takes costs into account and has no cost model of its own. Without caching, costs
+            are estimated from the number of resets and steps. (Default value = None)
+
+        prefetch_sul: independent replica of the SUL. If set, queries that are likely to be asked next (extensions of
+            rows that might be promoted to S, and queries of the counterexample processing) are executed on it in the
+            background and stored in the cache. Requires cache_and_non_det_check. (Default value = None)
+
+        continue_queries: if True, membership queries that extend the previous membership query are continued
+            without resetting the SUL (see CacheSUL). Only used if the sul is wrapped in a CacheSUL by run_Lstar.
+            (Default value = False)
 
         return_data: if True, a map containing all information(runtime/#queries/#steps) will be returned
             (Default value = False)
@@ -60,8 +77,21 @@ def run_Lstar(alphabet: list, sul: SUL, eq_oracle: Oracle, automaton_type,
 
     if cache_and_non_det_check:
         # Wrap the sul in the CacheSUL, so that all steps/queries are cached
-        sul = CacheSUL(sul)
+        if not isinstance(sul, CacheSUL):
+            sul = CacheSUL(sul, continue_queries=continue_queries)
         eq_oracle.sul = sul
+        if sul.cost_model is None:
+            sul.cost_model = cost_model
+        # bounded caches keep the queries of the observation table, traces of the equivalence oracle may be evicted
+        sul.pin_queries = hasattr(sul.cache, 'pin')
+
+    if cost_model is not None and eq_oracle.cost_model is None:
+        eq_oracle.cost_model = cost_model
+
+    prefetcher = None
+    if prefetch_sul is not None:
+        assert cache_and_non_det_check, 'Prefetching requires caching.'
+        prefetcher = QueryPrefetcher(sul, prefetch_sul)
 
     start_time = time.time()
     eq_query_time = 0
@@ -69,6 +99,7 @@ def run_Lstar(alphabet: list, sul: SUL, eq_oracle: Oracle, automaton_type,
     hypothesis = None
 
     observation_table = ObservationTable(alphabet, sul, automaton_type)
+    set_sul_phase(sul, 'learning:table_filling')
 
     # Initial update of observation table, for empty row
     observation_table.update_obs_table()
@@ -79,6 +110,7 @@ def run_Lstar(alphabet: list, sul: SUL, eq_oracle: Oracle, automaton_type,
 
         # Make observation table consistent (iff there is no counterexample processing)
         if not cex_processing:
+            set_sul_phase(sul, 'learning:consistency')
             inconsistent_rows = observation_table.get_causes_of_inconsistency()
             while inconsistent_rows is not None:
                 extend_set(observation_table.E, inconsistent_rows)
@@ -86,14 +118,15 @@ def run_Lstar(alphabet: list, sul: SUL, eq_oracle: Oracle, automaton_type,
                 inconsistent_rows = observation_table.get_causes_of_inconsistency()
 
         # Close observation table
-        rows_to_close = observation_table.get_rows_to_close(closing_strategy)
+        set_sul_phase(sul, 'learning:closing')
+        rows_to_close = observation_table.get_rows_to_close(closing_strategy, cost_model)
         while rows_to_close is not None:
             rows_to_query = []
             for row in rows_to_close:
                 observation_table.S.append(row)
                 rows_to_query.extend([row + (a,) for a in alphabet])
             observation_table.update_obs_table(s_set=rows_to_query)
-            rows_to_close = observation_table.get_rows_to_close(closing_strategy)
+            rows_to_close = observation_table.get_rows_to_close(closing_strategy, cost_model)
 
         # Generate hypothesis
         hypothesis = observation_table.gen_hypothesis(check_for_duplicate_rows=cex_processing is None)
@@ -104,9 +137,18 @@ def run_Lstar(alphabet: list, sul: SUL, eq_oracle: Oracle, automaton_type,
         if print_level == 3:
             print_observation_table(observation_table, 'det')
 
+        if cache_and_non_det_check:
+            sul.repin([s + e for s in observation_table.S + list(observation_table.s_dot_a())
+                       for e in observation_table.E])
+
+        if prefetcher:
+            prefetcher.prefetch(predict_row_extensions(observation_table))
+
         # Find counterexample
         eq_query_start = time.time()
+        set_sul_phase(eq_oracle.sul, f'eq_oracle:{type(eq_oracle).__name__}')
         cex = eq_oracle.find_cex(hypothesis)
+        set_sul_phase(sul, 'learning:cex_processing')
         eq_query_time += time.time() - eq_query_start
 
         # If no counterexample is found, return the hypothesis
@@ -130,11 +172,19 @@ def run_Lstar(alphabet: list, sul: SUL, eq_oracle: Oracle, automaton_type,
             cex_suffixes = longest_prefix_cex_processing(observation_table.S + list(observation_table.s_dot_a()),
                                                          cex, closedness_type)
         else:
+            if prefetcher:
+                prefetcher.prefetch(predict_rs_queries(hypothesis, cex))
             cex_suffixes = rs_cex_processing(sul, cex, hypothesis, suffix_closedness, closedness_type)
 
+        set_sul_phase(sul, 'learning:table_filling')
         added_suffixes = extend_set(observation_table.E, cex_suffixes)
         observation_table.update_obs_table(e_set=added_suffixes)
 
+    if prefetcher:
+        prefetcher.stop()
+    if cache_and_non_det_check:
+        sul.end_session()
+
     total_time = round(time.time() - start_time, 2)
     eq_query_time = round(eq_query_time, 2)
     learning_time = round(total_time - eq_query_time, 2)
@@ -149,13 +199,44 @@ def run_Lstar(alphabet: list, sul: SUL, eq_oracle: Oracle, automaton_type,
         'learning_time': learning_time,
         'eq_oracle_time': eq_query_time,
         'total_time': total_time,
-        'characterization set': observation_table.E
+        'characterization set': observation_table.E,
+        'resets': sul.num_queries + eq_oracle.num_queries,
+        'steps': sul.num_steps + eq_oracle.num_steps
     }
     if cache_and_non_det_check:
         info['cache_saved'] = sul.num_cached_queries
+        info['continued_queries'] = sul.num_continued_queries
+        info['cells_from_cache'] = observation_table.num_cells_from_cache
+        info['cache_report'] = sul.get_cache_report()
+        if hasattr(sul.cache, 'get_stats'):
+            info['cache_stats'] = sul.cache.get_stats()
+    if cost_model is not None:
+        if cache_and_non_det_check:
+            info['cost_learning'] = sum(cost for phase, cost in sul.costs.items()
+                                        if get_base_phase(phase) == 'learning')
+            info['cost_eq_oracle'] = sum(cost for phase, cost in sul.costs.items()
+                                         if get_base_phase(phase) != 'learning')
+        else:
+            info['cost_learning'] = cost_model.estimate(sul.num_queries, sul.num_steps)
+            info['cost_eq_oracle'] = cost_model.estimate(eq_oracle.num_queries, eq_oracle.num_steps)
+        info['cost_total'] = info['cost_learning'] + info['cost_eq_oracle']
+    if prefetcher:
+        info['queries_prefetch'] = prefetcher.sul.num_queries
+        info['steps_prefetch'] = prefetcher.sul.num_steps
+        info['resets'] += prefetcher.sul.num_queries
+        info['steps'] += prefetcher.sul.num_steps
+        if cost_model is not None:
+            info['cost_prefetch'] = sum(prefetcher.sul.costs.values())
+            info['cost_total'] += info['cost_prefetch']
+    for wrapped_sul in wrapped_suls(sul):
+        if hasattr(wrapped_sul, 'get_latency_stats'):
+            info['latency'] = wrapped_sul.get_latency_stats()
+            break
 
     if print_level > 0:
         print_learning_info(info)
+        if print_level == 3 and 'cache_report' in info:
+            print_cache_report(info['cache_report'])
 
     if return_data:
         return hypothesis, info
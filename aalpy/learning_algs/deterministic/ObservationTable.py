@@ -1,10 +1,11 @@
 from collections import defaultdict
 
 from aalpy.base import Automaton, SUL
+from aalpy.base.SUL import CacheSUL
 from aalpy.automata import Dfa, DfaState, MealyState, MealyMachine, MooreMachine, MooreState
 
 aut_type = ['dfa', 'mealy', 'moore']
-closing_options = ['shortest_first', 'longest_first', 'single']
+closing_options = ['shortest_first', 'longest_first', 'single', 'cost_aware']
 
 
 class ObservationTable:
@@ -36,6 +37,8 @@ class ObservationTable:
         self.T = defaultdict(tuple)
 
         self.sul = sul
+        # number of cells filled from the cache of the CacheSUL, without a membership query
+        self.num_cells_from_cache = 0
         empty_word = tuple()
         self.S.append(empty_word)
 
@@ -43,17 +46,24 @@ class ObservationTable:
         if self.automaton_type == 'dfa' or self.automaton_type == 'moore':
             self.E.insert(0, empty_word)
 
-    def get_rows_to_close(self, closing_strategy='longest_first'):
+    def get_rows_to_close(self, closing_strategy='longest_first', cost_model=None):
         """
         Get rows for that need to be closed. Row selection is done according to closing_strategy.
         The length of the row is defined by the length of the prefix corresponding to the row in the S set.
         longest_first -> get all rows that need to be closed and ask membership queries for the longest row first
         shortest_first -> get all rows that need to be closed and ask membership queries for the shortest row first
         single -> find and ask membership query for the single row
+        cost_aware -> of all rows with the same values, the row with the cheapest prefix is closed, as all membership
+        queries of rows added to S (and of their extensions) start with it. Only rows that can not get a cheaper
+        representative from the extensions of the closed rows are closed at once, more expensive rows are closed in
+        later iterations, after the extensions are queried.
 
         Args:
 
-            closing_strategy: one of ['shortest_first', 'longest_first', 'single'] (Default value = 'longest_first')
+            closing_strategy: one of ['shortest_first', 'longest_first', 'single', 'cost_aware']
+                (Default value = 'longest_first')
+
+            cost_model: cost model used by the 'cost_aware' strategy, if None the cost of a prefix is its length
 
         Returns:
 
@@ -61,6 +71,9 @@ class ObservationTable:
 
         """
         assert closing_strategy in closing_options
+        if closing_strategy == 'cost_aware':
+            return self._get_cheapest_rows_to_close(cost_model)
+
         rows_to_close = []
         row_values = set()
 
@@ -83,6 +96,27 @@ class ObservationTable:
 
         return rows_to_close
 
+    def _get_cheapest_rows_to_close(self, cost_model=None):
+        prefix_cost = cost_model.word_cost if cost_model is not None else len
+        s_rows = {self.T[s] for s in self.S}
+
+        cheapest_rows = dict()
+        for t in self.s_dot_a():
+            row_t = self.T[t]
+            if row_t not in s_rows:
+                cost = prefix_cost(t)
+                if row_t not in cheapest_rows or cost < cheapest_rows[row_t][0]:
+                    cheapest_rows[row_t] = (cost, t)
+
+        if not cheapest_rows:
+            return None
+
+        rows = sorted(cheapest_rows.values(), key=lambda cost_and_row: cost_and_row[0])
+        # extensions of the cheapest row cost at least as much as the row followed by the cheapest input, more
+        # expensive rows might be replaced by such an extension with the same values
+        max_cost = rows[0][0] + min(prefix_cost(a) for a in self.A)
+        return [t for cost, t in rows if cost <= max_cost]
+
     def get_causes_of_inconsistency(self):
         """
         If the two rows in the S set are the same, but their one letter extensions are not, this method founds
@@ -132,17 +166,89 @@ class ObservationTable:
 
         """
 
+        cells = self.get_missing_cells(s_set, e_set)
+        outputs = self.get_cached_outputs(cells)
+        not_cached = [index for index, output in enumerate(outputs) if output is None]
+        if not_cached:
+            queried_outputs = self.sul.query_batch([cells[i][0] + cells[i][1] for i in not_cached])
+            for index, output in zip(not_cached, queried_outputs):
+                outputs[index] = output
+        self.fill_cells(cells, outputs)
+
+    def get_cached_outputs(self, cells: list):
+        """
+        Finds the outputs of cells that are already in the cache of the CacheSUL. Cells are grouped by their row, so
+        that the prefix of each row is traversed in the cache tree only once.
+
+        Args:
+
+            cells: list of (s, e) tuples, as returned by get_missing_cells
+
+        Returns:
+
+            list in which the i-th element are the outputs of the i-th cell if it is cached, None otherwise
+
+        """
+        outputs = [None] * len(cells)
+        if not isinstance(self.sul, CacheSUL):
+            return outputs
+
+        row_cells = defaultdict(list)
+        for index, (s, e) in enumerate(cells):
+            row_cells[s].append(index)
+        for s, indices in row_cells.items():
+            cached_outputs = self.sul.in_cache_batch(s, [cells[i][1] for i in indices])
+            for index, output in zip(indices, cached_outputs):
+                outputs[index] = output
+
+        self.num_cells_from_cache += sum(1 for output in outputs if output is not None)
+        return outputs
+
+    def get_missing_cells(self, s_set: list = None, e_set: list = None):
+        """
+        Computes all cells of the observation table for which a membership query has to be performed. Cells are
+        returned in the order in which they have to be added to the table.
+
+        Args:
+
+            s_set: Prefixes of S set for which to find missing cells. If None, then whole S set will be used.
+
+            e_set: Suffixes of E set for which to find missing cells. If None, then whole E set will be used.
+
+        Returns:
+
+            list of (s, e) tuples
+
+        """
         update_S = s_set if s_set else list(self.S) + list(self.s_dot_a())
         update_E = e_set if e_set else self.E
 
         # This could save few queries
         update_S.reverse()
 
+        cells = []
+        num_planned = dict()
         for s in update_S:
             for e in update_E:
-                if len(self.T[s]) != len(self.E):
-                    output = self.sul.query(s + e)
-                    self.T[s] += (output[-1],)
+                planned = num_planned.get(s, len(self.T[s]))
+                if planned != len(self.E):
+                    cells.append((s, e))
+                    num_planned[s] = planned + 1
+        return cells
+
+    def fill_cells(self, cells: list, outputs: list):
+        """
+        Adds the results of membership queries to the observation table.
+
+        Args:
+
+            cells: list of (s, e) tuples, as returned by get_missing_cells
+
+            outputs: list of membership query outputs, where the i-th element corresponds to the i-th cell
+
+        """
+        for (s, e), output in zip(cells, outputs):
+            self.T[s] += (output[-1],)
 
     def gen_hypothesis(self, check_for_duplicate_rows=False) -> Automaton:
         """
@@ -0,0 +1,176 @@
+import threading
+from collections import deque
+
+from aalpy.base import SUL
+from aalpy.base.SUL import CacheSUL, get_maximal_words
+
+
+def predict_row_extensions(observation_table, max_queries=1000):
+    """
+    Predicts the membership queries that follow if rows of S.A are promoted to S, ie. the queries of their one letter
+    extensions with all suffixes of E. Rows with shorter prefixes are predicted first.
+
+    Args:
+
+        observation_table: observation table of the learning algorithm
+
+        max_queries: maximum number of predicted queries
+
+    Returns:
+
+        list of predicted membership queries
+
+    """
+    s_set = set(observation_table.S)
+    predictions = []
+    for row in sorted(observation_table.s_dot_a(), key=len):
+        if row in s_set:
+            continue
+        for a in observation_table.A:
+            for e in observation_table.E:
+                predictions.append(row + a + e)
+                if len(predictions) >= max_queries:
+                    return predictions
+    return predictions
+
+
+def predict_rs_queries(hypothesis, cex: tuple, depth=3):
+    """
+    Predicts the membership queries of the binary search of Rivest-Schapire counterexample processing (see
+    rs_cex_processing). As each query depends on the outcome of the previous one, all queries of the first `depth`
+    levels of the binary search tree are predicted.
+
+    Args:
+
+        hypothesis: hypothesis on which counterexample was found
+
+        cex: counterexample
+
+        depth: number of predicted levels of the binary search, 2^depth - 1 queries are predicted
+
+    Returns:
+
+        list of predicted membership queries
+
+    """
+    cex = tuple(cex)
+    # access sequences of the states reached by all prefixes of the counterexample
+    prefixes = []
+    state = hypothesis.initial_state
+    for letter in cex:
+        prefixes.append(state.prefix)
+        state = state.transitions[letter]
+    prefixes.append(state.prefix)
+
+    predictions = [cex]
+    intervals = [(1, len(cex) - 2)]
+    for _ in range(depth):
+        next_intervals = []
+        for lower, upper in intervals:
+            if upper < lower:
+                continue
+            mid = (lower + upper) // 2
+            predictions.append(prefixes[mid] + cex[mid:])
+            next_intervals.extend([(mid + 1, upper), (lower, mid - 1)])
+        intervals = next_intervals
+    return predictions
+
+
+class QueryPrefetcher:
+    """
+    Speculatively executes membership queries that the learning algorithm is likely to ask next, on a separate replica
+    of the system under learning in a background thread, while the learning algorithm computes or the equivalence
+    oracle interacts with the SUL. Results are stored in the cache shared with the CacheSUL of the learning algorithm,
+    so predicted queries are cache hits once they are asked. If the learning algorithm asks a query that is a prefix of
+    the query in progress, the CacheSUL waits for it instead of executing the query again.
+    """
+
+    def __init__(self, sul: CacheSUL, prefetch_sul: SUL):
+        """
+        Args:
+
+            sul: CacheSUL of the learning algorithm
+
+            prefetch_sul: independent replica of the system under learning used for prefetching
+        """
+        self.sul = sul.fork(prefetch_sul)
+        self.error = None
+
+        self._pending = deque()
+        self._condition = threading.Condition()
+        self._stopped = False
+        # query executed by the background thread
+        self._in_flight = None
+        self._learning_sul = sul
+        sul.prefetcher = self
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def prefetch(self, words: list, replace=True):
+        """
+        Schedules the queries for prefetching. Only words that are not prefixes of other words are executed.
+
+        Args:
+
+            words: predicted membership queries
+
+            replace: if True, queries that were scheduled before and were not executed yet are dropped, as they are
+                not relevant anymore
+
+        """
+        maximal_words, _ = get_maximal_words(words)
+        with self._condition:
+            if replace:
+                self._pending.clear()
+            self._pending.extend(maximal_words)
+            self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    break
+                word = self._pending.popleft()
+                self._in_flight = word
+            try:
+                # answered from the cache if the word was already queried
+                self.sul.query(word)
+            except BaseException as e:
+                # eg. non-determinism, reported by stop
+                self.error = e
+                return
+            finally:
+                with self._condition:
+                    self._in_flight = None
+                    self._condition.notify_all()
+        self.sul.end_session()
+
+    def wait_for(self, words: list):
+        """
+        Waits until the query in progress is completed, if any of the words is its prefix and therefore answered by it.
+
+        Args:
+
+            words: membership queries that are not in the cache
+
+        """
+        with self._condition:
+            while self._in_flight is not None and \
+                    any(self._in_flight[:len(word)] == word for word in words):
+                self._condition.wait()
+
+    def stop(self):
+        """
+        Stops prefetching and waits for the query in progress. Errors that occurred in the background thread are
+        raised.
+        """
+        with self._condition:
+            self._stopped = True
+            self._pending.clear()
+            self._condition.notify_all()
+        self._thread.join()
+        self._learning_sul.prefetcher = None
+        if self.error is not None:
+            raise self.error
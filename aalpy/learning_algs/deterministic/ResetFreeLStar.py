@@ -0,0 +1,231 @@
+import random
+import time
+
+from aalpy.base import SUL
+from aalpy.base.CacheTree import CacheTree
+from aalpy.base.SUL import get_maximal_words
+from aalpy.utils.HelperFunctions import extend_set, print_learning_info
+from .CounterExampleProcessing import longest_prefix_cex_processing
+from .LStar import print_options
+from .ObservationTable import ObservationTable, closing_options
+
+
+def _lstar_copy(alphabet: list, sul: SUL, closing_strategy):
+    """
+    Generator implementing L* for Mealy machines that does not interact with the SUL directly. It yields requests,
+    either ('query', list of words) to which list of outputs has to be sent, or ('equivalence', hypothesis) to which a
+    counterexample or None has to be sent.
+    """
+    # queries are never performed by the table itself, sul is only passed to satisfy the constructor
+    observation_table = ObservationTable(alphabet, sul, 'mealy')
+
+    cells = observation_table.get_missing_cells()
+    outputs = yield 'query', [s + e for s, e in cells]
+    observation_table.fill_cells(cells, outputs)
+
+    while True:
+        rows_to_close = observation_table.get_rows_to_close(closing_strategy)
+        while rows_to_close is not None:
+            rows_to_query = []
+            for row in rows_to_close:
+                observation_table.S.append(row)
+                rows_to_query.extend([row + (a,) for a in alphabet])
+            cells = observation_table.get_missing_cells(s_set=rows_to_query)
+            outputs = yield 'query', [s + e for s, e in cells]
+            observation_table.fill_cells(cells, outputs)
+            rows_to_close = observation_table.get_rows_to_close(closing_strategy)
+
+        hypothesis = observation_table.gen_hypothesis()
+        cex = yield 'equivalence', hypothesis
+
+        cex_suffixes = longest_prefix_cex_processing(observation_table.S + list(observation_table.s_dot_a()), cex)
+        added_suffixes = extend_set(observation_table.E, cex_suffixes)
+        cells = observation_table.get_missing_cells(e_set=added_suffixes)
+        outputs = yield 'query', [s + e for s, e in cells]
+        observation_table.fill_cells(cells, outputs)
+
+
+class _CopyLearner:
+    """
+    Copy of the L* algorithm that learns the SUL from the state reached after the homing sequence returned a
+    particular response.
+    """
+
+    def __init__(self, response, alphabet, sul, closing_strategy):
+        self.response = response
+        self.cache = CacheTree()
+        self.learner = _lstar_copy(alphabet, sul, closing_strategy)
+        self.request = next(self.learner)
+        self.words_to_execute = []
+        self.learning_rounds = 0
+        self.passed_walks = 0
+        self.hypothesis = None
+        self._prepare_request()
+
+    def _prepare_request(self):
+        kind, payload = self.request
+        if kind == 'query':
+            self.words_to_execute = [w for w in get_maximal_words(payload)[0] if self.cache.in_cache(w) is None]
+        else:
+            self.hypothesis = payload
+            self.learning_rounds += 1
+            self.passed_walks = 0
+
+    def _send(self, value):
+        self.request = self.learner.send(value)
+        self._prepare_request()
+
+    def add_trace(self, word, outputs):
+        self.cache.reset()
+        try:
+            for i, o in zip(word, outputs):
+                self.cache.step_in_cache(i, o)
+        except SystemExit as e:
+            raise SystemExit(f'Homing sequence response {self.response} does not identify a unique state, '
+                             f'either the sequence is not homing or the SUL is not deterministic.\n{e}')
+
+    def answer_queries(self):
+        """
+        Answer all queries of the current request from the cache, if all of them were executed.
+        """
+        while self.request[0] == 'query' and not self.words_to_execute:
+            self._send([self.cache.in_cache(word) for word in self.request[1]])
+
+    def process_cex(self, cex):
+        self._send(tuple(cex))
+
+
+def run_reset_free_Lstar(alphabet: list, sul: SUL, homing_sequence: tuple, closing_strategy='longest_first',
+                         walk_len=30, num_walks=100, seed=None, return_data=False, print_level=2):
+    """
+    Reset-free variant of L* for Mealy machines, following the approach of Rivest and Schapire for learning without
+    reset. The SUL is reset only once, afterwards all queries are performed in a single continuous interaction.
+    Instead of a reset, the homing sequence is executed; its response identifies the state it leads to. For each
+    observed response a separate copy of L* learns the SUL from the corresponding state and is asked the next query
+    whenever the homing sequence returns its response. Equivalence queries are random walks starting from that
+    state. Learning terminates when num_walks consecutive walks of some copy did not find a counterexample.
+    A synchronizing sequence is a homing sequence with a single response, and results in a single copy. The empty
+    sequence is a homing sequence of SULs with a single state (see Automaton.compute_homing_sequence).
+
+    The SUL has to be deterministic and strongly connected, and homing_sequence has to be a homing sequence of the SUL.
+    Queries of each copy are cached and checked for non-determinism, which detects sequences that are not homing.
+
+    Args:
+
+        alphabet: input alphabet
+
+        sul: system under learning
+
+        homing_sequence: homing (or synchronizing) sequence of the SUL
+
+        closing_strategy: closing strategy used in the close method. Either 'longest_first', 'shortest_first' or
+            'single' (Default value = 'longest_first')
+
+        walk_len: length of random walks used as equivalence queries (Default value = 30)
+
+        num_walks: number of consecutive random walks that have to conform to the hypothesis (Default value = 100)
+
+        seed: seed of the inputs of the random walks (Default value = None)
+
+        return_data: if True, a map containing all information(runtime/#resets/#steps) will be returned
+            (Default value = False)
+
+        print_level: 0 - None, 1 - just results, 2 - current round and hypothesis size (Default value = 2)
+
+    Returns:
+
+        Mealy machine whose initial state is the state reached by the homing sequence (dict containing all
+        information about learning if 'return_data' is True)
+
+    """
+    assert closing_strategy in closing_options
+    assert print_level in print_options
+
+    rand = random.Random(seed)
+    start_time = time.time()
+    eq_query_time = 0
+
+    copies = dict()
+    num_queries, num_walks_performed = 0, 0
+    steps_homing, steps_learning, steps_eq_oracle = 0, 0, 0
+
+    # the only reset of the SUL
+    sul.pre()
+
+    while True:
+        response = tuple(sul.step(i) for i in homing_sequence)
+        steps_homing += len(homing_sequence)
+
+        copy = copies.get(response)
+        if copy is None:
+            copy = _CopyLearner(response, alphabet, sul, closing_strategy)
+            copies[response] = copy
+        learning_rounds = copy.learning_rounds
+
+        if copy.request[0] == 'query':
+            word = copy.words_to_execute.pop()
+            outputs = [sul.step(i) for i in word]
+            steps_learning += len(word)
+            num_queries += 1
+
+            copy.add_trace(word, outputs)
+        else:
+            eq_query_start = time.time()
+            hypothesis = copy.hypothesis
+            hypothesis.reset_to_initial()
+            inputs, outputs = [], []
+            cex_found = False
+            for _ in range(walk_len):
+                inputs.append(rand.choice(alphabet))
+                outputs.append(sul.step(inputs[-1]))
+                steps_eq_oracle += 1
+                if outputs[-1] != hypothesis.step(inputs[-1]):
+                    cex_found = True
+                    break
+            num_walks_performed += 1
+            eq_query_time += time.time() - eq_query_start
+
+            copy.add_trace(inputs, outputs)
+            if cex_found:
+                copy.process_cex(inputs)
+            else:
+                copy.passed_walks += 1
+                if copy.passed_walks >= num_walks:
+                    break
+
+        copy.answer_queries()
+        if print_level > 1 and copy.learning_rounds != learning_rounds:
+            print(f'Hypothesis {copy.learning_rounds} (homing response {response}): '
+                  f'{len(copy.hypothesis.states)} states.')
+
+    sul.post()
+
+    total_time = round(time.time() - start_time, 2)
+    eq_query_time = round(eq_query_time, 2)
+    learning_time = round(total_time - eq_query_time, 2)
+
+    info = {
+        'learning_rounds': copy.learning_rounds,
+        'automaton_size': len(copy.hypothesis.states),
+        'queries_learning': num_queries,
+        'steps_learning': steps_learning,
+        'queries_eq_oracle': num_walks_performed,
+        'steps_eq_oracle': steps_eq_oracle,
+        'learning_time': learning_time,
+        'eq_oracle_time': eq_query_time,
+        'total_time': total_time,
+        'characterization set': copy.hypothesis.characterization_set,
+        'resets': 1,
+        'steps': steps_homing + steps_learning + steps_eq_oracle,
+        'steps_homing': steps_homing,
+        'num_copies': len(copies),
+        'homing_response': copy.response
+    }
+
+    if print_level > 0:
+        print_learning_info(info)
+
+    if return_data:
+        return copy.hypothesis, info
+
+    return copy.hypothesis
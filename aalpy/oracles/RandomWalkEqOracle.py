@@ -10,9 +10,12 @@ class RandomWalkEqOracle(Oracle):
     """
     Equivalence oracle where queries contain random inputs. After every step, 'reset_prob' determines the probability
     that the system will reset and a new query asked.
+    If a cost model is set, the reset probability is lowered to step_cost / reset_cost when resets are expensive, so
+    that the cost of a reset does not exceed the expected cost of the steps of a walk.
     """
 
-    def __init__(self, alphabet: list, sul: SUL, num_steps=5000, reset_after_cex=True, reset_prob=0.09):
+    def __init__(self, alphabet: list, sul: SUL, num_steps=5000, reset_after_cex=True, reset_prob=0.09,
+                 cost_model=None):
         """
 
         Args:
@@ -26,12 +29,15 @@ class RandomWalkEqOracle(Oracle):
                 or steps will equal to num_steps
 
             reset_prob: probability that the new query will be asked
+
+            cost_model: cost model of the SUL (see CostModel) (Default value = None)
         """
 
         super().__init__(alphabet, sul)
         self.step_limit = num_steps
         self.reset_after_cex = reset_after_cex
         self.reset_prob = reset_prob
+        self.cost_model = cost_model
         self.random_steps_done = 0
         self.automata_type = None
 
@@ -39,6 +45,10 @@ class RandomWalkEqOracle(Oracle):
         if not self.automata_type:
             self.automata_type = automaton_dict.get(type(hypothesis), 'det')
 
+        reset_prob = self.reset_prob
+        if self.cost_model is not None and self.cost_model.reset_cost > 0:
+            reset_prob = min(reset_prob, self.cost_model.step_cost / self.cost_model.reset_cost)
+
         inputs = []
         outputs = []
         self.reset_hyp_and_sul(hypothesis)
@@ -47,7 +57,7 @@ class RandomWalkEqOracle(Oracle):
             self.num_steps += 1
             self.random_steps_done += 1
 
-            if random.random() <= self.reset_prob:
+            if random.random() <= reset_prob:
                 self.reset_hyp_and_sul(hypothesis)
                 inputs.clear()
                 outputs.clear()
@@ -11,7 +11,7 @@ class RandomWordEqOracle(Oracle):
     """
 
     def __init__(self, alphabet: list, sul: SUL, num_walks=100, min_walk_len=10, max_walk_len=100,
-                 reset_after_cex=True):
+                 reset_after_cex=True, batch_size=None):
         """
         Args:
             alphabet: input alphabet
@@ -26,6 +26,9 @@ class RandomWordEqOracle(Oracle):
 
             reset_after_cex: if True, num_walks will be preformed after every counter example, else the total number
                 or walks will equal to num_walks
+
+            batch_size: if set, random words are executed in batches of batch_size membership queries
+                (see SUL.query_batch and SULPool). Only used for deterministic hypotheses.
         """
 
         super().__init__(alphabet, sul)
@@ -34,12 +37,16 @@ class RandomWordEqOracle(Oracle):
         self.max_walk_len = max_walk_len
         self.reset_after_cex = reset_after_cex
         self.num_walks_done = 0
+        self.batch_size = batch_size
         self.automata_type = None
 
     def find_cex(self, hypothesis):
         if not self.automata_type:
             self.automata_type = automaton_dict.get(type(hypothesis), 'det')
 
+        if self.batch_size and self.automata_type == 'det':
+            return self._find_cex_batched(hypothesis)
+
         while self.num_walks_done < self.num_walks:
             inputs = []
             outputs = []
@@ -78,6 +85,22 @@ class RandomWordEqOracle(Oracle):
 
         return None
 
+    def _find_cex_batched(self, hypothesis):
+        while self.num_walks_done < self.num_walks:
+            num_words = min(self.batch_size, self.num_walks - self.num_walks_done)
+            self.num_walks_done += num_words
+
+            words = [tuple(choice(self.alphabet) for _ in range(randint(self.min_walk_len, self.max_walk_len)))
+                     for _ in range(num_words)]
+
+            cex = self.find_cex_in_batch(hypothesis, words)
+            if cex:
+                if self.reset_after_cex:
+                    self.num_walks_done = 0
+                return cex
+
+        return None
+
     def reset_counter(self):
         if self.reset_after_cex:
             self.num_walks_done = 0
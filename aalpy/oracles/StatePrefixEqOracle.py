@@ -11,8 +11,10 @@ class StatePrefixEqOracle(Oracle):
     surrounding is randomly explored. Note that each state serves as a root of random exploration of maximum length
     rand_walk_len exactly walk_per_state times during learning. Therefore excessive testing of initial states is
     avoided.
+    If a cost model is set, walks start from the states that are cheapest to reach first, so that counterexamples are
+    found at lower cost.
     """
-    def __init__(self, alphabet: list, sul: SUL, walks_per_state=10, walk_len=30, depth_first=False):
+    def __init__(self, alphabet: list, sul: SUL, walks_per_state=10, walk_len=30, depth_first=False, cost_model=None):
         """
         Args:
 
@@ -25,12 +27,16 @@ class StatePrefixEqOracle(Oracle):
             walk_len:length of random walk
 
             depth_first:first explore newest states
+
+            cost_model: cost model of the SUL (see CostModel), if set states are covered in order of the cost of
+                reaching them (Default value = None)
         """
 
         super().__init__(alphabet, sul)
         self.walks_per_state = walks_per_state
         self.steps_per_walk = walk_len
         self.depth_first = depth_first
+        self.cost_model = cost_model
 
         self.freq_dict = dict()
 
@@ -49,17 +55,16 @@ class StatePrefixEqOracle(Oracle):
             states_to_cover.sort(key=lambda x: len(x.prefix), reverse=True)
         else:
             random.shuffle(states_to_cover)
+            if self.cost_model is not None:
+                # stable sort, states with the same cost remain shuffled
+                states_to_cover.sort(key=lambda x: self.cost_model.query_cost(x.prefix))
 
         for state in states_to_cover:
             self.freq_dict[state.prefix] = self.freq_dict[state.prefix] + 1
 
-            self.reset_hyp_and_sul(hypothesis)
+            self.reset_to_state(hypothesis, state)
 
             prefix = state.prefix
-            for p in prefix:
-                hypothesis.step(p)
-                self.sul.step(p)
-                self.num_steps += 1
 
             suffix = ()
             for _ in range(self.steps_per_walk):
@@ -9,7 +9,7 @@ class WMethodEqOracle(Oracle):
     Equivalence oracle based on characterization set/ W-set. From 'Tsun S. Chow.   Testing software design modeled by
     finite-state machines'.
     """
-    def __init__(self, alphabet: list, sul: SUL, max_number_of_states, shuffle_test_set=True):
+    def __init__(self, alphabet: list, sul: SUL, max_number_of_states, shuffle_test_set=True, batch_size=None):
         """
         Args:
 
@@ -17,11 +17,14 @@ class WMethodEqOracle(Oracle):
             sul: system under learning
             max_number_of_states: maximum number of states in the automaton
             shuffle_test_set: if True, test cases will be shuffled
+            batch_size: if set, test cases will be executed in batches of batch_size membership queries
+                (see SUL.query_batch and SULPool), else test cases are executed one by one
         """
 
         super().__init__(alphabet, sul)
         self.m = max_number_of_states
         self.shuffle = shuffle_test_set
+        self.batch_size = batch_size
         self.cache = set()
 
     def find_cex(self, hypothesis):
@@ -47,6 +50,15 @@ class WMethodEqOracle(Oracle):
         else:
             test_set.sort(key=len, reverse=True)
 
+        if self.batch_size:
+            for i in range(0, len(test_set), self.batch_size):
+                batch = test_set[i:i + self.batch_size]
+                cex = self.find_cex_in_batch(hypothesis, batch)
+                if cex:
+                    return cex
+                self.cache.update(batch)
+            return None
+
         for seq in test_set:
             self.reset_hyp_and_sul(hypothesis)
             outputs = []
@@ -106,20 +118,20 @@ class RandomWMethodEqOracle(Oracle):
         for state in states_to_cover:
             self.freq_dict[state.prefix] = self.freq_dict[state.prefix] + 1
 
-            self.reset_hyp_and_sul(hypothesis)
+            self.reset_to_state(hypothesis, state)
 
             prefix = state.prefix
             random_walk = tuple(choice(self.alphabet) for _ in range(randint(1, self.random_walk_len)))
 
-            test_case = prefix + random_walk + choice(hypothesis.characterization_set)
+            suffix = random_walk + choice(hypothesis.characterization_set)
 
-            for ind, i in enumerate(test_case):
+            for ind, i in enumerate(suffix):
                 output_hyp = hypothesis.step(i)
                 output_sul = self.sul.step(i)
                 self.num_steps += 1
 
                 if output_sul != output_hyp:
                     self.sul.post()
-                    return test_case[:ind + 1]
+                    return prefix + suffix[:ind + 1]
 
         return None
@@ -59,14 +59,15 @@ class KWayStateCoverageEqOracle(Oracle):
                 self.cache.add(prefixes)
 
             index = 0
-            path = comb[0].prefix
+            prefix = comb[0].prefix
+            path = ()
             while index < len(comb) - 1:
                 path += hypothesis.get_shortest_path(comb[index], comb[index + 1])
                 index += 1
 
             path += tuple(choices(self.alphabet, k=self.random_walk_len))
 
-            self.reset_hyp_and_sul(hypothesis)
+            self.reset_to_state(hypothesis, comb[0])
 
             for i, p in enumerate(path):
                 out_sul = self.sul.step(p)
@@ -75,6 +76,6 @@ class KWayStateCoverageEqOracle(Oracle):
 
                 if out_sul != out_hyp:
                     self.sul.post()
-                    return path[:i + 1]
+                    return prefix + path[:i + 1]
 
         return None
@@ -97,13 +97,47 @@ def print_learning_info(info: dict):
     print(' # Membership Queries  : {}'.format(info['queries_learning']))
     if 'cache_saved' in info.keys():
         print(' # MQ Saved by Caching : {}'.format(info['cache_saved']))
+    if 'cells_from_cache' in info.keys():
+        print(' # Cells From Cache    : {}'.format(info['cells_from_cache']))
+    if info.get('continued_queries'):
+        print(' # MQ Without Reset    : {}'.format(info['continued_queries']))
     print(' # Steps               : {}'.format(info['steps_learning']))
     print('Equivalence Query')
     print(' # Membership Queries  : {}'.format(info['queries_eq_oracle']))
     print(' # Steps               : {}'.format(info['steps_eq_oracle']))
+    if 'resets' in info.keys():
+        print('System Under Learning')
+        print(' # Resets              : {}'.format(info['resets']))
+        print(' # Steps               : {}'.format(info['steps']))
+    if 'cost_total' in info.keys():
+        print('Cost')
+        print('  Total                : {}'.format(info['cost_total']))
+        print('  Learning algorithm   : {}'.format(info['cost_learning']))
+        print('  Conformance checking : {}'.format(info['cost_eq_oracle']))
     print('-----------------------------------')
 
 
+def print_cache_report(cache_report: dict):
+    """
+    Prints the cache statistics of each phase of learning (see CacheSUL.get_cache_report), ordered by the interaction
+    with the SUL (cost if present, otherwise steps), so that the most expensive phase is printed first.
+    """
+    sort_key = 'cost' if any('cost' in stats for stats in cache_report.values()) else 'steps'
+    phases = sorted(cache_report.keys(), key=lambda phase: cache_report[phase][sort_key], reverse=True)
+    columns = ['hits', 'misses', 'hit_rate', 'resets', 'steps', 'new_nodes', 'redundant_steps', 'mean_reuse_depth']
+    if sort_key == 'cost':
+        columns.append('cost')
+
+    phase_width = max([len('Phase')] + [len(phase) for phase in phases])
+    widths = [max(len(column), 10) for column in columns]
+    print('Phase'.ljust(phase_width) + ''.join(f' | {column:>{width}}' for column, width in zip(columns, widths)))
+    print('-' * (phase_width + sum(width + 3 for width in widths)))
+    for phase in phases:
+        stats = cache_report[phase]
+        print(phase.ljust(phase_width) + ''.join(f' | {str(stats[column]):>{width}}'
+                                                 for column, width in zip(columns, widths)))
+
+
 def print_observation_table(ot, table_type):
     """
     Prints the whole observation table.
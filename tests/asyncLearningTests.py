@@ -0,0 +1,73 @@
+import asyncio
+from copy import deepcopy
+import unittest
+
+from aalpy.base import AsyncSUL, AsyncSULPool, CostModel
+from aalpy.SULs import MealySUL
+from aalpy.learning_algs import run_Lstar_async
+from aalpy.oracles import StatePrefixEqOracle, WMethodEqOracle
+from aalpy.utils import load_automaton_from_file
+
+
+class AsyncMealySUL(AsyncSUL):
+    """
+    Asynchronous SUL simulating a network endpoint with a fixed latency per step.
+    """
+
+    def __init__(self, mealy_machine, latency=0.0001):
+        super().__init__()
+        self.sul = MealySUL(deepcopy(mealy_machine))
+        self.latency = latency
+
+    async def pre(self):
+        await asyncio.sleep(self.latency)
+        self.sul.pre()
+
+    async def post(self):
+        self.sul.post()
+
+    async def step(self, letter):
+        await asyncio.sleep(self.latency)
+        return self.sul.step(letter)
+
+
+class AsyncLearningTest(unittest.TestCase):
+
+    def test_async_learning(self):
+        model = load_automaton_from_file('../DotModels/Angluin_Mealy.dot', automaton_type='mealy')
+        alphabet = model.get_input_alphabet()
+
+        for cache in [True, False]:
+            for cex_processing in ['rs', None]:
+                sul = AsyncSULPool([AsyncMealySUL(model) for _ in range(4)])
+                eq_oracle = StatePrefixEqOracle(alphabet, None, walks_per_state=10, walk_len=10)
+
+                learned_model = asyncio.run(run_Lstar_async(alphabet, sul, eq_oracle, 'mealy',
+                                                            cex_processing=cex_processing,
+                                                            cache_and_non_det_check=cache, print_level=0))
+
+                validation_oracle = WMethodEqOracle(alphabet, MealySUL(model), len(model.states) + 1)
+                self.assertIsNone(validation_oracle.find_cex(learned_model))
+                self.assertEqual(len(learned_model.states), len(model.states))
+
+    def test_async_learning_data(self):
+        model = load_automaton_from_file('../DotModels/Angluin_Mealy.dot', automaton_type='mealy')
+        alphabet = model.get_input_alphabet()
+        sul = AsyncSULPool([AsyncMealySUL(model) for _ in range(4)])
+        eq_oracle = StatePrefixEqOracle(alphabet, None, walks_per_state=10, walk_len=10)
+
+        _, info = asyncio.run(run_Lstar_async(alphabet, sul, eq_oracle, 'mealy', cost_model=CostModel(10, 1),
+                                              print_level=0, return_data=True))
+        self.assertIn('learning:table_filling', info['cache_report'])
+        self.assertIn('eq_oracle:StatePrefixEqOracle', info['cache_report'])
+        self.assertEqual(info['cost_total'], info['cost_learning'] + info['cost_eq_oracle'])
+
+    def test_batch_order(self):
+        model = load_automaton_from_file('../DotModels/Angluin_Mealy.dot', automaton_type='mealy')
+        alphabet = model.get_input_alphabet()
+        words = [tuple(alphabet[j % len(alphabet)] for j in range(i, 2 * i + 1)) for i in range(20)]
+
+        sul = AsyncSULPool([AsyncMealySUL(model) for _ in range(3)])
+        outputs = asyncio.run(sul.query_batch(words))
+
+        self.assertEqual(outputs, MealySUL(model).query_batch(words))
@@ -0,0 +1,206 @@
+import random
+import unittest
+from copy import deepcopy
+
+from aalpy.SULs import MealySUL, SULPool, DfaSUL, LatencySUL, MooreSUL
+from aalpy.base.SUL import SUL, CacheSUL, get_maximal_words
+from aalpy.base.SharedMemoryCacheTree import SharedMemoryCacheTree
+from aalpy.learning_algs import run_Lstar
+from aalpy.learning_algs.deterministic.CounterExampleProcessing import rs_cex_processing
+from aalpy.learning_algs.deterministic.QueryPrefetcher import predict_rs_queries
+from aalpy.oracles import WMethodEqOracle, RandomWordEqOracle
+from aalpy.utils import load_automaton_from_file, generate_random_mealy_machine, get_Angluin_dfa, \
+    generate_random_moore_machine
+
+
+class BatchQueryTest(unittest.TestCase):
+
+    def get_model(self):
+        return load_automaton_from_file('../DotModels/Angluin_Mealy.dot', automaton_type='mealy')
+
+    def test_query_batch_order(self):
+        model = generate_random_mealy_machine(20, [1, 2, 3], [0, 1, 2])
+        alphabet = model.get_input_alphabet()
+
+        words = [tuple(alphabet[(i * j) % len(alphabet)] for j in range(i % 7 + 1)) for i in range(50)]
+        expected = MealySUL(model).query_batch(words)
+
+        for use_processes in [False, True]:
+            pool = SULPool([MealySUL(deepcopy(model)) for _ in range(3)], use_processes=use_processes)
+            self.assertEqual(pool.query_batch(words), expected)
+            self.assertLessEqual(pool.num_queries, len(words))
+            pool.shutdown()
+
+    def test_learning_with_pool(self):
+        model = self.get_model()
+        alphabet = model.get_input_alphabet()
+
+        for cache in [True, False]:
+            pool = SULPool([MealySUL(deepcopy(model)) for _ in range(4)])
+            eq_oracle = RandomWordEqOracle(alphabet, pool, num_walks=200, batch_size=50)
+
+            learned_model = run_Lstar(alphabet, pool, eq_oracle, automaton_type='mealy',
+                                      cache_and_non_det_check=cache, print_level=0)
+            pool.shutdown()
+
+            validation_oracle = WMethodEqOracle(alphabet, MealySUL(model), len(model.states) + 1, batch_size=100)
+            self.assertIsNone(validation_oracle.find_cex(learned_model))
+            self.assertEqual(len(learned_model.states), len(model.states))
+
+    def test_prefix_closure_elimination(self):
+        model = generate_random_mealy_machine(20, [1, 2, 3], [0, 1, 2])
+        words = [(1, 2, 3, 1), (1, 2), (1,), (1, 2, 3, 2), (2, 2), (2,), (1, 2), (3,)]
+        leaves = [(1, 2, 3, 1), (1, 2, 3, 2), (2, 2), (3,)]
+
+        expected = [MealySUL(model).query(word) for word in words]
+        for sul in [MealySUL(model), CacheSUL(MealySUL(model)), SULPool([MealySUL(deepcopy(model))])]:
+            self.assertEqual(sul.query_batch(words), expected)
+            self.assertEqual(sul.num_queries, len(leaves))
+
+        self.assertEqual(get_maximal_words(words)[0], leaves)
+
+        dfa = get_Angluin_dfa()
+        sul = DfaSUL(dfa)
+        self.assertEqual(sul.query_batch([(), ('a',)]), [[dfa.initial_state.is_accepting], DfaSUL(dfa).query(('a',))])
+        self.assertEqual(sul.num_queries, 2)
+
+    def test_batched_oracle_counts(self):
+        model = generate_random_mealy_machine(20, [1, 2, 3], [0, 1, 2])
+        sul = CacheSUL(MealySUL(model))
+        sul.query((1, 2, 3))
+        learning_queries = sul.num_queries
+
+        eq_oracle = WMethodEqOracle([1, 2, 3], sul, 21)
+        test_cases = [(1, 2, 3), (1, 2), (2, 1), (2,), (2, 1), (3, 3, 3)]
+        self.assertIsNone(eq_oracle.find_cex_in_batch(model, test_cases))
+        # only (2, 1) and (3, 3, 3) are executed on the SUL, all other test cases are answered by the cache or by
+        # longer test cases
+        self.assertEqual((eq_oracle.num_queries, eq_oracle.num_steps), (2, 5))
+        self.assertEqual(sul.num_queries, learning_queries)
+
+        # cache statistics of the batch are not attributed to learning
+        self.assertEqual(sul.num_cached_queries, 0)
+        self.assertEqual(sul.phase, 'learning')
+        report = sul.get_cache_report()
+        self.assertEqual((report['learning']['hits'], report['learning']['misses']), (0, 1))
+        self.assertEqual((report['eq_oracle:WMethodEqOracle']['hits'], report['eq_oracle:WMethodEqOracle']['misses']),
+                         (4, 2))
+
+    def test_shared_memory_cache(self):
+        model = generate_random_mealy_machine(20, [1, 2, 3], [0, 1, 2])
+        other_model = generate_random_mealy_machine(20, [1, 2, 3], [3, 4, 5])
+        alphabet = model.get_input_alphabet()
+        words = [tuple(alphabet[(i * j) % len(alphabet)] for j in range(i % 9 + 1)) for i in range(100)]
+        expected = MealySUL(model).query_batch(words)
+
+        cache = SharedMemoryCacheTree(max_nodes=10000)
+        pool = SULPool([MealySUL(deepcopy(model)) for _ in range(3)], use_processes=True, cache=cache)
+        self.assertEqual(pool.query_batch(words), expected)
+        pool.shutdown()
+
+        # steps of worker processes are visible in all processes
+        for word, outputs in zip(words, expected):
+            self.assertEqual(cache.in_cache(word), outputs)
+
+        # queries are answered from the shared cache, the SUL is not executed again
+        pool = SULPool([MealySUL(deepcopy(other_model)) for _ in range(3)], use_processes=True, cache=cache)
+        self.assertEqual(pool.query_batch(words), expected)
+        pool.shutdown()
+
+        sul = CacheSUL(MealySUL(model), cache=cache)
+        self.assertEqual(sul.query_batch(words), expected)
+        self.assertEqual(sul.num_queries, 0)
+        cache.unlink()
+
+    def test_compiled_automaton_batch(self):
+        alphabet = [1, 2, 3]
+        models = [(MealySUL, generate_random_mealy_machine(20, alphabet, [0, (1, 2), 'x'])),
+                  (MooreSUL, generate_random_moore_machine(20, alphabet, [0, (1, 2), 'x'])),
+                  (DfaSUL, get_Angluin_dfa())]
+        rand = random.Random(1)
+        for sul_class, model in models:
+            alphabet = model.get_input_alphabet()
+            words = [tuple(rand.choices(alphabet, k=rand.randint(1, 10))) for _ in range(200)]
+            if sul_class is not MealySUL:
+                words.append(())
+
+            sul, step_sul = sul_class(model), sul_class(model)
+            self.assertEqual(sul.query_batch(words), SUL.query_batch(step_sul, words))
+            self.assertEqual((sul.num_queries, sul.num_steps), (step_sul.num_queries, step_sul.num_steps))
+
+            # inputs that are not defined are executed step by step
+            with self.assertRaises(KeyError):
+                sul.query_batch(words + [(alphabet[0], 'undefined')])
+
+    def test_compiled_automaton_overridden_steps(self):
+        class WrappingMealySUL(MealySUL):
+            def step(self, letter):
+                return 'wrapped', super().step(letter)
+
+        model = generate_random_mealy_machine(10, [1, 2, 3], [0, 1])
+        sul = WrappingMealySUL(model)
+        words = [(1, 2), (1,), (3, 3, 1)]
+        # batches are executed with the overridden step, like single queries
+        self.assertEqual(sul.query_batch(words), [sul.query(word) for word in words])
+        self.assertEqual(sul.query_batch([(1, 2)])[0][0][0], 'wrapped')
+
+        learned_model = run_Lstar([1, 2, 3], sul, WMethodEqOracle([1, 2, 3], sul, 11), 'mealy', print_level=0)
+        self.assertEqual(learned_model.compute_output_seq(learned_model.initial_state, (1, 2)), sul.query((1, 2)))
+
+    def test_latency_sul(self):
+        model = self.get_model()
+        words = [('a', 'b'), ('b',), ('a', 'a', 'a')]
+        delays = []
+        for _ in range(2):
+            sul = LatencySUL(MealySUL(model), reset_latency=0.001, step_latency=0.0001, distribution='exponential',
+                             seed=5)
+            self.assertEqual(sul.query_batch(words), MealySUL(model).query_batch(words))
+            delays.append(sul.total_delay)
+        # delays are reproducible with the same seed
+        self.assertEqual(delays[0], delays[1])
+        self.assertGreater(delays[0], 0)
+
+    def test_prefetching(self):
+        random.seed(2)
+        model = generate_random_mealy_machine(30, ['a', 'b', 'c', 'd'], [0, 1, 2])
+        alphabet = model.get_input_alphabet()
+
+        infos = []
+        for prefetch in [False, True]:
+            sul = LatencySUL(MealySUL(deepcopy(model)), reset_latency=0.0005, step_latency=0)
+            prefetch_sul = LatencySUL(MealySUL(deepcopy(model)), reset_latency=0.0005, step_latency=0) \
+                if prefetch else None
+            eq_oracle = WMethodEqOracle(alphabet, sul, max_number_of_states=len(model.states), shuffle_test_set=False)
+            learned_model, info = run_Lstar(alphabet, sul, eq_oracle, 'mealy', cex_processing='rs',
+                                            prefetch_sul=prefetch_sul, print_level=0, return_data=True)
+            self.assertEqual(len(learned_model.states), len(model.states))
+            infos.append(info)
+
+        self.assertGreater(infos[1]['queries_prefetch'], 0)
+        # prefetched queries, also those in progress, are never executed again by the learning algorithm
+        self.assertLessEqual(infos[1]['queries_learning'], infos[0]['queries_learning'])
+
+    def test_rs_query_prediction(self):
+        model = load_automaton_from_file('../DotModels/MQTT/emqtt__two_client_will_retain.dot', automaton_type='mealy')
+        alphabet = model.get_input_alphabet()
+
+        class RecordingSUL(MealySUL):
+            def query(self, word):
+                queries.append(tuple(word))
+                return super().query(word)
+
+        # initial hypothesis, no counterexamples are found with 0 random walks
+        hypothesis = run_Lstar(alphabet, MealySUL(model), RandomWordEqOracle(alphabet, MealySUL(model), num_walks=0),
+                               'mealy', print_level=0)
+        rand = random.Random(1)
+        num_cex = 0
+        for cex in [tuple(rand.choices(alphabet, k=rand.randint(3, 15))) for _ in range(100)]:
+            if hypothesis.execute_sequence(hypothesis.initial_state, cex) == MealySUL(model).query(cex):
+                continue
+            num_cex += 1
+            queries = []
+            rs_cex_processing(RecordingSUL(model), cex, hypothesis)
+            # all levels of the binary search are predicted
+            predictions = set(predict_rs_queries(hypothesis, cex, depth=len(cex)))
+            self.assertTrue(set(queries).issubset(predictions))
+        self.assertGreater(num_cex, 0)
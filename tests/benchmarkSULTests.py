@@ -0,0 +1,71 @@
+import random
+import re
+import unittest
+from collections import Counter
+from itertools import product
+
+from aalpy.SULs import RegexSUL, TomitaSUL, MdpSUL, StochasticMealySUL
+from aalpy.learning_algs import run_Lstar
+from aalpy.oracles import RandomWordEqOracle
+from aalpy.utils import compare_automata, load_automaton_from_file
+
+
+class BenchmarkSULTest(unittest.TestCase):
+
+    def test_regex_sul_matches_re(self):
+        regexes = ['abc(b|a)c', '((0|1)0*1)*', 'a{2,3}b?', '[a-c]+x{2}', '(?:ab|c)*?d{1,}', r'.*a\w', 'a$|b',
+                   '[^ab]*', r'(a)\1', '(?=a)ab']
+        alphabet = ['a', 'b', 'c', 'd', 'x', '0', '1', 'ab', '\n']
+        rand = random.Random(1)
+        for regex in regexes:
+            sul = RegexSUL(regex)
+            for _ in range(500):
+                word = rand.choices(alphabet, k=rand.randint(1, 8))
+                expected = [bool(re.match(sul.regex, ''.join(word[:i]))) for i in range(1, len(word) + 1)]
+                self.assertEqual(sul.query(word), expected)
+
+    def test_regex_to_dfa(self):
+        random.seed(1)
+        alphabet = ['a', 'b', 'c']
+        for regex in ['abc(b|a)c', '(ab|c)*a?', 'a{2,4}(b|c)*']:
+            sul = RegexSUL(regex, alphabet)
+            reference = sul.to_dfa()
+            eq_oracle = RandomWordEqOracle(alphabet, sul, num_walks=2000, min_walk_len=5, max_walk_len=12)
+            learned = run_Lstar(alphabet, sul, eq_oracle, 'dfa', print_level=0)
+
+            self.assertEqual(len(learned.states), len(reference.states))
+            self.assertEqual(compare_automata(learned, reference), [])
+
+        # backreferences do not describe regular languages
+        with self.assertRaises(ValueError):
+            RegexSUL(r'(a|b)\1', alphabet).to_dfa()
+
+    def test_incremental_tomita(self):
+        rand = random.Random(1)
+        for level in [1, 2, 3, 4, 5, 6, 7, -3]:
+            sul = TomitaSUL(level)
+            words = [word for length in range(1, 9) for word in product([0, 1], repeat=length)]
+            words += [rand.choices(['0', '1', '10', '\n', 'x'], k=rand.randint(1, 10)) for _ in range(500)]
+            for word in words:
+                expected = [sul.tomita_level(''.join(map(str, word[:i]))) for i in range(1, len(word) + 1)]
+                self.assertEqual(sul.query(word), expected)
+            self.assertEqual(sul.query(()), [sul.tomita_level('')])
+
+    def test_stochastic_sampling(self):
+        mdp = load_automaton_from_file('../DotModels/MDPs/slot_machine.dot', automaton_type='mdp')
+        word = ('spin1', 'spin1', 'spin1', 'stop')
+        num_samples = 10000
+        for sul_class in [MdpSUL, StochasticMealySUL]:
+            # samples are reproducible with the same seed
+            first_sul, second_sul = sul_class(mdp, seed=1), sul_class(mdp, seed=1)
+            self.assertEqual([first_sul.query(word) for _ in range(20)], [second_sul.query(word) for _ in range(20)])
+            self.assertEqual(sul_class(mdp, seed=2).sample_query(word, 100),
+                             sul_class(mdp, seed=2).sample_query(word, 100))
+
+            sul = sul_class(mdp, seed=3)
+            queried = Counter(tuple(sul.query(word)) for _ in range(num_samples))
+            sampled = sul.sample_query(word, num_samples)
+            self.assertEqual(sum(sampled.values()), num_samples)
+            self.assertEqual(set(sampled.keys()), set(queried.keys()))
+            for outputs in queried.keys():
+                self.assertAlmostEqual(queried[outputs] / num_samples, sampled[outputs] / num_samples, delta=0.02)
@@ -0,0 +1,282 @@
+import os
+import random
+import tempfile
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from queue import Queue
+
+from aalpy.SULs import MealySUL
+from aalpy.base.CacheTree import CacheTree, CompactCacheTree, BoundedCacheTree
+from aalpy.base.PersistentCacheTree import PersistentCacheTree
+from aalpy.base.SharedMemoryCacheTree import SharedMemoryCacheTree
+from aalpy.base.SUL import CacheSUL
+from aalpy.learning_algs import run_Lstar
+from aalpy.oracles import CacheBasedEqOracle, WMethodEqOracle, RandomWalkEqOracle, RandomWordEqOracle
+from aalpy.utils import generate_random_mealy_machine
+
+
+class CacheTreeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.shared_caches = []
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+        for cache in self.shared_caches:
+            cache.unlink()
+
+    def get_cache_trees(self):
+        self.shared_caches.append(SharedMemoryCacheTree(max_nodes=100000))
+        return [CacheTree(), CompactCacheTree(), PersistentCacheTree(os.path.join(self.tmp_dir.name, 'cache.db')),
+                self.shared_caches[-1]]
+
+    def fill_cache(self, cache, model, num_queries=200, max_len=15):
+        alphabet = model.get_input_alphabet()
+        sul = MealySUL(model)
+        rand = random.Random(1)
+        words = []
+        for _ in range(num_queries):
+            word = tuple(rand.choice(alphabet) for _ in range(rand.randint(1, max_len)))
+            outputs = sul.query(word)
+            cache.reset()
+            for i, o in zip(word, outputs):
+                cache.step_in_cache(i, o)
+            words.append((word, outputs))
+        return words
+
+    def test_same_semantics(self):
+        model = generate_random_mealy_machine(15, ['a', 'b', 'c'], [0, 1, 2])
+        for cache in self.get_cache_trees():
+            words = self.fill_cache(cache, model)
+            for word, outputs in words:
+                for i in range(len(word) + 1):
+                    self.assertEqual(cache.in_cache(word[:i]), outputs[:i])
+            self.assertIsNone(cache.in_cache(('a', 'b', 'c') * 20))
+            self.assertIsNone(cache.in_cache(('unknown_input',)))
+
+            suffixes = [(), ('a',), ('b', 'a'), ('c', 'c', 'c', 'c'), ('unknown_input',)]
+            for word, _ in words[:50]:
+                for prefix in [word[:len(word) // 2], ('a', 'b', 'c') * 20]:
+                    self.assertEqual(cache.in_cache_batch(prefix, suffixes),
+                                     [cache.in_cache(prefix + suffix) for suffix in suffixes])
+
+    def test_non_determinism(self):
+        for cache in self.get_cache_trees():
+            cache.reset()
+            cache.step_in_cache('a', 1)
+            cache.step_in_cache('b', 2)
+            cache.reset()
+            cache.step_in_cache('a', 1)
+            with self.assertRaises(SystemExit):
+                cache.step_in_cache('b', 3)
+
+    def test_concurrent_steps(self):
+        model = generate_random_mealy_machine(15, ['a', 'b', 'c'], [0, 1, 2])
+        alphabet = model.get_input_alphabet()
+        rand = random.Random(2)
+        words = [tuple(rand.choice(alphabet) for _ in range(rand.randint(1, 10))) for _ in range(400)]
+        expected = [MealySUL(model).query(word) for word in words]
+
+        for cache in self.get_cache_trees() + [BoundedCacheTree(max_nodes=10000)]:
+            shared_sul = CacheSUL(MealySUL(model), cache=cache)
+            forks = Queue()
+            for _ in range(8):
+                forks.put(shared_sul.fork(MealySUL(deepcopy(model))))
+
+            def step_through(word):
+                sul = forks.get()
+                sul.pre()
+                outputs = [sul.step(i) for i in word]
+                sul.post()
+                forks.put(sul)
+                return outputs
+
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                self.assertEqual(list(executor.map(step_through, words)), expected)
+
+            for word, outputs in zip(words, expected):
+                self.assertEqual(shared_sul.query(word), outputs)
+            self.assertEqual(shared_sul.num_queries, 0)
+
+    def test_learning_with_cache_trees(self):
+        model = generate_random_mealy_machine(10, ['a', 'b', 'c'], [0, 1, 2])
+        alphabet = model.get_input_alphabet()
+        for cache in self.get_cache_trees():
+            sul = CacheSUL(MealySUL(model), cache=cache)
+            eq_oracle = CacheBasedEqOracle(alphabet, sul, num_walks=500)
+            learned_model = run_Lstar(alphabet, sul, eq_oracle, 'mealy', print_level=0)
+
+            validation_oracle = WMethodEqOracle(alphabet, MealySUL(model), len(learned_model.states) + 1)
+            self.assertIsNone(validation_oracle.find_cex(learned_model))
+
+    def test_persistent_cache(self):
+        model = generate_random_mealy_machine(15, ['a', 'b', 'c'], [0, 1, 2])
+        path = os.path.join(self.tmp_dir.name, 'persistent.db')
+
+        cache = PersistentCacheTree(path)
+        words = self.fill_cache(cache, model)
+        reader = PersistentCacheTree(path, read_only=True)
+        cache.close()
+
+        reopened_cache = PersistentCacheTree(path)
+        sul = CacheSUL(MealySUL(model), cache=reopened_cache)
+        for word, outputs in words:
+            self.assertEqual(reader.in_cache(word), outputs)
+            self.assertEqual(sul.query(word), outputs)
+        self.assertEqual(sul.num_queries, 0)
+
+        # stored outputs are checked for non-determinism
+        word, outputs = words[0]
+        reopened_cache.reset()
+        for i, o in zip(word[:-1], outputs[:-1]):
+            reopened_cache.step_in_cache(i, o)
+        with self.assertRaises(SystemExit):
+            reopened_cache.step_in_cache(word[-1], 'different_output')
+
+        reopened_cache.close()
+        reader.close()
+
+    def test_concurrent_persistent_writers(self):
+        path = os.path.join(self.tmp_dir.name, 'shared.db')
+        writer, other_writer = PersistentCacheTree(path), PersistentCacheTree(path)
+
+        # the symbol is interned by the writer, but not committed yet when the other writer looks it up
+        writer.reset()
+        writer.step_in_cache('a', 1)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            lookup = executor.submit(other_writer._get_symbol_id, 'a')
+            time.sleep(0.2)
+            writer.reset()
+            self.assertEqual(lookup.result(), writer._get_symbol_id('a'))
+
+        other_writer.reset()
+        other_writer.step_in_cache('a', 1)
+        other_writer.close()
+        writer.close()
+
+    def test_bounded_cache(self):
+        model = generate_random_mealy_machine(10, ['a', 'b', 'c'], [0, 1, 2])
+        alphabet = model.get_input_alphabet()
+
+        cache = BoundedCacheTree(max_nodes=300)
+        sul = CacheSUL(MealySUL(model), cache=cache)
+        eq_oracle = RandomWalkEqOracle(alphabet, sul, num_steps=5000, reset_prob=0.01)
+        learned_model, info = run_Lstar(alphabet, sul, eq_oracle, 'mealy', print_level=0, return_data=True)
+
+        validation_oracle = WMethodEqOracle(alphabet, MealySUL(model), len(learned_model.states) + 1)
+        self.assertIsNone(validation_oracle.find_cex(learned_model))
+
+        stats = info['cache_stats']
+        self.assertGreater(stats['evictions'], 0)
+        self.assertEqual(stats['num_nodes'], BoundedCacheTree._subtree_size(cache.root_node))
+
+        # membership queries of the learning algorithm are never evicted
+        cache.evict(0)
+        for state in learned_model.states:
+            for a in alphabet:
+                for e in learned_model.characterization_set:
+                    self.assertIsNotNone(cache.in_cache(state.prefix + (a,) + e))
+
+    def test_bounded_cache_with_batched_oracle(self):
+        random.seed(1)
+        model = generate_random_mealy_machine(10, ['a', 'b', 'c'], [0, 1, 2])
+        alphabet = model.get_input_alphabet()
+
+        cache = BoundedCacheTree(max_nodes=2000)
+        sul = CacheSUL(MealySUL(model), cache=cache)
+        eq_oracle = RandomWordEqOracle(alphabet, sul, num_walks=1000, batch_size=500)
+        learned_model = run_Lstar(alphabet, sul, eq_oracle, 'mealy', print_level=0)
+        validation_oracle = WMethodEqOracle(alphabet, MealySUL(model), len(learned_model.states) + 1)
+        self.assertIsNone(validation_oracle.find_cex(learned_model))
+
+        # queries of the equivalence oracle are not pinned, so the bound is kept
+        cache.reset()
+        self.assertGreater(cache.num_evictions, 0)
+        self.assertLessEqual(cache.num_nodes, cache.max_nodes)
+
+    def test_continued_queries(self):
+        model = generate_random_mealy_machine(10, [1, 2, 3], [0, 1])
+
+        class ResetCountingSUL(MealySUL):
+            def __init__(self, mm):
+                super().__init__(mm)
+                self.num_pre, self.num_post = 0, 0
+
+            def pre(self):
+                self.num_pre += 1
+                super().pre()
+
+            def post(self):
+                self.num_post += 1
+                super().post()
+
+        self.assertFalse(CacheSUL(MealySUL(model)).continue_queries)
+
+        inner_sul = ResetCountingSUL(deepcopy(model))
+        sul = CacheSUL(inner_sul, continue_queries=True)
+        # each query extends the previous one
+        for length in range(1, 6):
+            word = tuple([1, 2, 3, 1, 2][:length])
+            self.assertEqual(sul.query(word), MealySUL(model).query(word))
+        self.assertEqual(inner_sul.num_pre, 1)
+        self.assertEqual(sul.num_queries, 1)
+        self.assertEqual(sul.num_continued_queries, 4)
+        self.assertEqual(sul.num_steps, 5)
+
+        # a query that does not extend the previous one resets the SUL
+        self.assertEqual(sul.query((2, 2)), MealySUL(model).query((2, 2)))
+        self.assertEqual((inner_sul.num_pre, inner_sul.num_post), (2, 1))
+        sul.end_session()
+        self.assertEqual(inner_sul.num_post, 2)
+
+        for continue_queries in [False, True]:
+            inner_sul = ResetCountingSUL(deepcopy(model))
+            random.seed(1)
+            learned_model, info = run_Lstar([1, 2, 3], inner_sul, WMethodEqOracle([1, 2, 3], MealySUL(model), 10),
+                                            'mealy', cex_processing='longest_prefix',
+                                            continue_queries=continue_queries, return_data=True, print_level=0)
+            for _ in range(100):
+                word = tuple(random.choices([1, 2, 3], k=random.randint(1, 10)))
+                self.assertEqual(learned_model.compute_output_seq(learned_model.initial_state, word),
+                                 model.compute_output_seq(model.initial_state, word))
+            # each query that is not continued resets the SUL once (the equivalence oracle shares the CacheSUL), the
+            # session is ended after learning, and the oracle calls post after each counterexample
+            self.assertEqual(inner_sul.num_pre, info['resets'])
+            self.assertEqual(inner_sul.num_post, info['resets'] + info['learning_rounds'] - 1)
+
+    def test_cells_from_cache(self):
+        model = generate_random_mealy_machine(10, [1, 2, 3], [0, 1])
+        cache = CacheTree()
+        random.seed(2)
+        run_Lstar([1, 2, 3], CacheSUL(MealySUL(model), cache), WMethodEqOracle([1, 2, 3], MealySUL(model), 10),
+                  'mealy', print_level=0)
+
+        # all cells of the second run are already in the cache
+        sul = CacheSUL(MealySUL(model), cache)
+        random.seed(2)
+        learned_model, info = run_Lstar([1, 2, 3], sul, WMethodEqOracle([1, 2, 3], MealySUL(model), 10), 'mealy',
+                                        print_level=0, return_data=True)
+        self.assertEqual(info['queries_learning'], 0)
+        self.assertGreater(info['cells_from_cache'], 0)
+
+    def test_cache_report(self):
+        model = generate_random_mealy_machine(10, [1, 2, 3], [0, 1])
+        sul = CacheSUL(MealySUL(model))
+        eq_oracle = RandomWalkEqOracle([1, 2, 3], sul, num_steps=500, reset_prob=0.1)
+        _, info = run_Lstar([1, 2, 3], sul, eq_oracle, 'mealy', cex_processing='rs', print_level=0,
+                            return_data=True)
+
+        report = info['cache_report']
+        self.assertIn('learning:table_filling', report)
+        self.assertIn('eq_oracle:RandomWalkEqOracle', report)
+        learning_phases = [phase for phase in report if phase.startswith('learning')]
+        self.assertEqual(sum(report[phase]['misses'] for phase in learning_phases),
+                         info['queries_learning'] + info['continued_queries'])
+        self.assertEqual(sum(report[phase]['steps'] for phase in learning_phases), info['steps_learning'])
+        # every node of the cache was added in one of the phases
+        self.assertEqual(sum(stats['new_nodes'] for stats in report.values()), sul.cache.num_nodes - 1)
+        for stats in report.values():
+            self.assertLessEqual(stats['redundant_steps'], stats['steps'])
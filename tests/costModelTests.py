@@ -0,0 +1,74 @@
+import random
+import unittest
+
+from aalpy.SULs import MealySUL
+from aalpy.base import CostModel
+from aalpy.learning_algs import run_Lstar
+from aalpy.oracles import RandomWalkEqOracle, StatePrefixEqOracle, WMethodEqOracle
+from aalpy.utils import load_automaton_from_file, generate_random_mealy_machine
+
+
+class CostModelTest(unittest.TestCase):
+
+    def get_model(self):
+        return load_automaton_from_file('../DotModels/Angluin_Mealy.dot', automaton_type='mealy')
+
+    def test_cost_accounting(self):
+        model = self.get_model()
+        alphabet = model.get_input_alphabet()
+        cost_model = CostModel(reset_cost=500, step_cost=1)
+
+        for cache in [True, False]:
+            sul = MealySUL(model)
+            eq_oracle = RandomWalkEqOracle(alphabet, sul, num_steps=2000, reset_prob=0.1)
+            _, info = run_Lstar(alphabet, sul, eq_oracle, 'mealy', cache_and_non_det_check=cache,
+                                cost_model=cost_model, print_level=0, return_data=True)
+
+            self.assertEqual(info['cost_learning'], 500 * info['queries_learning'] + info['steps_learning'])
+            self.assertEqual(info['cost_eq_oracle'], 500 * info['queries_eq_oracle'] + info['steps_eq_oracle'])
+            self.assertEqual(info['cost_total'], info['cost_learning'] + info['cost_eq_oracle'])
+
+        expensive_input = alphabet[0]
+        cost_model = CostModel(reset_cost=500, step_cost=1, input_costs={expensive_input: 100})
+        self.assertEqual(cost_model.query_cost((expensive_input, alphabet[1])), 601)
+
+        sul = MealySUL(model)
+        eq_oracle = StatePrefixEqOracle(alphabet, sul, walks_per_state=5, walk_len=10)
+        _, info = run_Lstar(alphabet, sul, eq_oracle, 'mealy', cost_model=cost_model, print_level=0,
+                            return_data=True)
+        self.assertGreater(info['cost_total'], cost_model.estimate(info['resets'], info['steps']))
+
+    def test_cost_aware_learning(self):
+        model = self.get_model()
+        alphabet = model.get_input_alphabet()
+        cost_model = CostModel(reset_cost=100, step_cost=1)
+
+        sul = MealySUL(model)
+        eq_oracle = RandomWalkEqOracle(alphabet, sul, num_steps=3000, reset_prob=0.5)
+        learned_model, info = run_Lstar(alphabet, sul, eq_oracle, 'mealy', closing_strategy='cost_aware',
+                                        cost_model=cost_model, print_level=0, return_data=True)
+
+        validation_oracle = WMethodEqOracle(alphabet, MealySUL(model), len(model.states) + 1)
+        self.assertIsNone(validation_oracle.find_cex(learned_model))
+        # reset probability of the random walks is lowered to step_cost / reset_cost
+        self.assertLess(info['queries_eq_oracle'] / info['steps_eq_oracle'], 0.05)
+
+    def test_cost_aware_closing(self):
+        random.seed(8)
+        model = generate_random_mealy_machine(15, ['a', 'b', 'c'], [0, 1, 2])
+        alphabet = model.get_input_alphabet()
+        cost_model = CostModel(reset_cost=10, step_cost=1, input_costs={'a': 100})
+
+        infos = dict()
+        for closing_strategy in ['shortest_first', 'cost_aware']:
+            random.seed(8)
+            eq_oracle = WMethodEqOracle(alphabet, MealySUL(model), len(model.states) + 1)
+            learned_model, infos[closing_strategy] = run_Lstar(alphabet, MealySUL(model), eq_oracle, 'mealy',
+                                                               closing_strategy=closing_strategy,
+                                                               cost_model=cost_model, print_level=0,
+                                                               return_data=True)
+            self.assertEqual(len(learned_model.states), len(model.states))
+
+        # rows are reached by prefixes that avoid the expensive input, which all their queries start with
+        self.assertLess(infos['cost_aware']['cost_learning'], infos['shortest_first']['cost_learning'])
+        self.assertLess(infos['cost_aware']['cost_total'], infos['shortest_first']['cost_total'])
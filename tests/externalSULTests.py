@@ -0,0 +1,117 @@
+import os
+import socket
+import sys
+import tempfile
+import unittest
+
+from aalpy.SULs import SubprocessSUL, SocketSUL, SULServer, MealySUL
+from aalpy.learning_algs import run_Lstar
+from aalpy.oracles import RandomWordEqOracle, WMethodEqOracle
+from aalpy.utils import load_automaton_from_file
+
+# counts inputs 'a' modulo 3, input 'b' outputs the counter
+COUNTER_PROGRAM = '''
+import sys
+counter = 0
+for line in sys.stdin:
+    line = line.strip()
+    if line == 'RESET':
+        counter = 0
+        print('OK', flush=True)
+        continue
+    if line == 'a':
+        counter = (counter + 1) % 3
+        output = 'ok'
+    else:
+        output = str(counter)
+    print(output, flush=True)
+'''
+
+
+class ExternalSULTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.program = os.path.join(self.tmp_dir.name, 'counter.py')
+        with open(self.program, 'w') as f:
+            f.write(COUNTER_PROGRAM)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_subprocess_sul(self):
+        for reset_command, reset_response in [('RESET', 'OK'), (None, None)]:
+            sul = SubprocessSUL([sys.executable, self.program], reset_command=reset_command,
+                                reset_response=reset_response, max_pipelined_inputs=4)
+
+            self.assertEqual(sul.query(('a', 'b', 'a', 'a', 'b', 'a', 'b')), ['ok', '1', 'ok', 'ok', '0', 'ok', '1'])
+            self.assertEqual(sul.query(('b',)), ['0'])
+
+            sul.pre()
+            self.assertEqual([sul.step('a'), sul.step('b')], ['ok', '1'])
+            sul.post()
+            self.assertEqual(sul.query(('a', 'a', 'b')), ['ok', 'ok', '2'])
+
+            self.assertEqual(sul.num_starts, 1 if reset_command else 4)
+            sul.close()
+
+    def test_learning_subprocess(self):
+        sul = SubprocessSUL([sys.executable, self.program], reset_response='OK')
+        alphabet = ['a', 'b']
+        eq_oracle = RandomWordEqOracle(alphabet, sul, num_walks=100, min_walk_len=2, max_walk_len=10)
+        learned_model = run_Lstar(alphabet, sul, eq_oracle, 'mealy', print_level=0)
+        sul.close()
+
+        self.assertEqual(len(learned_model.states), 3)
+        self.assertEqual(sul.num_starts, 1)
+
+    def test_socket_sul(self):
+        model = load_automaton_from_file('../DotModels/Angluin_Mealy.dot', automaton_type='mealy')
+        alphabet = model.get_input_alphabet()
+
+        addresses = [('localhost', 0)]
+        if hasattr(socket, 'AF_UNIX'):
+            addresses.append(os.path.join(self.tmp_dir.name, 'sul.sock'))
+
+        for address in addresses:
+            server = SULServer(MealySUL(model), address).start()
+            sul = SocketSUL(server.address, pool_size=4)
+
+            words = [tuple(alphabet[(i * j) % len(alphabet)] for j in range(i % 6 + 1)) for i in range(40)]
+            self.assertEqual(sul.query_batch(words), MealySUL(model).query_batch(words))
+            self.assertLessEqual(sul._num_connections, 4)
+
+            eq_oracle = RandomWordEqOracle(alphabet, sul, num_walks=500, min_walk_len=4, max_walk_len=12)
+            learned_model = run_Lstar(alphabet, sul, eq_oracle, 'mealy', print_level=0)
+
+            validation_oracle = WMethodEqOracle(alphabet, MealySUL(model), len(model.states) + 1)
+            self.assertIsNone(validation_oracle.find_cex(learned_model))
+
+            sul.close()
+            server.shutdown()
+
+    def test_socket_sul_errors(self):
+        model = load_automaton_from_file('../DotModels/Angluin_Mealy.dot', automaton_type='mealy')
+        alphabet = model.get_input_alphabet()
+        server = SULServer(MealySUL(model), ('localhost', 0)).start()
+        sul = SocketSUL(server.address, pool_size=2)
+
+        with self.assertRaises(RuntimeError):
+            sul.step(alphabet[0])
+
+        # errors of the server keep the connection of the session usable
+        sul.pre()
+        with self.assertRaises(RuntimeError):
+            sul.step('unknown_input')
+        self.assertEqual(sul.step(alphabet[0]), MealySUL(model).query((alphabet[0],))[0])
+        sul.post()
+        sul.post()
+
+        with self.assertRaises(RuntimeError):
+            sul.query(('unknown_input',))
+        # each connection is pooled once
+        self.assertEqual(sul._idle_connections.qsize(), sul._num_connections)
+        self.assertEqual(sul.query((alphabet[0],)), MealySUL(model).query((alphabet[0],)))
+
+        sul.close()
+        server.shutdown()
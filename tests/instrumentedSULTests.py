@@ -0,0 +1,56 @@
+import json
+import unittest
+
+from aalpy.SULs import MealySUL, InstrumentedSUL, LatencyHistogram
+from aalpy.learning_algs import run_Lstar
+from aalpy.oracles import RandomWalkEqOracle
+from aalpy.utils import load_automaton_from_file
+
+
+class BatchRecordingMealySUL(MealySUL):
+    def __init__(self, mm):
+        super().__init__(mm)
+        self.batch_sizes = []
+
+    def query_batch(self, words: list) -> list:
+        self.batch_sizes.append(len(words))
+        return super().query_batch(words)
+
+
+class InstrumentedSULTest(unittest.TestCase):
+
+    def test_histogram_percentiles(self):
+        histogram = LatencyHistogram()
+        for i in range(1, 1001):
+            histogram.record(i / 1000)
+
+        for percent in [50, 95, 99]:
+            exact = percent / 100
+            self.assertLessEqual(abs(histogram.percentile(percent) - exact) / exact, 1 / histogram.sub_buckets)
+        self.assertEqual(histogram.percentile(100), 1)
+        self.assertEqual(histogram.get_stats()['count'], 1000)
+
+    def test_latency_in_learning_info(self):
+        model = load_automaton_from_file('../DotModels/Angluin_Mealy.dot', automaton_type='mealy')
+        alphabet = model.get_input_alphabet()
+
+        inner_sul = BatchRecordingMealySUL(model)
+        sul = InstrumentedSUL(inner_sul)
+        eq_oracle = RandomWalkEqOracle(alphabet, sul, num_steps=2000, reset_prob=0.1)
+        _, info = run_Lstar(alphabet, sul, eq_oracle, 'mealy', print_level=0, return_data=True)
+
+        latency = info['latency']
+        self.assertEqual(set(latency.keys()), {'learning', 'eq_oracle'})
+        # membership queries of the observation table are answered in batches by MealySUL, all other queries of the
+        # learning algorithm one by one
+        self.assertEqual(latency['learning']['query_batch']['count'], len(inner_sul.batch_sizes))
+        num_single_queries = latency['learning']['query']['count'] if 'query' in latency['learning'] else 0
+        self.assertEqual(sum(inner_sul.batch_sizes) + num_single_queries, info['queries_learning'])
+        self.assertNotIn('query_batch', latency['eq_oracle'])
+        self.assertEqual(latency['eq_oracle']['step']['count'], info['steps_eq_oracle'])
+        for stats in latency['eq_oracle'].values():
+            self.assertLessEqual(stats['p50'], stats['p95'])
+            self.assertLessEqual(stats['p95'], stats['p99'])
+            self.assertLessEqual(stats['p99'], stats['max'])
+
+        self.assertEqual(json.loads(sul.to_json()), latency)
@@ -0,0 +1,56 @@
+import unittest
+from copy import deepcopy
+
+from aalpy.SULs import PyClassSUL, FunctionDecorator
+from aalpy.learning_algs import run_Lstar
+from aalpy.oracles import StatePrefixEqOracle
+from aalpy.utils import MockMqttExample
+
+
+class CountingMqtt(MockMqttExample):
+    num_constructed = 0
+
+    def __init__(self):
+        super().__init__()
+        CountingMqtt.num_constructed += 1
+
+    def reset(self):
+        self.state = 'CONCLOSED'
+        self.topics = set()
+
+
+class PyClassSULTest(unittest.TestCase):
+
+    def learn(self, sul):
+        mqtt = CountingMqtt
+        input_al = [FunctionDecorator(mqtt.connect), FunctionDecorator(mqtt.disconnect),
+                    FunctionDecorator(mqtt.subscribe, 'topic'), FunctionDecorator(mqtt.unsubscribe, 'topic'),
+                    FunctionDecorator(mqtt.publish, 'topic')]
+        eq_oracle = StatePrefixEqOracle(input_al, sul, walks_per_state=10, walk_len=10)
+        return run_Lstar(input_al, sul, eq_oracle, 'mealy', print_level=0)
+
+    def test_pooled_instances(self):
+        CountingMqtt.num_constructed = 0
+        expected = self.learn(PyClassSUL(CountingMqtt))
+        self.assertGreater(CountingMqtt.num_constructed, 1)
+
+        for reset_hook in [None, CountingMqtt.reset]:
+            CountingMqtt.num_constructed = 0
+            sul = PyClassSUL(CountingMqtt, pool_size=4, reset_hook=reset_hook)
+            learned = self.learn(sul)
+            sul.close()
+            # only the pristine instance is constructed, all others are clones or reset instances
+            self.assertEqual(CountingMqtt.num_constructed, 1)
+            self.assertEqual(len(learned.states), len(expected.states))
+
+    def test_copy_of_pooled_sul(self):
+        sul = PyClassSUL(CountingMqtt, pool_size=2)
+        sul.pre()
+        sul_copy = deepcopy(sul)
+        sul_copy.pre()
+        self.assertIsNot(sul_copy.sul, sul.sul)
+        self.assertEqual(sul_copy.step(FunctionDecorator(CountingMqtt.connect)), 'CONNACK')
+        self.assertEqual(sul.step(FunctionDecorator(CountingMqtt.publish, 'topic')), 'CONCLOSED')
+        sul.close()
+        sul_copy.close()
+
@@ -0,0 +1,44 @@
+import os
+import random
+import tempfile
+import unittest
+
+from aalpy.SULs import MealySUL, DfaSUL, RecordingSUL, ReplaySUL, UnrecordedQueryError
+from aalpy.learning_algs import run_Lstar
+from aalpy.oracles import StatePrefixEqOracle
+from aalpy.utils import load_automaton_from_file, get_Angluin_dfa
+
+
+class RecordReplayTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def learn(self, sul, alphabet, automaton_type, seed, walk_len=10):
+        random.seed(seed)
+        eq_oracle = StatePrefixEqOracle(alphabet, sul, walks_per_state=10, walk_len=walk_len)
+        return run_Lstar(alphabet, sul, eq_oracle, automaton_type, print_level=0, return_data=True)
+
+    def test_record_and_replay(self):
+        models = [(load_automaton_from_file('../DotModels/Angluin_Mealy.dot', automaton_type='mealy'), MealySUL,
+                   'mealy'), (get_Angluin_dfa(), DfaSUL, 'dfa')]
+
+        for model, sul_class, automaton_type in models:
+            alphabet = model.get_input_alphabet()
+            path = os.path.join(self.tmp_dir.name, f'{automaton_type}.trace')
+
+            recording_sul = RecordingSUL(sul_class(model), path)
+            recorded_model, recorded_info = self.learn(recording_sul, alphabet, automaton_type, seed=3)
+            recording_sul.close()
+
+            replayed_model, replayed_info = self.learn(ReplaySUL(path), alphabet, automaton_type, seed=3)
+            self.assertEqual(len(replayed_model.states), len(recorded_model.states))
+            for key in ['queries_learning', 'steps_learning', 'queries_eq_oracle', 'steps_eq_oracle']:
+                self.assertEqual(replayed_info[key], recorded_info[key])
+
+            # queries that were not recorded are flagged
+            with self.assertRaises(UnrecordedQueryError):
+                self.learn(ReplaySUL(path), alphabet, automaton_type, seed=3, walk_len=50)
@@ -0,0 +1,55 @@
+import random
+import unittest
+
+from aalpy.SULs import MealySUL
+from aalpy.automata import MealyState, MealyMachine
+from aalpy.learning_algs import run_reset_free_Lstar
+from aalpy.oracles import WMethodEqOracle
+from aalpy.utils import load_automaton_from_file
+
+
+class ResetFreeTest(unittest.TestCase):
+
+    def test_reset_free_learning(self):
+        for path in ['../DotModels/Angluin_Mealy.dot', '../DotModels/MQTT/emqtt__two_client_will_retain.dot']:
+            model = load_automaton_from_file(path, automaton_type='mealy')
+            alphabet = model.get_input_alphabet()
+            homing_sequence = model.compute_homing_sequence()
+
+            sul = MealySUL(model)
+            # random walks of the equivalence queries might miss a state
+            learned_model, info = run_reset_free_Lstar(alphabet, sul, homing_sequence, num_walks=500, seed=3,
+                                                       return_data=True, print_level=0)
+            self.assertEqual(info['resets'], 1)
+
+            # learning is reproducible with the same seed, regardless of the global random state
+            random.seed(0)
+            _, repeated_info = run_reset_free_Lstar(alphabet, MealySUL(model), homing_sequence, num_walks=500,
+                                                    seed=3, return_data=True, print_level=0)
+            self.assertEqual(repeated_info['steps'], info['steps'])
+            self.assertEqual(len(learned_model.states), len(model.states))
+
+            # learned model has to be equivalent to the model started in the state reached by the homing sequence
+            for state in model.states:
+                response = tuple(model.execute_sequence(state, homing_sequence))
+                if response == info['homing_response']:
+                    model.initial_state = model.current_state
+                    break
+
+            validation_oracle = WMethodEqOracle(alphabet, MealySUL(model), len(model.states) + 1)
+            self.assertIsNone(validation_oracle.find_cex(learned_model))
+
+    def test_single_state(self):
+        state = MealyState('s0')
+        for i, o in [('a', 0), ('b', 1)]:
+            state.transitions[i] = state
+            state.output_fun[i] = o
+        model = MealyMachine(state, [state])
+        homing_sequence = model.compute_homing_sequence()
+        self.assertEqual(homing_sequence, ())
+
+        learned_model, info = run_reset_free_Lstar(['a', 'b'], MealySUL(model), homing_sequence, num_walks=50,
+                                                   return_data=True, print_level=0)
+        self.assertEqual(len(learned_model.states), 1)
+        self.assertEqual((info['num_copies'], info['steps_homing']), (1, 0))
+        self.assertEqual(learned_model.compute_output_seq(learned_model.initial_state, ['a', 'b', 'b']), [0, 1, 1])
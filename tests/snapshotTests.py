@@ -0,0 +1,50 @@
+import unittest
+
+from aalpy.SULs import MealySUL
+from aalpy.learning_algs import run_Lstar
+from aalpy.oracles import StatePrefixEqOracle, RandomWMethodEqOracle, KWayStateCoverageEqOracle, WMethodEqOracle
+from aalpy.utils import generate_random_mealy_machine
+
+
+class NoSnapshotMealySUL(MealySUL):
+    def save_state(self):
+        return None
+
+
+class SnapshotTest(unittest.TestCase):
+
+    def test_oracles_with_snapshots(self):
+        model = generate_random_mealy_machine(30, ['a', 'b', 'c'], [0, 1, 2])
+        alphabet = model.get_input_alphabet()
+
+        oracles = [lambda sul: StatePrefixEqOracle(alphabet, sul, walks_per_state=20, walk_len=10),
+                   lambda sul: RandomWMethodEqOracle(alphabet, sul, walks_per_state=20, walk_len=10),
+                   lambda sul: KWayStateCoverageEqOracle(alphabet, sul, random_walk_len=10)]
+
+        for oracle in oracles:
+            for sul_class in [MealySUL, NoSnapshotMealySUL]:
+                sul = sul_class(model)
+                eq_oracle = oracle(sul)
+
+                learned_model = run_Lstar(alphabet, sul, eq_oracle, 'mealy', print_level=0)
+
+                validation_oracle = WMethodEqOracle(alphabet, MealySUL(model), len(learned_model.states) + 1)
+                self.assertIsNone(validation_oracle.find_cex(learned_model))
+                if sul_class is MealySUL:
+                    self.assertTrue(eq_oracle.snapshots)
+                else:
+                    self.assertFalse(eq_oracle.snapshots)
+
+    def test_snapshots_skip_prefixes(self):
+        model = generate_random_mealy_machine(30, ['a', 'b', 'c'], [0, 1, 2])
+        alphabet = model.get_input_alphabet()
+        hypothesis = run_Lstar(alphabet, MealySUL(model), WMethodEqOracle(alphabet, MealySUL(model), 31), 'mealy',
+                               print_level=0)
+
+        steps = []
+        for sul in [MealySUL(model), NoSnapshotMealySUL(model)]:
+            eq_oracle = StatePrefixEqOracle(alphabet, sul, walks_per_state=20, walk_len=5)
+            self.assertIsNone(eq_oracle.find_cex(hypothesis))
+            steps.append(eq_oracle.num_steps)
+
+        self.assertLess(steps[0], steps[1])